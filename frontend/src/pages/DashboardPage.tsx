@@ -46,6 +46,12 @@ interface DashboardStats {
   }>;
 }
 
+interface LiveCounts {
+  scored: number;
+  fraud: number;
+  flagged: number;
+}
+
 const DashboardPage: React.FC = () => {
   const { userProfile } = useAuth();
   const [dashboardStats, setDashboardStats] = useState<DashboardStats | null>(
@@ -54,12 +60,32 @@ const DashboardPage: React.FC = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [isNewUser, setIsNewUser] = useState(false);
+  const [liveCounts, setLiveCounts] = useState<LiveCounts>({
+    scored: 0,
+    fraud: 0,
+    flagged: 0,
+  });
 
   useEffect(() => {
     fetchDashboardStats();
     checkUserStatus();
   }, [userProfile]);
 
+  // /api/stats describes the bundled dataset, not live scoring, so the pushed
+  // deltas are counted separately from page load rather than added to it
+  useEffect(() => {
+    const source = new EventSource("/api/stream?events=stats");
+    source.addEventListener("stats", (event) => {
+      const delta = JSON.parse((event as MessageEvent).data);
+      setLiveCounts((current) => ({
+        scored: current.scored + delta.totalTransactions,
+        fraud: current.fraud + delta.fraudDetected,
+        flagged: current.flagged + delta.flagged,
+      }));
+    });
+    return () => source.close();
+  }, []);
+
   const checkUserStatus = () => {
     if (userProfile) {
       const now = new Date();
@@ -203,7 +229,7 @@ const DashboardPage: React.FC = () => {
         </motion.div>
 
         {/* Stats Grid */}
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8">
+        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6 mb-4">
           {stats.map((stat, index) => (
             <motion.div
               key={index}
@@ -243,6 +269,14 @@ const DashboardPage: React.FC = () => {
           ))}
         </div>
 
+        {/* Live scoring since page load */}
+        <div className="flex items-center text-sm text-gray-600 mb-8">
+          <TrendingUp className="h-4 w-4 mr-2 text-blue-600" />
+          Since page load: {liveCounts.scored.toLocaleString("en-IN")} scored,{" "}
+          {liveCounts.fraud.toLocaleString("en-IN")} fraud,{" "}
+          {liveCounts.flagged.toLocaleString("en-IN")} flagged
+        </div>
+
         {/* New User Welcome Card */}
         {isNewUser && (
           <motion.div
@@ -0,0 +1,179 @@
+"""
+Admission control: a bounded number of requests in flight, short per-class
+queues, and early 503s when the expected queue wait exceeds a class's budget
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+
+class Overloaded(Exception):
+    """Request shed; retry_after is a hint in whole seconds"""
+
+    def __init__(self, priority_class, reason, retry_after):
+        super().__init__(f"{priority_class} traffic shed: {reason}")
+        self.priority_class = priority_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PriorityClass:
+    """Queueing limits for one kind of traffic; lower priority numbers are served first.
+
+    max_in_flight caps the slots this class may hold at once, so lower
+    priority traffic cannot occupy every slot between scoring bursts; if it
+    is not set, max_share gives the cap as a fraction of the pool (at least
+    one slot). With neither, the class may use the whole pool.
+    """
+
+    def __init__(self, priority, max_queue, max_wait_ms, max_in_flight=None, max_share=None):
+        self.priority = priority
+        self.max_queue = max_queue
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self.max_share = max_share
+
+    def cap(self, pool_size):
+        """Slots this class may hold in a pool of pool_size"""
+        if self.max_in_flight is not None:
+            return min(self.max_in_flight, pool_size)
+        if self.max_share is not None:
+            return max(1, int(pool_size * self.max_share))
+        return pool_size
+
+
+# Batch and analytics together hold at most three quarters of the pool, so
+# scoring always has slots of its own
+DEFAULT_CLASSES = {
+    'scoring': PriorityClass(priority=0, max_queue=64, max_wait_ms=250),
+    'batch': PriorityClass(priority=1, max_queue=16, max_wait_ms=1000, max_share=0.5),
+    'analytics': PriorityClass(priority=2, max_queue=8, max_wait_ms=2000, max_share=0.25),
+}
+
+
+class _Waiter:
+    __slots__ = ('granted', 'event')
+
+    def __init__(self):
+        self.granted = False
+        self.event = threading.Event()
+
+
+class AdmissionController:
+    """Shared pool of max_in_flight slots handed out in priority order.
+
+    A request that finds a free slot (and no higher-or-equal priority request
+    already queued) runs at once. Otherwise its queue wait is estimated from
+    the requests queued ahead of it and each class's moving-average service time;
+    if that estimate exceeds its class's max_wait, or the class queue is full,
+    it is rejected immediately instead of waiting to time out.
+    """
+
+    def __init__(self, max_in_flight, classes=None, ewma_alpha=0.1):
+        self.max_in_flight = max_in_flight
+        self.classes = classes or DEFAULT_CLASSES
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._class_in_flight = {name: 0 for name in self.classes}
+        self._caps = {name: cls.cap(max_in_flight) for name, cls in self.classes.items()}
+        self._queues = {name: deque() for name in self.classes}
+        self._order = sorted(self.classes, key=lambda name: self.classes[name].priority)
+        self._service_time = {name: 0.01 for name in self.classes}
+
+    def acquire(self, name):
+        """Block until a slot is granted; returns the grant time to pass to release()"""
+        cls = self.classes[name]
+        start = time.perf_counter()
+        with self._lock:
+            if self._has_slot(name) and not self._queued_ahead(name):
+                self._grant(name)
+                metrics.observe(f'admission.{name}.queue_wait', 0.0)
+                metrics.incr(f'admission.{name}.admitted')
+                return time.perf_counter()
+
+            queue = self._queues[name]
+            if len(queue) >= cls.max_queue:
+                self._shed(name, 'queue full', self._expected_wait(name))
+            expected = self._expected_wait(name)
+            if expected > cls.max_wait:
+                self._shed(name, 'expected wait over budget', expected)
+            waiter = _Waiter()
+            queue.append(waiter)
+
+        waiter.event.wait(cls.max_wait)
+        with self._lock:
+            if not waiter.granted:
+                queue.remove(waiter)
+                self._shed(name, 'queue wait timed out', self._expected_wait(name))
+
+        granted = time.perf_counter()
+        metrics.observe(f'admission.{name}.queue_wait', granted - start)
+        metrics.incr(f'admission.{name}.admitted')
+        return granted
+
+    def release(self, name, granted):
+        """Return the slot and hand it to the highest-priority waiter"""
+        elapsed = time.perf_counter() - granted
+        with self._lock:
+            self._in_flight -= 1
+            self._class_in_flight[name] -= 1
+            self._service_time[name] += self.ewma_alpha * (elapsed - self._service_time[name])
+            self._dispatch()
+
+    def _has_slot(self, name):
+        return self._in_flight < self.max_in_flight and self._class_in_flight[name] < self._caps[name]
+
+    def _queued_ahead(self, name):
+        priority = self.classes[name].priority
+        return sum(len(self._queues[other]) for other in self._order
+                   if self.classes[other].priority <= priority)
+
+    def _expected_wait(self, name):
+        """Seconds until a request joining the back of this class's queue gets a slot"""
+        priority = self.classes[name].priority
+        work = self._service_time[name] + sum(
+            len(self._queues[other]) * self._service_time[other] for other in self._order
+            if self.classes[other].priority <= priority)
+        # A capped class drains through its own slots only
+        return work / self._caps[name]
+
+    def _grant(self, name):
+        self._in_flight += 1
+        self._class_in_flight[name] += 1
+
+    def _dispatch(self):
+        for name in self._order:
+            queue = self._queues[name]
+            while queue and self._has_slot(name):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._grant(name)
+                waiter.event.set()
+
+    def _shed(self, name, reason, expected_wait):
+        metrics.incr(f'admission.{name}.shed')
+        raise Overloaded(name, reason, max(1, math.ceil(expected_wait)))
+
+    def stats(self):
+        counts = metrics.counters([f'admission.{name}.{kind}' for name in self._order for kind in ('admitted', 'shed')])
+        with self._lock:
+            return {
+                'max_in_flight': self.max_in_flight,
+                'in_flight': self._in_flight,
+                'classes': {
+                    name: {
+                        'max_in_flight': self._caps[name],
+                        'in_flight': self._class_in_flight[name],
+                        'queued': len(self._queues[name]),
+                        'service_time_ms': round(self._service_time[name] * 1000, 3),
+                        'admitted': counts[f'admission.{name}.admitted'],
+                        'shed': counts[f'admission.{name}.shed'],
+                    }
+                    for name in self._order
+                },
+            }
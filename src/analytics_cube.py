@@ -0,0 +1,113 @@
+"""
+Pre-aggregated transaction cube for slice and roll-up analytics queries
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Cube dimensions in axis order; 'city' is read from the dataset's 'country' column
+CUBE_DIMENSIONS = ['category', 'payment_method', 'device', 'city', 'hour', 'day_of_week']
+MEASURES = ['count', 'fraud_count', 'amount_sum']
+
+# Integer dimensions always span their full domain so every hour/day is addressable
+FIXED_LEVELS = {
+    'hour': list(range(24)),
+    'day_of_week': list(range(7)),
+}
+
+
+class AggregateCube:
+    """Counts, fraud counts and amount sums for every combination of dimensions.
+
+    The base cuboid is built with a single bincount over the combined cell
+    index. Every roll-up (all 2^6 subsets of dimensions) is then derived from
+    its smallest parent, so a query is a dictionary lookup plus indexing and
+    never touches raw rows.
+    """
+
+    def __init__(self, df):
+        df = df.rename(columns={'country': 'city'})
+        self.levels = {}
+        codes = []
+        for dim in CUBE_DIMENSIONS:
+            levels = FIXED_LEVELS.get(dim) or sorted(df[dim].dropna().unique().tolist())
+            self.levels[dim] = levels
+            codes.append(pd.Categorical(df[dim], categories=levels).codes)
+        self._codes = {dim: {value: i for i, value in enumerate(levels)} for dim, levels in self.levels.items()}
+
+        shape = tuple(len(self.levels[dim]) for dim in CUBE_DIMENSIONS)
+        codes = np.vstack(codes)
+        in_cube = (codes >= 0).all(axis=0)
+        cell = np.ravel_multi_index(codes[:, in_cube], shape)
+        size = int(np.prod(shape))
+
+        base = np.empty((len(MEASURES),) + shape)
+        base[0] = np.bincount(cell, minlength=size).reshape(shape)
+        base[1] = np.bincount(cell, weights=df['is_fraud'].to_numpy()[in_cube], minlength=size).reshape(shape)
+        base[2] = np.bincount(cell, weights=df['amount'].to_numpy()[in_cube], minlength=size).reshape(shape)
+
+        self.n_rows = int(in_cube.sum())
+        self.cuboids = {tuple(CUBE_DIMENSIONS): base}
+        for n_dims in range(len(CUBE_DIMENSIONS) - 1, -1, -1):
+            for dims in combinations(CUBE_DIMENSIONS, n_dims):
+                parent_dims, parent = self._smallest_parent(dims)
+                axis = 1 + next(i for i, dim in enumerate(parent_dims) if dim not in dims)
+                self.cuboids[dims] = parent.sum(axis=axis)
+
+    def _smallest_parent(self, dims):
+        candidates = []
+        for dim in CUBE_DIMENSIONS:
+            if dim in dims:
+                continue
+            parent_dims = tuple(d for d in CUBE_DIMENSIONS if d in dims or d == dim)
+            candidates.append((self.cuboids[parent_dims].size, parent_dims))
+        parent_dims = min(candidates)[1]
+        return parent_dims, self.cuboids[parent_dims]
+
+    def parse_value(self, dim, value):
+        """Convert a query-string value to the type stored for a dimension"""
+        if dim in FIXED_LEVELS:
+            return int(value)
+        return value
+
+    def query(self, filters=None, group_by=None):
+        """Aggregate measures for the filtered slice, broken down by group_by"""
+        filters = filters or {}
+        group_by = list(group_by or [])
+        for dim in list(filters) + group_by:
+            if dim not in CUBE_DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {dim}")
+        if set(filters) & set(group_by):
+            raise ValueError("A dimension cannot be both filtered and grouped")
+
+        dims = tuple(d for d in CUBE_DIMENSIONS if d in filters or d in group_by)
+        cuboid = self.cuboids[dims]
+
+        index = [slice(None)]
+        for dim in dims:
+            if dim in filters:
+                code = self._codes[dim].get(filters[dim])
+                if code is None:
+                    return []
+                index.append(code)
+            else:
+                index.append(slice(None))
+        values = cuboid[tuple(index)]
+
+        group_dims = [d for d in dims if d in group_by]
+        rows = []
+        for cell in np.ndindex(*values.shape[1:]):
+            count, fraud_count, amount_sum = values[(slice(None),) + cell]
+            if not count:
+                continue
+            row = {dim: self.levels[dim][i] for dim, i in zip(group_dims, cell)}
+            row.update({
+                'count': int(count),
+                'fraud_count': int(fraud_count),
+                'amount_sum': round(float(amount_sum), 2),
+                'fraud_rate': round(fraud_count / count * 100, 2),
+            })
+            rows.append(row)
+        return rows
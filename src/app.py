@@ -1,34 +1,292 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import joblib
 import os
 from datetime import datetime
-import random
+import pickle
+import threading
+import time
+
+from admission import DEFAULT_CLASSES, AdmissionController, Overloaded, PriorityClass
+from attributions import ExplainerCache, unavailable
+from blocklist import BLOCKLIST_FIELDS, BlocklistSet
+from analytics_cube import AggregateCube, CUBE_DIMENSIONS
+from cascade import CascadeScorer
+import columnar
+from drift_monitor import DriftMonitor, build_reference
+from features import encode_columns, encode_frame, similarity_vectors
+from idempotency import IdempotencyConflict, IdempotencyStore, fingerprint, new_transaction_id
+from labels import OUTCOMES, LabelIngestor, accuracy_report, live_label_accuracy, parse_label, read_label_chunks
+from linkage import LinkageIndex
+from live_feed import EVENT_TYPES, LiveFeed
+from metrics import metrics
+from model_registry import GLOBAL_SEGMENT, ModelRegistry
+from neighbours import IVFIndex
+from prediction_store import PredictionStore
+from request_profiler import RequestProfiler
+from retrain_jobs import RetrainRunner, served_dir
+from state_backend import LocalBackend, create_backend
+from time_windows import RollingWindows, parse_duration
 
 app = Flask(__name__)
 CORS(app)
 
-# Load models and preprocessors
+# Opt-in request profiling: a random fraction of requests and/or every request
+# slower than PROFILE_SLOW_MS; both default to off
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    slow_ms=float(os.environ.get('PROFILE_SLOW_MS', '0')),
+    interval_ms=float(os.environ.get('PROFILE_INTERVAL_MS', '2')),
+    capacity=int(os.environ.get('PROFILE_CAPACITY', '50'))
+)
+# Requests that are never profiled: admin endpoints and long-lived streams
+UNPROFILED_PREFIXES = ('/api/admin', '/api/stream')
+
+# Admission control: at most ADMISSION_MAX_IN_FLIGHT managed requests run at
+# once (0 disables it); the rest queue per priority class and are shed with a
+# 503 when their expected wait exceeds the class budget
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '16'))
+ADMISSION_ROUTES = {
+    '/api/predict': 'scoring',
+    '/api/predict/batch': 'batch',
+    '/api/predict/arrow': 'batch',
+    '/api/stats': 'analytics',
+    '/api/flagged': 'analytics',
+    '/api/analytics/cube': 'analytics',
+    '/api/analytics/windows': 'analytics',
+    '/api/drift': 'analytics',
+    '/api/linkage': 'analytics',
+    '/api/neighbours': 'analytics',
+    '/api/neighbours/<transaction_id>': 'analytics',
+    '/api/users/<user_id>/recent': 'analytics',
+    '/api/labels': 'batch',
+    '/api/labels/accuracy': 'analytics',
+    '/api/blocklists': 'analytics',
+    '/api/admin/blocklists/<kind>': 'batch',
+}
+admission = None
+if ADMISSION_MAX_IN_FLIGHT > 0:
+    admission = AdmissionController(ADMISSION_MAX_IN_FLIGHT, {
+        name: PriorityClass(
+            priority=cls.priority,
+            max_queue=int(os.environ.get(f'ADMISSION_{name.upper()}_MAX_QUEUE', cls.max_queue)),
+            max_wait_ms=float(os.environ.get(f'ADMISSION_{name.upper()}_MAX_WAIT_MS', cls.max_wait * 1000)),
+            max_in_flight=(int(os.environ[f'ADMISSION_{name.upper()}_MAX_IN_FLIGHT'])
+                           if f'ADMISSION_{name.upper()}_MAX_IN_FLIGHT' in os.environ else cls.max_in_flight),
+            max_share=cls.max_share
+        )
+        for name, cls in DEFAULT_CLASSES.items()
+    })
+
+# Shared secret for /api/admin endpoints; unset means no check
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Served files are read from the release models/current points at (see retrain_jobs)
+MODELS_DIR = '../models'
+
+# Which trained model serves /api/predict: the full stacking ensemble or the
+# distilled student produced by distill_model.py
+MODEL_FILES = {
+    'stacking': 'fraud_model.pkl',
+    'student': 'student_model.pkl',
+}
+MODEL_VARIANT = os.environ.get('FRAUD_MODEL_VARIANT', 'stacking')
+# What actually serves: a promoted release has no student until it is distilled again
+served_variant = MODEL_VARIANT
+
+# 'single' scores with the model above; 'cascade' scores everything with the
+# student first and escalates only the uncertain band to the model above
+SCORING_MODE = os.environ.get('FRAUD_SCORING_MODE', 'single')
+CASCADE_LOW = float(os.environ.get('CASCADE_LOW', '0.15'))
+CASCADE_HIGH = float(os.environ.get('CASCADE_HIGH', '0.85'))
+CASCADE_SHADOW_RATE = float(os.environ.get('CASCADE_SHADOW_RATE', '0.01'))
+
+# Per-segment models under models/segments/<field>/<value>.pkl, tried in this
+# field order before falling back to the global model
+SEGMENT_KEYS = [k for k in os.environ.get('MODEL_SEGMENT_KEYS', 'city,payment_method').split(',') if k]
+MODEL_REGISTRY_MAX_MB = float(os.environ.get('MODEL_REGISTRY_MAX_MB', '512'))
+
+# Promotion gates for background retraining jobs (/api/admin/retrain)
+RETRAIN_MIN_AUC = float(os.environ.get('RETRAIN_MIN_AUC', '0.8'))
+RETRAIN_MAX_AUC_DROP = float(os.environ.get('RETRAIN_MAX_AUC_DROP', '0.01'))
+RETRAIN_LATENCY_BUDGET_MS = float(os.environ.get('RETRAIN_LATENCY_BUDGET_MS', '50'))
+# 'hashed' retrains on the sparse encoding that keeps ip_address and user_id
+RETRAIN_ENCODING = os.environ.get('RETRAIN_ENCODING', 'dense')
+# How often each worker checks whether another worker promoted a new model
+MODEL_RELOAD_CHECK_SECONDS = float(os.environ.get('MODEL_RELOAD_CHECK_SECONDS', '5'))
+
+# Fields every scoring request must carry (matching the training model)
+REQUIRED_FIELDS = [
+    'amount', 'payment_method', 'category', 'gender', 'city', 'device',
+    'shipping_address', 'browser_info', 'age', 'hour', 'day_of_week', 
+    'is_weekend', 'is_new_device', 'is_different_city', 'failed_attempts', 
+    'shipping_billing_match', 'account_age', 'transaction_frequency'
+]
+
+# Dataset behind the dashboard statistics and analytics cube
+DATASET_PATH = '../data/sophisticated_indian_dataset.csv'
+
+# SQLite log of every scored transaction, backing the flagged-transactions API
+PREDICTION_DB = os.environ.get('PREDICTION_DB', '../data/predictions.db')
+# Largest page /api/flagged returns
+FLAGGED_PAGE_MAX = 500
+
+# Joined chargeback/feedback labels are appended here as CSV partitions for retraining
+LABELED_DATA_DIR = os.environ.get('LABELED_DATA_DIR', '../data/labeled')
+
+# Similar-case lookup over confirmed fraud rows of the dataset plus transactions
+# the model flagged as fraud; NEIGHBOUR_PROBES lists are scanned per query
+NEIGHBOUR_PROBES = int(os.environ.get('NEIGHBOUR_PROBES', '8'))
+NEIGHBOURS_MAX = 100
+
+# State shared by all workers on a node: 'local' keeps it in this process,
+# 'unix:/tmp/fraudguard-state.sock' uses the server started by state_backend.py
+STATE_BACKEND = os.environ.get('STATE_BACKEND', 'local')
+STATE_MAX_KEYS = int(os.environ.get('STATE_MAX_KEYS', '1000000'))
+# Recent scores kept per user
+USER_HISTORY_SIZE = int(os.environ.get('USER_HISTORY_SIZE', '20'))
+USER_HISTORY_TTL_SECONDS = 30 * 86400
+
+# IP/user/device linkage: snapshot written by linkage.py or /api/admin/linkage/snapshot
+LINKAGE_SNAPSHOT = os.environ.get('LINKAGE_SNAPSHOT', '../models/linkage_index.pkl')
+LINKAGE_WINDOW_HOURS = float(os.environ.get('LINKAGE_WINDOW_HOURS', '24'))
+# Accounts seen on one IP or device within the window before it is a risk factor
+LINKAGE_SHARED_USERS = int(os.environ.get('LINKAGE_SHARED_USERS', '3'))
+
+# Known-bad IPs, device ids and user ids as <kind>.blocklist files, written by
+# blocklist.py or /api/admin/blocklists/<kind>; workers pick up replaced files
+# within BLOCKLIST_CHECK_SECONDS
+BLOCKLIST_DIR = os.environ.get('BLOCKLIST_DIR', '../models/blocklists')
+BLOCKLIST_CHECK_SECONDS = float(os.environ.get('BLOCKLIST_CHECK_SECONDS', '5'))
+
+cascade_scorer = None
+model_registry = None
+explainers = None
+analytics_cube = None
+neighbour_index = None
+neighbour_index_lock = threading.Lock()
+
+# Live input drift against the training distribution saved next to the model
 try:
-    import pickle
-    with open('../models/fraud_model.pkl', 'rb') as f:
-        fraud_model = pickle.load(f)
-    with open('../models/scaler.pkl', 'rb') as f:
-        scaler = pickle.load(f)
-    with open('../models/feature_info.pkl', 'rb') as f:
-        feature_info = pickle.load(f)
+    with open(os.path.join(served_dir(MODELS_DIR), 'drift_reference.pkl'), 'rb') as f:
+        drift_reference = pickle.load(f)
+except Exception as e:
+    print(f"No saved drift reference ({e}); building one from {DATASET_PATH}")
+    drift_reference = build_reference(pd.read_csv(DATASET_PATH))
+drift_monitor = DriftMonitor(drift_reference)
+
+state = LocalBackend(max_keys=STATE_MAX_KEYS) if STATE_BACKEND == 'local' else create_backend(STATE_BACKEND)
+if STATE_BACKEND != 'local':
+    metrics.use_backend(state)
+
+# Retries carrying an Idempotency-Key header (or client_transaction_id) get the
+# original response back instead of being scored again
+idempotency_store = IdempotencyStore(
+    state,
+    ttl_seconds=float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400')),
+    lease_seconds=float(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '30'))
+)
+
+# Push channel for dashboards; each client gets a bounded buffer
+live_feed = LiveFeed(buffer_size=int(os.environ.get('FEED_BUFFER_SIZE', '256')))
+
+# Rolling fraud-rate windows, backfilled from the dataset and fed by live scoring
+rolling_windows = RollingWindows()
+try:
+    print(f"Backfilled {rolling_windows.backfill_csv(DATASET_PATH)} transactions into rolling windows")
+except Exception as e:
+    print(f"Error backfilling rolling windows: {e}")
+
+# Linkage index of which IPs, users and device ids transact together
+try:
+    linkage_index = LinkageIndex.load(LINKAGE_SNAPSHOT)
+    print(f"Loaded linkage index from {LINKAGE_SNAPSHOT}")
+except Exception as e:
+    print(f"No linkage snapshot ({e}); building one from {DATASET_PATH}")
+    linkage_index = LinkageIndex(window_seconds=LINKAGE_WINDOW_HOURS * 3600)
+    try:
+        linkage_index.build_csv(DATASET_PATH)
+    except Exception as e:
+        print(f"Error building linkage index: {e}")
+
+blocklists = BlocklistSet(BLOCKLIST_DIR, check_seconds=BLOCKLIST_CHECK_SECONDS)
+
+try:
+    prediction_store = PredictionStore(PREDICTION_DB)
+except Exception as e:
+    print(f"Error opening prediction store: {e}")
+    prediction_store = None
+
+# Load models and preprocessors
+def load_models():
+    """Load the served model and preprocessors and everything derived from them.
+
+    All objects are built first and published together, so reloading after a
+    promotion keeps serving the previous set until the new one is complete.
+    """
+    global fraud_model, scaler, feature_info, xgb_model, model_registry, cascade_scorer, explainers, served_variant
+    # Resolved once, so every file comes from the same release
+    model_dir = served_dir(MODELS_DIR)
+    new_variant = MODEL_VARIANT
+    if not os.path.exists(os.path.join(model_dir, MODEL_FILES[new_variant])):
+        print(f"No {MODEL_FILES[new_variant]} in {model_dir}; serving the stacking model")
+        new_variant = 'stacking'
+    with open(os.path.join(model_dir, MODEL_FILES[new_variant]), 'rb') as f:
+        new_model = pickle.load(f)
+    with open(os.path.join(model_dir, 'scaler.pkl'), 'rb') as f:
+        new_scaler = pickle.load(f)
+    with open(os.path.join(model_dir, 'feature_info.pkl'), 'rb') as f:
+        new_feature_info = pickle.load(f)
     
     # Try to load XGBoost model if it exists
     try:
         with open('../models/xgb_model.pkl', 'rb') as f:
-            xgb_model = pickle.load(f)
+            new_xgb_model = pickle.load(f)
     except:
-        xgb_model = None
+        new_xgb_model = None
+    
+    # Segment and student models are trained on the dense encoding
+    dense = new_feature_info.get('encoding', 'dense') == 'dense'
     
-    print("Models loaded successfully!")
-    print(f"Feature columns: {len(feature_info['feature_columns'])}")
+    new_registry = None
+    registry = ModelRegistry(os.path.join(model_dir, 'segments'), new_model, SEGMENT_KEYS,
+                             max_bytes=int(MODEL_REGISTRY_MAX_MB * 1024 * 1024))
+    if registry.available and not dense:
+        print("Segment models ignored: the served model uses the hashed encoding")
+    elif registry.available:
+        new_registry = registry
+        print(f"Segment models available: {len(registry.available)}")
+    
+    new_cascade = None
+    if SCORING_MODE == 'cascade' and not dense:
+        print("Cascade scoring disabled: the served model uses the hashed encoding")
+    elif SCORING_MODE == 'cascade' and not os.path.exists(os.path.join(model_dir, MODEL_FILES['student'])):
+        print(f"Cascade scoring disabled: no {MODEL_FILES['student']} in {model_dir}")
+    elif SCORING_MODE == 'cascade':
+        with open(os.path.join(model_dir, MODEL_FILES['student']), 'rb') as f:
+            cheap_model = pickle.load(f)
+        new_cascade = CascadeScorer(cheap_model, new_registry or new_model, low=CASCADE_LOW,
+                                    high=CASCADE_HIGH, shadow_rate=CASCADE_SHADOW_RATE)
+    
+    # Attributions come from whichever model scored a row; the global one is built up front
+    new_explainers = ExplainerCache(new_feature_info)
+    _, reason = new_explainers.get(GLOBAL_SEGMENT, lambda: new_model)
+    if reason:
+        print(f"Feature attributions unavailable for the {new_variant} model: {reason}")
+    
+    (fraud_model, scaler, feature_info, xgb_model, model_registry, cascade_scorer, explainers, served_variant) = (
+        new_model, new_scaler, new_feature_info, new_xgb_model, new_registry, new_cascade, new_explainers,
+        new_variant)
+    
+    print(f"Models loaded successfully from {model_dir} (variant: {served_variant})")
+    print(f"Feature columns: {feature_info.get('n_features', len(feature_info['feature_columns']))} "
+          f"({feature_info.get('encoding', 'dense')} encoding)")
+    print(f"Scoring mode: {SCORING_MODE}")
+
+try:
+    load_models()
 except Exception as e:
     print(f"Error loading models: {e}")
     fraud_model = None
@@ -36,45 +294,394 @@ except Exception as e:
     feature_info = None
     xgb_model = None
 
-def preprocess_transaction(transaction_data):
-    """Preprocess transaction data for prediction"""
+# Promotions bump a generation counter in the shared state so every worker reloads
+loaded_model_generation = state.get('models:generation') or 0
+next_generation_check = 0.0
+
+def reload_models():
+    """Switch this worker to the served model set and the state derived from it"""
+    global drift_monitor, neighbour_index
+    load_models()
+    with open(os.path.join(served_dir(MODELS_DIR), 'drift_reference.pkl'), 'rb') as f:
+        drift_monitor = DriftMonitor(pickle.load(f))
+    # Stored case vectors are in the previous model's encoding; rebuild on next use
+    with neighbour_index_lock:
+        neighbour_index = None
+
+def reload_promoted_models():
+    """Load freshly promoted model files in this worker and tell the others"""
+    global loaded_model_generation
+    reload_models()
+    loaded_model_generation = state.incr('models:generation')
+
+retrain_runner = RetrainRunner(
+    MODELS_DIR,
+    on_promote=reload_promoted_models,
+    min_auc=RETRAIN_MIN_AUC,
+    max_auc_drop=RETRAIN_MAX_AUC_DROP,
+    latency_budget_ms=RETRAIN_LATENCY_BUDGET_MS,
+    nice=int(os.environ.get('RETRAIN_NICE', '10')),
+    memory_limit_mb=int(os.environ.get('RETRAIN_MEMORY_LIMIT_MB', '4096')),
+    cpu_limit_seconds=int(os.environ.get('RETRAIN_CPU_LIMIT_SECONDS', '3600')),
+    encoding=RETRAIN_ENCODING
+)
+
+@app.before_request
+def follow_model_promotions():
+    global loaded_model_generation, next_generation_check
+    now = time.monotonic()
+    if now < next_generation_check:
+        return
+    next_generation_check = now + MODEL_RELOAD_CHECK_SECONDS
     try:
-        # Create DataFrame from input
-        df = pd.DataFrame([transaction_data])
-        
-        # Map API fields to training model fields
-        if 'city' in df.columns:
-            df['country'] = df['city']  # Map city to country for training model
-            df = df.drop('city', axis=1)
-        
-        # Apply the same preprocessing as training
-        # Use the same categorical columns as in training
-        categorical_columns = feature_info['categorical_columns']
-        
-        # Apply one-hot encoding using get_dummies (same as training)
-        X_encoded = pd.get_dummies(df, columns=categorical_columns, drop_first=True)
-        
-        # Ensure all expected features are present (add missing columns with 0)
-        expected_features = feature_info['feature_columns']
-        
-        for col in expected_features:
-            if col not in X_encoded.columns:
-                X_encoded[col] = 0
-        
-        # Select and order features to match training
-        X = X_encoded[expected_features]
-        
-        # Scale features
-        X_scaled = scaler.transform(X)
-        
-        return X_scaled
+        generation = state.get('models:generation') or 0
+        if generation != loaded_model_generation:
+            reload_models()
+            loaded_model_generation = generation
+    except Exception as e:
+        print(f"Error reloading promoted models: {e}")
+
+@app.before_request
+def admit_request():
+    priority_class = ADMISSION_ROUTES.get(request.url_rule.rule) if request.url_rule else None
+    if admission is None or priority_class is None or request.method == 'OPTIONS':
+        return None
+    try:
+        g.admission = (priority_class, admission.acquire(priority_class))
+    except Overloaded as e:
+        response = jsonify({'error': 'Server overloaded, retry later', 'reason': e.reason})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+@app.teardown_request
+def release_admission(error):
+    slot = g.pop('admission', None)
+    if slot is not None:
+        admission.release(*slot)
+
+@app.before_request
+def start_profiling():
+    if profiler.enabled and not request.path.startswith(UNPROFILED_PREFIXES):
+        g.profile_session = profiler.start_request()
+
+@app.after_request
+def finish_profiling(response):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        profiler.finish_request(session, {
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode(),
+            'status': response.status_code
+        })
+    return response
+
+@app.teardown_request
+def abandon_profiling(error):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        profiler.finish_request(session, {
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode(),
+            'status': 500,
+            'error': str(error)
+        })
+
+def admin_authorized():
+    return ADMIN_TOKEN is None or request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+def get_analytics_cube():
+    """Build the aggregate cube on first use and keep it in memory"""
+    global analytics_cube
+    if analytics_cube is None:
+        analytics_cube = AggregateCube(pd.read_csv(DATASET_PATH))
+    return analytics_cube
+
+def get_neighbour_index():
+    """Build the fraud-case index on first use from the dataset and the prediction log"""
+    global neighbour_index
+    with neighbour_index_lock:
+        if neighbour_index is None:
+            df = pd.read_csv(DATASET_PATH)
+            frauds = df[df['is_fraud'] == 1]
+            dataset_name = os.path.basename(DATASET_PATH)
+            parts = [(similarity_vectors(preprocess_transactions(frauds.drop(columns=['is_fraud']).to_dict('records')),
+                                         feature_info),
+                      [f"{dataset_name}:{t}" for t in frauds['transaction_id']], dataset_name)]
+            if prediction_store is not None:
+                for batch in prediction_store.iter_payloads(fraud_only=True):
+                    parts.append((similarity_vectors(preprocess_transactions([payload for _, payload in batch]),
+                                                     feature_info),
+                                  [transaction_id for transaction_id, _ in batch], 'prediction_log'))
+            
+            index = IVFIndex(n_probe=NEIGHBOUR_PROBES)
+            index.train(np.vstack([vectors for vectors, _, _ in parts]))
+            for vectors, ids, source in parts:
+                index.add(vectors, ids, source)
+            neighbour_index = index
+        return neighbour_index
+
+def preprocess_transactions(transactions):
+    """Preprocess a list of transactions for prediction"""
+    try:
+        return encode_frame(pd.DataFrame(transactions), feature_info, scaler)
     except Exception as e:
         print(f"Preprocessing error: {e}")
         raise e
 
+def preprocess_transaction(transaction_data):
+    """Preprocess transaction data for prediction"""
+    return preprocess_transactions([transaction_data])
+
+def score_transactions(X_processed, transactions):
+    """Return fraud probabilities, the model stage and the model segment for each row"""
+    if cascade_scorer is not None:
+        return cascade_scorer.score(X_processed, transactions)
+    start = time.perf_counter()
+    if model_registry is not None:
+        probabilities, segments = model_registry.predict_proba_routed(X_processed, transactions)
+    else:
+        probabilities = fraud_model.predict_proba(X_processed)[:, 1]
+        segments = np.full(len(probabilities), 'global', dtype=object)
+    metrics.observe(f'model.{served_variant}', time.perf_counter() - start)
+    return probabilities, np.full(len(probabilities), served_variant), segments
+
+def explain_transactions(X_processed, transactions, stages, segments):
+    """Field-level feature contributions from the model that scored each row.
+
+    Rows are grouped by that model: the cascade's cheap stage, a segment
+    model or the global model. A row whose model has no attribution method
+    gets an unavailable marker with the reason.
+    """
+    cache, registry, cascade = explainers, model_registry, cascade_scorer
+    if cache is None:
+        return [unavailable('Models not loaded')] * X_processed.shape[0]
+    groups = {}
+    for i, (stage, segment) in enumerate(zip(stages, segments)):
+        if stage == 'cheap':
+            key = 'cheap'
+        elif segment is not None and segment != GLOBAL_SEGMENT and registry is not None:
+            key = segment
+        else:
+            key = GLOBAL_SEGMENT
+        groups.setdefault(key, []).append(i)
+
+    def model_for(key, transaction):
+        if key == 'cheap':
+            return lambda: cascade.cheap_model
+        if key == GLOBAL_SEGMENT:
+            return lambda: fraud_model
+        return lambda: registry.get(registry.segment_for(transaction)[0])
+
+    results = [None] * X_processed.shape[0]
+    start = time.perf_counter()
+    for key, rows in groups.items():
+        explainer, reason = cache.get(key, model_for(key, transactions[rows[0]]))
+        if explainer is None:
+            for i in rows:
+                results[i] = unavailable(reason)
+            continue
+        contributions, computed = explainer.explain(X_processed[rows])
+        metrics.incr('explain.cache_hits', len(contributions) - computed)
+        metrics.incr('explain.computed', computed)
+        for i, c in zip(rows, contributions):
+            results[i] = explainer.format(c)
+    metrics.observe('explain.latency', time.perf_counter() - start)
+    return results
+
+def wants_explanation():
+    """Explanations are opt-in per request with ?explain=true"""
+    return request.args.get('explain', 'false').lower() in ('1', 'true', 'yes')
+
+def record_scored(transactions, results, X_processed):
+    """Feed freshly scored transactions into the live aggregates and prediction log.
+
+    X_processed is None for blocklisted transactions, which are not encoded.
+    """
+    now = time.time()
+    rolling_windows.add_many(
+        np.full(len(transactions), now),
+        [r['is_fraud'] for r in results],
+        [float(t['amount']) for t in transactions]
+    )
+    if prediction_store is not None:
+        prediction_store.add_many(transactions, results, scored_at=now)
+    live_feed.publish_scored(transactions, results)
+    start = time.perf_counter()
+    for transaction in transactions:
+        drift_monitor.update(transaction)
+    metrics.observe('drift.update', time.perf_counter() - start)
+    linkage_index.add_many(transactions, np.full(len(transactions), now))
+    state.execute_many([
+        ('ring_push', (f"user:{t['user_id']}:recent", {
+            'transaction_id': r['transaction_id'],
+            'scored_at': now,
+            'amount': float(t['amount']),
+            'fraud_probability': r['fraud_probability'],
+            'risk_level': r['risk_level'],
+        }, USER_HISTORY_SIZE, USER_HISTORY_TTL_SECONDS))
+        for t, r in zip(transactions, results) if t.get('user_id') is not None
+    ])
+    # A promotion may drop the index concurrently; add to the one read under the lock
+    with neighbour_index_lock:
+        index = neighbour_index
+    if index is not None and X_processed is not None:
+        fraud_rows = [i for i, r in enumerate(results) if r['is_fraud']]
+        index.add(similarity_vectors(X_processed[fraud_rows], feature_info), [results[i]['transaction_id'] for i in fraud_rows],
+                  'prediction_log')
+
+def linkage_features(transaction):
+    """Linkage counters for a transaction, read before it is added to the index"""
+    start = time.perf_counter()
+    features = linkage_index.features(transaction)
+    metrics.observe('linkage.features', time.perf_counter() - start)
+    return features
+
+def linkage_risk_factors(features):
+    """Risk factors for IPs and devices shared across many accounts"""
+    window = f'{LINKAGE_WINDOW_HOURS:g}h'
+    risk_factors = []
+    if features.get('ip_distinct_users', 0) >= LINKAGE_SHARED_USERS:
+        risk_factors.append(f'IP address used by {features["ip_distinct_users"]} accounts in {window}')
+    if features.get('device_distinct_users', 0) >= LINKAGE_SHARED_USERS:
+        risk_factors.append(f'Device used by {features["device_distinct_users"]} accounts in {window}')
+    if features.get('cluster_users', 0) >= 2 * LINKAGE_SHARED_USERS:
+        risk_factors.append(f'Linked to a cluster of {features["cluster_users"]} accounts')
+    return risk_factors
+
+def missing_field(data):
+    """Return the first required field absent from a transaction, if any"""
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return field
+    return None
+
+def check_blocklists(transaction):
+    """Blocklists the transaction's IP, device id or user id appear on"""
+    start = time.perf_counter()
+    hits = blocklists.check(transaction)
+    metrics.observe('blocklist.check', time.perf_counter() - start)
+    return hits
+
+def blocked_response(transaction, hits):
+    """Result for a blocklisted transaction, which the model never sees"""
+    metrics.incr('blocklist.short_circuited')
+    result = {
+        'is_fraud': True,
+        'fraud_probability': 100.0,
+        'xgb_probability': 100.0,
+        'risk_level': 'High',
+        'risk_factors': [f"Blocklisted {hit['field']}: {transaction[hit['field']]}" for hit in hits],
+        'scoring_stage': 'blocklist',
+        'model_segment': None,
+        'blocklist': hits,
+        'transaction_id': new_transaction_id(),
+        'timestamp': datetime.now().isoformat()
+    }
+    if transaction.get('client_transaction_id') is not None:
+        result['client_transaction_id'] = transaction['client_transaction_id']
+    return result
+
+def get_risk_level(fraud_probability):
+    """Map a fraud probability onto the Low/Medium/High risk bands"""
+    if fraud_probability > 0.7:
+        return 'High'
+    elif fraud_probability > 0.3:
+        return 'Medium'
+    return 'Low'
+
+def analyze_risk_factors(data):
+    """Rule-based risk factors shown alongside the model score"""
+    risk_factors = []
+    
+    # Transaction amount analysis (multiple thresholds)
+    if data['amount'] > 200000:
+        risk_factors.append('Very high transaction amount (>₹2L)')
+    elif data['amount'] > 100000:
+        risk_factors.append('High transaction amount (>₹1L)')
+    elif data['amount'] > 50000:
+        risk_factors.append('Above average transaction amount (>₹50K)')
+    elif data['amount'] < 10:
+        risk_factors.append('Unusually low transaction amount')
+    
+    # Payment method risk analysis (Indian context)
+    high_risk_methods = ['wallet', 'cash']
+    medium_risk_methods = ['net_banking']
+    if data['payment_method'] in high_risk_methods:
+        risk_factors.append(f'Higher risk payment method: {data["payment_method"]}')
+    elif data['payment_method'] in medium_risk_methods:
+        risk_factors.append(f'Medium risk payment method: {data["payment_method"]}')
+    
+    # Time-based analysis
+    if data['hour'] < 5 or data['hour'] > 23:
+        risk_factors.append('Late night/early morning transaction')
+    elif data['hour'] >= 22 or data['hour'] <= 6:
+        risk_factors.append('Off-hours transaction')
+    
+    # Weekend analysis
+    if data['is_weekend']:
+        risk_factors.append('Weekend transaction')
+    
+    # Device and location analysis
+    if data['is_new_device']:
+        risk_factors.append('Transaction from new/unrecognized device')
+    if data['is_different_city']:
+        risk_factors.append('Transaction from different city than usual')
+    
+    # Authentication and security analysis
+    if data['failed_attempts'] > 0:
+        if data['failed_attempts'] > 3:
+            risk_factors.append(f'Multiple failed authentication attempts ({data["failed_attempts"]})')
+        else:
+            risk_factors.append('Previous failed authentication attempts')
+    
+    # Address verification
+    if not data['shipping_billing_match']:
+        risk_factors.append('Shipping and billing address mismatch')
+    
+    # Account analysis
+    if data['account_age'] < 7:
+        risk_factors.append('Very new account (less than 1 week)')
+    elif data['account_age'] < 30:
+        risk_factors.append('New account (less than 1 month)')
+    elif data['account_age'] < 90:
+        risk_factors.append('Recently created account (less than 3 months)')
+    
+    # Transaction frequency analysis
+    if data['transaction_frequency'] > 20:
+        risk_factors.append('Unusually high transaction frequency')
+    elif data['transaction_frequency'] < 1:
+        risk_factors.append('Inactive account with sudden transaction')
+    
+    # Category-based risk analysis
+    high_risk_categories = ['electronics', 'jewelry', 'gaming']
+    if data['category'] in high_risk_categories:
+        risk_factors.append(f'High-risk category: {data["category"]}')
+    
+    # Age-based analysis
+    if data['age'] < 18:
+        risk_factors.append('Minor account holder')
+    elif data['age'] > 80:
+        risk_factors.append('Senior citizen - higher vulnerability risk')
+    
+    # Device type analysis
+    if data['device'] == 'desktop':
+        risk_factors.append('Desktop transaction (less common for mobile payments)')
+    
+    # Browser-based risk (if available)
+    if 'browser_info' in data:
+        uncommon_browsers = ['IE', 'Opera', 'Other']
+        if any(browser in data['browser_info'] for browser in uncommon_browsers):
+            risk_factors.append('Uncommon browser used')
+    
+    return risk_factors
+
 @app.route('/api/predict', methods=['POST'])
 def predict_fraud():
     """Predict fraud for a transaction"""
+    idempotency_key = None
     try:
         if not fraud_model:
             return jsonify({'error': 'Model not loaded'}), 500
@@ -82,117 +689,56 @@ def predict_fraud():
         data = request.json
         
         # Validate required fields (matching the training model)
-        required_fields = [
-            'amount', 'payment_method', 'category', 'gender', 'city', 'device',
-            'shipping_address', 'browser_info', 'age', 'hour', 'day_of_week', 
-            'is_weekend', 'is_new_device', 'is_different_city', 'failed_attempts', 
-            'shipping_billing_match', 'account_age', 'transaction_frequency'
-        ]
+        field = missing_field(data)
+        if field:
+            return jsonify({'error': f'Missing field: {field}'}), 400
+        
+        # Replay the stored response for a retried request
+        client_transaction_id = data.get('client_transaction_id')
+        idempotency_key = request.headers.get('Idempotency-Key') or client_transaction_id
+        if idempotency_key:
+            idempotency_key = str(idempotency_key)
+            try:
+                stored = idempotency_store.begin(idempotency_key, fingerprint(data))
+            except IdempotencyConflict as e:
+                idempotency_key = None
+                return jsonify({'error': str(e)}), 422
+            except TimeoutError as e:
+                idempotency_key = None
+                return jsonify({'error': str(e)}), 409
+            if stored is not None:
+                metrics.incr('idempotency.replayed')
+                replay = jsonify(stored)
+                replay.headers['Idempotent-Replayed'] = 'true'
+                return replay
         
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing field: {field}'}), 400
+        # Known-bad IPs, devices and users are flagged before model evaluation
+        hits = check_blocklists(data)
+        if hits:
+            response = blocked_response(data, hits)
+            record_scored([data], [response], None)
+            if idempotency_key:
+                idempotency_store.complete(idempotency_key, response)
+            return jsonify(response)
         
         # Preprocess transaction
         X_processed = preprocess_transaction(data)
         
         # Make prediction
-        fraud_probability = fraud_model.predict_proba(X_processed)[0][1]
-        is_fraud = fraud_model.predict(X_processed)[0]
+        probabilities, stages, segments = score_transactions(X_processed, [data])
+        fraud_probability = float(probabilities[0])
+        is_fraud = fraud_probability > 0.5
         
         # Get XGBoost prediction for comparison (skip due to feature mismatch)
         # xgb_probability = xgb_model.predict_proba(X_processed)[0][1] if xgb_model else fraud_probability
         xgb_probability = fraud_probability  # Use main model probability until XGBoost is retrained
         
         # Risk assessment
-        risk_level = 'Low'
-        if fraud_probability > 0.7:
-            risk_level = 'High'
-        elif fraud_probability > 0.3:
-            risk_level = 'Medium'
+        risk_level = get_risk_level(fraud_probability)
         
         # Comprehensive risk factors analysis
-        risk_factors = []
-        
-        # Transaction amount analysis (multiple thresholds)
-        if data['amount'] > 200000:
-            risk_factors.append('Very high transaction amount (>₹2L)')
-        elif data['amount'] > 100000:
-            risk_factors.append('High transaction amount (>₹1L)')
-        elif data['amount'] > 50000:
-            risk_factors.append('Above average transaction amount (>₹50K)')
-        elif data['amount'] < 10:
-            risk_factors.append('Unusually low transaction amount')
-        
-        # Payment method risk analysis (Indian context)
-        high_risk_methods = ['wallet', 'cash']
-        medium_risk_methods = ['net_banking']
-        if data['payment_method'] in high_risk_methods:
-            risk_factors.append(f'Higher risk payment method: {data["payment_method"]}')
-        elif data['payment_method'] in medium_risk_methods:
-            risk_factors.append(f'Medium risk payment method: {data["payment_method"]}')
-        
-        # Time-based analysis
-        if data['hour'] < 5 or data['hour'] > 23:
-            risk_factors.append('Late night/early morning transaction')
-        elif data['hour'] >= 22 or data['hour'] <= 6:
-            risk_factors.append('Off-hours transaction')
-        
-        # Weekend analysis
-        if data['is_weekend']:
-            risk_factors.append('Weekend transaction')
-        
-        # Device and location analysis
-        if data['is_new_device']:
-            risk_factors.append('Transaction from new/unrecognized device')
-        if data['is_different_city']:
-            risk_factors.append('Transaction from different city than usual')
-        
-        # Authentication and security analysis
-        if data['failed_attempts'] > 0:
-            if data['failed_attempts'] > 3:
-                risk_factors.append(f'Multiple failed authentication attempts ({data["failed_attempts"]})')
-            else:
-                risk_factors.append('Previous failed authentication attempts')
-        
-        # Address verification
-        if not data['shipping_billing_match']:
-            risk_factors.append('Shipping and billing address mismatch')
-        
-        # Account analysis
-        if data['account_age'] < 7:
-            risk_factors.append('Very new account (less than 1 week)')
-        elif data['account_age'] < 30:
-            risk_factors.append('New account (less than 1 month)')
-        elif data['account_age'] < 90:
-            risk_factors.append('Recently created account (less than 3 months)')
-        
-        # Transaction frequency analysis
-        if data['transaction_frequency'] > 20:
-            risk_factors.append('Unusually high transaction frequency')
-        elif data['transaction_frequency'] < 1:
-            risk_factors.append('Inactive account with sudden transaction')
-        
-        # Category-based risk analysis
-        high_risk_categories = ['electronics', 'jewelry', 'gaming']
-        if data['category'] in high_risk_categories:
-            risk_factors.append(f'High-risk category: {data["category"]}')
-        
-        # Age-based analysis
-        if data['age'] < 18:
-            risk_factors.append('Minor account holder')
-        elif data['age'] > 80:
-            risk_factors.append('Senior citizen - higher vulnerability risk')
-        
-        # Device type analysis
-        if data['device'] == 'desktop':
-            risk_factors.append('Desktop transaction (less common for mobile payments)')
-        
-        # Browser-based risk (if available)
-        if 'browser_info' in data:
-            uncommon_browsers = ['IE', 'Opera', 'Other']
-            if any(browser in data['browser_info'] for browser in uncommon_browsers):
-                risk_factors.append('Uncommon browser used')
+        linkage = linkage_features(data)
+        risk_factors = analyze_risk_factors(data) + linkage_risk_factors(linkage)
         
         response = {
             'is_fraud': bool(is_fraud),
@@ -200,12 +746,174 @@ def predict_fraud():
             'xgb_probability': round(xgb_probability * 100, 2),
             'risk_level': risk_level,
             'risk_factors': risk_factors,
-            'transaction_id': f"TXN{random.randint(1000, 9999)}",
+            'scoring_stage': str(stages[0]),
+            'model_segment': segments[0],
+            'linkage': linkage,
+            'transaction_id': new_transaction_id(),
             'timestamp': datetime.now().isoformat()
         }
+        if client_transaction_id is not None:
+            response['client_transaction_id'] = client_transaction_id
+        
+        if wants_explanation():
+            response['feature_contributions'] = explain_transactions(X_processed, [data], stages, segments)[0]
+        
+        record_scored([data], [response], X_processed)
+        if idempotency_key:
+            idempotency_store.complete(idempotency_key, response)
         
         return jsonify(response)
         
+    except Exception as e:
+        if idempotency_key:
+            idempotency_store.abandon(idempotency_key)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_fraud_batch():
+    """Predict fraud for a list of transactions in one model call"""
+    owned_keys = []
+    try:
+        if not fraud_model:
+            return jsonify({'error': 'Model not loaded'}), 500
+        
+        data = request.json
+        transactions = data.get('transactions', []) if isinstance(data, dict) else data
+        if not transactions:
+            return jsonify({'error': 'No transactions supplied'}), 400
+        
+        for i, transaction in enumerate(transactions):
+            field = missing_field(transaction)
+            if field:
+                return jsonify({'error': f'Missing field: {field} (transaction {i})'}), 400
+        
+        keys = [t.get('client_transaction_id') for t in transactions]
+        present = [str(k) for k in keys if k is not None]
+        if len(present) != len(set(present)):
+            return jsonify({'error': 'Duplicate client_transaction_id in batch'}), 400
+        
+        # Rows with a client_transaction_id seen before are replayed, the rest are scored;
+        # a conflict releases the keys claimed so far so the corrected batch can be retried
+        claims = [(str(key), fingerprint(transaction)) if key is not None else (None, None)
+                  for transaction, key in zip(transactions, keys)]
+        try:
+            results = idempotency_store.begin_many(claims)
+        except IdempotencyConflict as e:
+            return jsonify({'error': str(e)}), 422
+        except TimeoutError as e:
+            return jsonify({'error': str(e)}), 409
+        owned_keys = [key for (key, _), stored in zip(claims, results) if key is not None and stored is None]
+        metrics.incr('idempotency.replayed', sum(r is not None for r in results))
+        
+        # Blocklisted rows are flagged without being scored
+        blocked = []
+        for i, transaction in enumerate(transactions):
+            hits = check_blocklists(transaction) if results[i] is None else None
+            if hits:
+                results[i] = blocked_response(transaction, hits)
+                blocked.append(i)
+        if blocked:
+            record_scored([transactions[i] for i in blocked], [results[i] for i in blocked], None)
+            for i in blocked:
+                if results[i].get('client_transaction_id') is not None:
+                    idempotency_store.complete(str(results[i]['client_transaction_id']), results[i])
+        
+        rows = [i for i, result in enumerate(results) if result is None]
+        if rows:
+            to_score = [transactions[i] for i in rows]
+            X_processed = preprocess_transactions(to_score)
+            probabilities, stages, segments = score_transactions(X_processed, to_score)
+            
+            timestamp = datetime.now().isoformat()
+            scored = []
+            for transaction, fraud_probability, stage, segment in zip(to_score, probabilities, stages, segments):
+                fraud_probability = float(fraud_probability)
+                linkage = linkage_features(transaction)
+                result = {
+                    'is_fraud': fraud_probability > 0.5,
+                    'fraud_probability': round(fraud_probability * 100, 2),
+                    'risk_level': get_risk_level(fraud_probability),
+                    'risk_factors': analyze_risk_factors(transaction) + linkage_risk_factors(linkage),
+                    'scoring_stage': str(stage),
+                    'model_segment': segment,
+                    'linkage': linkage,
+                    'transaction_id': new_transaction_id(),
+                    'timestamp': timestamp
+                }
+                if transaction.get('client_transaction_id') is not None:
+                    result['client_transaction_id'] = transaction['client_transaction_id']
+                scored.append(result)
+            
+            if wants_explanation():
+                for result, explanation in zip(scored, explain_transactions(X_processed, to_score, stages, segments)):
+                    result['feature_contributions'] = explanation
+            
+            record_scored(to_score, scored, X_processed)
+            for i, result in zip(rows, scored):
+                results[i] = result
+                if result.get('client_transaction_id') is not None:
+                    idempotency_store.complete(str(result['client_transaction_id']), result)
+        
+        return jsonify({'results': results, 'count': len(results)})
+        
+    except Exception as e:
+        for key in owned_keys:
+            idempotency_store.abandon(key)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict/arrow', methods=['POST'])
+def predict_fraud_arrow():
+    """Score an Arrow IPC stream of transactions and return the scores as one.
+
+    Meant for bulk internal callers: the columns go straight into the
+    encoder and model without per-row objects. Rows are scored only; they
+    are not logged, linked or added to the live aggregates and get no
+    transaction ids or risk factors, which /api/predict/batch provides.
+    """
+    if not columnar.available():
+        return jsonify({'error': 'Arrow scoring needs pyarrow installed'}), 501
+    if not fraud_model:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    try:
+        table = columnar.read_table(request.get_data())
+    except Exception as e:
+        return jsonify({'error': f'Invalid Arrow IPC stream: {e}'}), 400
+    if table.num_rows == 0:
+        return jsonify({'error': 'No transactions supplied'}), 400
+    missing = [field for field in REQUIRED_FIELDS if field not in table.column_names]
+    if missing:
+        return jsonify({'error': f'Missing field: {missing[0]}'}), 400
+    
+    try:
+        start = time.perf_counter()
+        columns = columnar.table_columns(table)
+        X_processed = encode_columns(columns, table.num_rows, feature_info, scaler)
+        metrics.observe('arrow.encode', time.perf_counter() - start)
+        blocked = blocklists.check_columns(columns, table.num_rows)
+        
+        # Segment routing reads its key fields per row, so only those columns become rows
+        transactions = None
+        if model_registry is not None or cascade_scorer is not None:
+            transactions = table.select([k for k in SEGMENT_KEYS if k in table.column_names]).to_pylist()
+        probabilities, stages, segments = score_transactions(X_processed, transactions)
+        metrics.incr('arrow.rows', table.num_rows)
+        if blocked.any():
+            # Scored with the batch, then overridden like /api/predict's short circuit
+            probabilities = np.where(blocked, 1.0, probabilities)
+            stages = np.where(blocked, 'blocklist', stages.astype(object))
+        
+        results = {
+            'is_fraud': probabilities > 0.5,
+            'fraud_probability': np.round(probabilities * 100, 2),
+            'risk_level': (columnar.risk_level_codes(probabilities), list(columnar.RISK_LEVELS)),
+            'scoring_stage': tuple(pd.factorize(stages)),
+            'model_segment': tuple(pd.factorize(segments)),
+        }
+        if 'client_transaction_id' in table.column_names:
+            results['client_transaction_id'] = table.column('client_transaction_id')
+        return Response(columnar.write_results(results), mimetype=columnar.ARROW_STREAM_MIMETYPE)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -214,7 +922,7 @@ def get_stats():
     """Get dashboard statistics from actual dataset"""
     try:
         # Load the actual dataset
-        df = pd.read_csv('../data/sophisticated_indian_dataset.csv')
+        df = pd.read_csv(DATASET_PATH)
         
         # Calculate real statistics
         total_transactions = len(df)
@@ -269,15 +977,12 @@ def get_stats():
         
         # Calculate statistics by payment method
         payment_stats = []
-        for method in df['payment_method'].unique():
-            method_df = df[df['payment_method'] == method]
-            method_fraud = method_df['is_fraud'].sum()
-            method_total = len(method_df)
+        for row in get_analytics_cube().query(group_by=['payment_method']):
             payment_stats.append({
-                'method': method,
-                'total': method_total,
-                'fraud': method_fraud,
-                'fraud_rate': (method_fraud / method_total) * 100 if method_total > 0 else 0
+                'method': row['payment_method'],
+                'total': row['count'],
+                'fraud': row['fraud_count'],
+                'fraud_rate': row['fraud_rate']
             })
         
         response = {
@@ -297,12 +1002,348 @@ def get_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/flagged', methods=['GET'])
+def list_flagged_transactions():
+    """Flagged (Medium/High risk) predictions, newest first, with cursor pagination"""
+    try:
+        if prediction_store is None:
+            return jsonify({'error': 'Prediction store not available'}), 500
+        
+        args = request.args
+        try:
+            limit = int(args.get('limit', 50))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= FLAGGED_PAGE_MAX:
+            return jsonify({'error': f'limit must be an integer from 1 to {FLAGGED_PAGE_MAX}'}), 400
+        start = args.get('start')
+        end = args.get('end')
+        
+        transactions, next_cursor = prediction_store.list_flagged(
+            limit=limit,
+            cursor=args.get('cursor'),
+            risk_level=args.get('risk_level'),
+            min_probability=float(args['min_probability']) if 'min_probability' in args else None,
+            max_probability=float(args['max_probability']) if 'max_probability' in args else None,
+            start=datetime.fromisoformat(start).timestamp() if start else None,
+            end=datetime.fromisoformat(end).timestamp() if end else None,
+            payment_method=args.get('payment_method'),
+            category=args.get('category')
+        )
+        
+        return jsonify({
+            'transactions': transactions,
+            'nextCursor': next_cursor,
+            'count': len(transactions)
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/cube', methods=['GET'])
+def query_analytics_cube():
+    """Slice or roll up the pre-aggregated cube, e.g. ?category=electronics&group_by=hour,device"""
+    try:
+        cube = get_analytics_cube()
+        group_by = [dim for dim in request.args.get('group_by', '').split(',') if dim]
+        filters = {}
+        for dim in CUBE_DIMENSIONS:
+            if dim in request.args:
+                filters[dim] = cube.parse_value(dim, request.args[dim])
+        
+        return jsonify({
+            'filters': filters,
+            'group_by': group_by,
+            'rows': cube.query(filters, group_by),
+            'dimensions': cube.levels
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/windows', methods=['GET'])
+def query_rolling_windows():
+    """Fraud rate over rolling windows, e.g. ?windows=1h,24h,7d&as_of=2025-12-01T12:00:00"""
+    try:
+        as_of = request.args.get('as_of')
+        as_of = datetime.fromisoformat(as_of).timestamp() if as_of else None
+        windows = request.args.get('windows', '1h,24h,7d').split(',')
+        
+        return jsonify({
+            'windows': {window: rolling_windows.query(parse_duration(window), as_of) for window in windows}
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stream', methods=['GET'])
+def stream_events():
+    """Server-Sent Events feed of scored/flagged transactions and stat deltas, e.g. ?events=flagged,stats"""
+    event_types = [e for e in request.args.get('events', ','.join(EVENT_TYPES)).split(',') if e]
+    unknown = set(event_types) - set(EVENT_TYPES)
+    if unknown:
+        return jsonify({'error': f"Unknown event type(s): {', '.join(sorted(unknown))}"}), 400
+    
+    subscriber = live_feed.subscribe(event_types)
+    return Response(live_feed.stream(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/drift', methods=['GET'])
+def get_drift():
+    """Drift scores of live scoring traffic against the training reference"""
+    try:
+        return jsonify(drift_monitor.report())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/linkage', methods=['GET'])
+def get_linkage():
+    """Linkage features for ?ip_address=&user_id=&device_id= plus index statistics"""
+    lookup = {field: request.args[field] for field in ('ip_address', 'user_id', 'device_id') if field in request.args}
+    if not lookup:
+        return jsonify({'error': 'Supply at least one of ip_address, user_id, device_id'}), 400
+    return jsonify({
+        'features': linkage_features(lookup),
+        'index': linkage_index.stats()
+    })
+
+@app.route('/api/blocklists', methods=['GET'])
+def get_blocklists():
+    """Entries, size and file details of each loaded blocklist"""
+    blocklists.refresh()
+    return jsonify({'directory': BLOCKLIST_DIR, 'lists': blocklists.stats()})
+
+@app.route('/api/admin/blocklists/<kind>', methods=['POST'])
+def rebuild_blocklist(kind):
+    """Replace a blocklist with the values in the body, one per line.
+
+    The new file is swapped in atomically; this worker uses it immediately
+    and the others within BLOCKLIST_CHECK_SECONDS.
+    """
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if kind not in BLOCKLIST_FIELDS:
+        return jsonify({'error': f"Unknown blocklist: {kind} (expected one of: {', '.join(BLOCKLIST_FIELDS)})"}), 404
+    try:
+        start = time.perf_counter()
+        fp_rate = float(request.args.get('false_positive_rate', 0.001))
+        blocklists.rebuild(kind, request.get_data(as_text=True).splitlines(), fp_rate)
+        return jsonify({
+            'list': kind,
+            'seconds': round(time.perf_counter() - start, 3),
+            **blocklists.stats()[kind]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/linkage/snapshot', methods=['POST'])
+def snapshot_linkage():
+    """Write the linkage index to LINKAGE_SNAPSHOT so a restart resumes from it"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        start = time.perf_counter()
+        linkage_index.save(LINKAGE_SNAPSHOT)
+        return jsonify({
+            'path': LINKAGE_SNAPSHOT,
+            'seconds': round(time.perf_counter() - start, 3),
+            **linkage_index.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def similar_frauds(transaction, exclude_id=None):
+    """Nearest stored fraud cases to a transaction, with ?k= and ?probes="""
+    try:
+        k = int(request.args.get('k', 5))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= NEIGHBOURS_MAX:
+        return jsonify({'error': f'k must be an integer from 1 to {NEIGHBOURS_MAX}'}), 400
+    probes = request.args.get('probes', type=int)
+    if probes is not None and probes < 1:
+        return jsonify({'error': 'probes must be a positive integer'}), 400
+    index = get_neighbour_index()
+    query = similarity_vectors(preprocess_transaction(transaction), feature_info)[0]
+    start = time.perf_counter()
+    neighbours = index.search(query, k=k + 1, n_probe=probes)
+    neighbours = [n for n in neighbours if n['id'] != exclude_id][:k]
+    elapsed = time.perf_counter() - start
+    metrics.observe('neighbours.search', elapsed)
+    return jsonify({
+        'neighbours': neighbours,
+        'search_ms': round(elapsed * 1000, 3),
+        'index': index.stats()
+    })
+
+@app.route('/api/neighbours', methods=['POST'])
+def find_neighbours():
+    """Most similar historical fraud cases to a submitted transaction"""
+    try:
+        if not fraud_model:
+            return jsonify({'error': 'Model not loaded'}), 500
+        data = request.json
+        field = missing_field(data)
+        if field:
+            return jsonify({'error': f'Missing field: {field}'}), 400
+        return similar_frauds(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/neighbours/<transaction_id>', methods=['GET'])
+def find_neighbours_of_transaction(transaction_id):
+    """Most similar historical fraud cases to a previously scored transaction"""
+    try:
+        if not fraud_model:
+            return jsonify({'error': 'Model not loaded'}), 500
+        if prediction_store is None:
+            return jsonify({'error': 'Prediction store unavailable'}), 503
+        payload = prediction_store.get_payload(transaction_id)
+        if payload is None:
+            return jsonify({'error': f'Transaction {transaction_id} not found'}), 404
+        return similar_frauds(payload, exclude_id=transaction_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/recent', methods=['GET'])
+def get_user_recent(user_id):
+    """The user's most recent scored transactions, oldest first, from the shared state backend"""
+    try:
+        return jsonify({'user_id': user_id, 'recent': state.ring_range(f"user:{user_id}:recent")})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/labels', methods=['POST'])
+def ingest_labels():
+    """Attach true labels to logged predictions: a CSV body (transaction_id,is_fraud) or {"labels": [...]}"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if prediction_store is None:
+        return jsonify({'error': 'Prediction store unavailable'}), 503
+    try:
+        if request.is_json:
+            labels = request.json.get('labels', [])
+            chunks = [[(str(label['transaction_id']), parse_label(label['is_fraud'])) for label in labels]]
+        else:
+            chunks = read_label_chunks(request.stream)
+        summary = LabelIngestor(prediction_store, LABELED_DATA_DIR).ingest(chunks)
+        return jsonify({**summary, 'accuracy': live_label_accuracy()})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid labels: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/labels/accuracy', methods=['GET'])
+def get_label_accuracy():
+    """Precision/recall from the live counters and over every stored label"""
+    response = {'live': live_label_accuracy()}
+    if prediction_store is not None:
+        confusion = prediction_store.label_confusion()
+        response['stored'] = accuracy_report({OUTCOMES[key]: count for key, count in confusion.items()})
+    return jsonify(response)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Scoring counters, latency summaries and cascade stage statistics"""
+    snapshot = metrics.snapshot()
+    snapshot['scoring_mode'] = SCORING_MODE
+    snapshot['state_backend'] = STATE_BACKEND
+    snapshot['feed_subscribers'] = live_feed.subscriber_count()
+    if cascade_scorer is not None:
+        snapshot['cascade'] = cascade_scorer.stats()
+    if model_registry is not None:
+        snapshot['model_registry'] = model_registry.stats()
+    if admission is not None:
+        snapshot['admission'] = admission.stats()
+    return jsonify(snapshot)
+
+@app.route('/api/admin/profiler', methods=['GET', 'PUT'])
+def configure_profiler():
+    """Read or change profiler settings at runtime: {"sample_rate": 0.01, "slow_ms": 200}"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        if request.method == 'PUT':
+            settings = request.json or {}
+            profiler.configure(sample_rate=settings.get('sample_rate'), slow_ms=settings.get('slow_ms'))
+        return jsonify({
+            'enabled': profiler.enabled,
+            'sample_rate': profiler.sample_rate,
+            'slow_ms': profiler.slow_ms,
+            'interval_ms': profiler.interval * 1000,
+            'stored_profiles': len(profiler.profiles),
+            'capacity': profiler.profiles.maxlen
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Metadata of the profiles currently held in the ring buffer"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'profiles': profiler.list_profiles()})
+
+@app.route('/api/admin/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile as a call tree (?format=tree) or folded flamegraph stacks (?format=collapsed)"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': f'Profile {profile_id} not found'}), 404
+    
+    output_format = request.args.get('format', 'tree')
+    if output_format == 'collapsed':
+        return Response(profiler.collapsed(profile), mimetype='text/plain')
+    if output_format != 'tree':
+        return jsonify({'error': f'Unknown format: {output_format}'}), 400
+    
+    metadata = {k: v for k, v in profile.items() if k != 'stacks'}
+    return jsonify({**metadata, 'call_tree': profiler.call_tree(profile)})
+
+@app.route('/api/admin/retrain', methods=['GET', 'POST'])
+def retrain_jobs():
+    """POST starts a background retraining job; GET lists recent jobs"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if request.method == 'POST':
+        try:
+            return jsonify(retrain_runner.submit().to_dict()), 202
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 409
+    return jsonify({'jobs': [job.to_dict() for job in retrain_runner.list()]})
+
+@app.route('/api/admin/retrain/<job_id>', methods=['GET'])
+def retrain_job_status(job_id):
+    """Status, validation report and training log tail of one job"""
+    if not admin_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    job = retrain_runner.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify(job.to_dict(log_lines=int(request.args.get('log_lines', 50))))
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
         'models_loaded': all([fraud_model is not None, scaler is not None, feature_info is not None]),
+        'model_variant': served_variant,
+        'scoring_mode': SCORING_MODE,
         'timestamp': datetime.now().isoformat()
     })
 
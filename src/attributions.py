@@ -0,0 +1,248 @@
+"""
+Per-prediction feature attributions for the forest and linear model components
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+from sklearn.linear_model import LogisticRegression
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+
+class ForestPathAttributor:
+    """Decision-path (Saabas) contributions for a RandomForestClassifier.
+
+    Every node's change in class-1 probability relative to its parent is
+    credited to the feature its parent split on. These deltas are laid out
+    once as a sparse (all nodes x features) matrix, so attributing a batch is
+    one decision_path call and one sparse product; summing a row plus the
+    bias reproduces predict_proba exactly.
+    """
+
+    def __init__(self, forest, n_features):
+        blocks = []
+        root_values = []
+        for tree in forest.estimators_:
+            t = tree.tree_
+            counts = t.value[:, 0, :]
+            value = counts[:, 1] / counts.sum(axis=1)
+            parent = np.full(t.node_count, -1)
+            internal = np.flatnonzero(t.children_left >= 0)
+            parent[t.children_left[internal]] = internal
+            parent[t.children_right[internal]] = internal
+
+            nodes = np.flatnonzero(parent >= 0)
+            delta = value[nodes] - value[parent[nodes]]
+            blocks.append(sparse.csr_matrix(
+                (delta, (nodes, t.feature[parent[nodes]])), shape=(t.node_count, n_features)))
+            root_values.append(value[0])
+
+        self.forest = forest
+        self.node_matrix = sparse.vstack(blocks).tocsr() / len(blocks)
+        self.bias = float(np.mean(root_values))
+
+    def contributions(self, X):
+        indicator, _ = self.forest.decision_path(X)
+        return np.asarray((indicator @ self.node_matrix).todense())
+
+
+class LinearAttributor:
+    """coef * x contributions for a LogisticRegression, in log-odds"""
+
+    def __init__(self, model):
+        self.coef = model.coef_[0]
+        self.bias = float(model.intercept_[0])
+
+    def contributions(self, X):
+        if sparse.issparse(X):
+            return np.asarray(X.multiply(self.coef).todense())
+        return np.asarray(X) * self.coef
+
+    def probability_contributions(self, X):
+        """Split p - sigmoid(intercept) across features in proportion to their log-odds share"""
+        logit_parts = self.contributions(X)
+        logit = logit_parts.sum(axis=1)
+        shift = _sigmoid(self.bias + logit) - _sigmoid(self.bias)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.where(logit != 0, shift / logit, 0.0)
+        return logit_parts * scale[:, None]
+
+
+class ModelExplainer:
+    """Feature contributions in log-odds for the stacking model and its parts.
+
+    For the stacking model the final logistic regression is linear in the
+    forest probability, the linear-model probability and the passthrough
+    features, so each base model's attributions are pushed through its meta
+    weight and added to the passthrough term. One-hot columns are summed
+    back into the API field they came from.
+    """
+
+    def __init__(self, model, feature_info, cache_size=4096):
+        feature_columns = feature_info['feature_columns']
+        # Hashed encodings append one fixed-width block per hashed field after the named columns
+        hashed_columns = feature_info.get('hashed_columns', [])
+        hash_width = feature_info['encoder'].hash_width if hashed_columns else 0
+        n_features = len(feature_columns) + len(hashed_columns) * hash_width
+
+        if isinstance(model, StackingClassifier):
+            if not model.passthrough or list(model.stack_method_) != ['predict_proba'] * len(model.estimators_):
+                raise ValueError("Only passthrough stacking on predict_proba is supported")
+            meta = model.final_estimator_
+            if not isinstance(meta, LogisticRegression):
+                raise ValueError("Stacking meta model must be LogisticRegression")
+            self.parts = []
+            for estimator in model.estimators_:
+                self.parts.append(self._base_attributor(estimator, n_features))
+            weights = meta.coef_[0]
+            self.meta_weights = weights[:len(self.parts)]
+            self.passthrough_weights = weights[len(self.parts):]
+            self.bias = float(meta.intercept_[0]) + sum(
+                w * (part.bias if isinstance(part, ForestPathAttributor) else _sigmoid(part.bias))
+                for w, part in zip(self.meta_weights, self.parts))
+        elif isinstance(model, (RandomForestClassifier, LogisticRegression)):
+            self.parts = [self._base_attributor(model, n_features)]
+            self.meta_weights = None
+            self.passthrough_weights = None
+            self.bias = None
+        else:
+            raise ValueError(f"No attribution method for {type(model).__name__}")
+
+        self.model_name = type(model).__name__
+        self.units = 'probability' if isinstance(model, RandomForestClassifier) else 'log-odds'
+        if self.bias is None:
+            self.bias = self.parts[0].bias
+
+        # Matrix summing encoded columns into their API field
+        self.fields = []
+        field_index = {}
+        columns = []
+        for column in feature_columns:
+            field = column
+            for categorical in feature_info['categorical_columns']:
+                if column.startswith(f"{categorical}_"):
+                    field = 'city' if categorical == 'country' else categorical
+                    break
+            if field not in field_index:
+                field_index[field] = len(self.fields)
+                self.fields.append(field)
+            columns.append(field_index[field])
+        for field in hashed_columns:
+            field_index[field] = len(self.fields)
+            self.fields.append(field)
+            columns.extend([field_index[field]] * hash_width)
+        self.field_matrix = sparse.csr_matrix(
+            (np.ones(n_features), (np.arange(n_features), columns)), shape=(n_features, len(self.fields)))
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _base_attributor(estimator, n_features):
+        if isinstance(estimator, RandomForestClassifier):
+            return ForestPathAttributor(estimator, n_features)
+        if isinstance(estimator, LogisticRegression):
+            return LinearAttributor(estimator)
+        raise ValueError(f"No attribution method for {type(estimator).__name__}")
+
+    def _column_contributions(self, X):
+        if self.meta_weights is None:
+            return self.parts[0].contributions(X)
+        total = (X.multiply(self.passthrough_weights).toarray() if sparse.issparse(X)
+                 else np.asarray(X) * self.passthrough_weights)
+        for weight, part in zip(self.meta_weights, self.parts):
+            if isinstance(part, ForestPathAttributor):
+                total = total + weight * part.contributions(X)
+            else:
+                total = total + weight * part.probability_contributions(X)
+        return total
+
+    @staticmethod
+    def _row_key(X, i):
+        if sparse.issparse(X):
+            row = X.getrow(i)
+            return row.indices.tobytes() + row.data.tobytes()
+        return np.ascontiguousarray(X[i]).tobytes()
+
+    def explain(self, X):
+        """Field-level contributions for each row of an encoded, scaled batch"""
+        n = X.shape[0]
+        keys = [self._row_key(X, i) for i in range(n)]
+        results = [None] * n
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+        missing = [i for i in range(n) if results[i] is None]
+
+        if missing:
+            X_missing = X[missing]
+            field_contributions = self.field_matrix.T.dot(self._column_contributions(X_missing).T).T
+            with self._lock:
+                for i, row in zip(missing, field_contributions):
+                    results[i] = row
+                    self._cache[keys[i]] = row
+                    if len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+        return results, len(missing)
+
+    def format(self, contributions, top=None):
+        """Contributions sorted by magnitude, as returned in API responses"""
+        order = np.argsort(-np.abs(contributions))
+        if top:
+            order = order[:top]
+        return {
+            'available': True,
+            'model': self.model_name,
+            'units': self.units,
+            'base_value': round(self.bias, 4),
+            'contributions': [
+                {'feature': self.fields[j], 'contribution': round(float(contributions[j]), 4)}
+                for j in order
+            ],
+        }
+
+
+def unavailable(reason):
+    """API form of a row whose scoring model cannot be explained"""
+    return {'available': False, 'reason': reason}
+
+
+class ExplainerCache:
+    """ModelExplainers for each model that scores rows, built on first use.
+
+    Keys name a model (the global model, a segment, the cascade's cheap
+    stage) and load_model is only called on a miss. The explainers of the
+    max_models most recently used models are kept; a model without an
+    attribution method is remembered with the reason.
+    """
+
+    def __init__(self, feature_info, max_models=16):
+        self.feature_info = feature_info
+        self.max_models = max_models
+        self._explainers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, load_model):
+        """(explainer, None) for a model, or (None, reason) if it cannot be explained"""
+        with self._lock:
+            if key in self._explainers:
+                self._explainers.move_to_end(key)
+                return self._explainers[key]
+        try:
+            entry = (ModelExplainer(load_model(), self.feature_info), None)
+        except ValueError as e:
+            entry = (None, str(e))
+        with self._lock:
+            self._explainers[key] = entry
+            while len(self._explainers) > self.max_models:
+                self._explainers.popitem(last=False)
+        return entry
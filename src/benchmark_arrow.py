@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark Arrow IPC batch scoring against the JSON batch endpoint on the
+bundled datasets
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmark_training import git_revision
+
+# Scoring through the app writes to the prediction log; keep it out of data/.
+# Load shedding is off so the endpoints themselves are measured.
+os.environ.setdefault('PREDICTION_DB', os.path.join(tempfile.mkdtemp(), 'predictions.db'))
+os.environ.setdefault('ADMISSION_MAX_IN_FLIGHT', '0')
+
+import app as api  # noqa: E402
+import columnar  # noqa: E402
+from features import encode_columns, encode_frame  # noqa: E402
+
+
+def request_frame(path, rows):
+    """Dataset rows shaped like scoring requests: city instead of country, every required field present"""
+    df = pd.read_csv(path, nrows=rows).drop(columns=['is_fraud']).rename(columns={'country': 'city'})
+    for field in api.REQUIRED_FIELDS:
+        if field not in df.columns:
+            df[field] = 0
+    return df
+
+
+def arrow_payload(df):
+    sink = pa.BufferOutputStream()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def best_of(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def benchmark(path, client, rows, repeats):
+    name = os.path.basename(path)
+    print(f"\n⏱️  Benchmarking {name}...")
+    df = request_frame(path, rows)
+    n = len(df)
+    json_body = json.dumps({'transactions': df.to_dict('records')})
+    arrow_body = arrow_payload(df)
+
+    # Decode and encode only: the part the columnar path replaces
+    json_decode_s, _ = best_of(
+        lambda: encode_frame(pd.DataFrame(json.loads(json_body)['transactions']), api.feature_info, api.scaler),
+        repeats)
+    arrow_decode_s, _ = best_of(
+        lambda: encode_columns(columnar.table_columns(columnar.read_table(arrow_body)), n,
+                               api.feature_info, api.scaler),
+        repeats)
+
+    # End to end through the endpoints
+    json_s, json_response = best_of(
+        lambda: client.post('/api/predict/batch', data=json_body, content_type='application/json'), repeats)
+    arrow_s, arrow_response = best_of(
+        lambda: client.post('/api/predict/arrow', data=arrow_body, content_type=columnar.ARROW_STREAM_MIMETYPE),
+        repeats)
+    if json_response.status_code != 200 or arrow_response.status_code != 200:
+        raise RuntimeError(f"{name}: JSON {json_response.status_code}, Arrow {arrow_response.status_code}")
+
+    json_probabilities = np.array([r['fraud_probability'] for r in json_response.get_json()['results']])
+    arrow_probabilities = columnar.read_table(arrow_response.data).column('fraud_probability').to_numpy()
+
+    result = {
+        'dataset': name,
+        'rows': n,
+        'json_request_bytes': len(json_body),
+        'arrow_request_bytes': len(arrow_body),
+        'json_decode_encode_rows_per_s': round(n / json_decode_s),
+        'arrow_decode_encode_rows_per_s': round(n / arrow_decode_s),
+        'json_endpoint_rows_per_s': round(n / json_s),
+        'arrow_endpoint_rows_per_s': round(n / arrow_s),
+        'max_probability_difference': round(float(np.abs(json_probabilities - arrow_probabilities).max()), 4),
+    }
+    print(f"   decode+encode: JSON {result['json_decode_encode_rows_per_s']}/s, "
+          f"Arrow {result['arrow_decode_encode_rows_per_s']}/s")
+    print(f"   endpoint: JSON {result['json_endpoint_rows_per_s']}/s, Arrow {result['arrow_endpoint_rows_per_s']}/s "
+          f"(max probability difference {result['max_probability_difference']})")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark Arrow IPC against JSON batch scoring")
+    parser.add_argument("--datasets", default="../data/*.csv", help="glob of bundled datasets")
+    parser.add_argument("--rows", type=int, default=10000, help="rows scored per request")
+    parser.add_argument("--repeats", type=int, default=3, help="best of this many runs")
+    parser.add_argument("--output-dir", default="../benchmarks")
+    args = parser.parse_args()
+
+    client = api.app.test_client()
+
+    print("🏁 Running Arrow vs JSON scoring benchmark...")
+    results = [benchmark(path, client, args.rows, args.repeats) for path in sorted(glob.glob(args.datasets))]
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pyarrow': pa.__version__,
+        },
+        'model_variant': api.served_variant,
+        'encoding': api.feature_info.get('encoding', 'dense'),
+        'rows': args.rows,
+        'repeats': args.repeats,
+        'results': results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"arrow-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved to {output_path}")
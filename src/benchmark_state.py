@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-operation overhead of the state backends against a plain dict
+"""
+
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Process
+
+from benchmark_training import git_revision
+from state_backend import LocalBackend, SocketBackend, StateServer
+
+
+def run_server(address):
+    StateServer(address).serve_forever()
+
+
+def time_per_op(func, n):
+    start = time.perf_counter()
+    for i in range(n):
+        func(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+class DictCounters:
+    """The per-process baseline the backends replace"""
+
+    def __init__(self):
+        self.data = {}
+
+    def incr(self, key, amount=1):
+        self.data[key] = self.data.get(key, 0) + amount
+
+    def get(self, key):
+        return self.data.get(key)
+
+
+def benchmark(name, backend, n, batch):
+    print(f"\n⏱️  Benchmarking {name}...")
+    keys = [f"user:{i % 1000}:count" for i in range(n)]
+    results = {'incr_us': time_per_op(lambda i: backend.incr(keys[i], 1), n),
+               'get_us': time_per_op(lambda i: backend.get(keys[i]), n)}
+    if name != 'dict':
+        results['set_nx_us'] = time_per_op(lambda i: backend.set_nx(f"idempotency:{i}", {'response': None}, 60), n)
+        results['ring_push_us'] = time_per_op(
+            lambda i: backend.ring_push(f"user:{i % 1000}:recent", {'amount': i}, 20), n)
+        batches = max(1, n // batch)
+        results['get_many_per_key_us'] = time_per_op(
+            lambda i: backend.get_many(keys[:batch]), batches) / batch
+        results['incr_many_per_key_us'] = time_per_op(
+            lambda i: backend.incr_many({key: 1 for key in keys[:batch]}), batches) / batch
+    results = {op: round(us, 3) for op, us in results.items()}
+    print('   ' + ', '.join(f"{op} {us}" for op, us in results.items()))
+    return {'backend': name, **results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark state backend operations")
+    parser.add_argument("--ops", type=int, default=50000, help="operations per measurement")
+    parser.add_argument("--batch", type=int, default=100, help="keys per batched call")
+    parser.add_argument("--output-dir", default="../benchmarks")
+    args = parser.parse_args()
+
+    print("🏁 Running state backend benchmark...")
+    results = [
+        benchmark('dict', DictCounters(), args.ops, args.batch),
+        benchmark('local', LocalBackend(), args.ops, args.batch),
+    ]
+
+    address = os.path.join(tempfile.mkdtemp(), 'state.sock')
+    server = Process(target=run_server, args=(address,), daemon=True)
+    server.start()
+    while not os.path.exists(address):
+        time.sleep(0.01)
+    try:
+        results.append(benchmark('unix_socket', SocketBackend(address), args.ops, args.batch))
+    finally:
+        server.terminate()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'ops': args.ops,
+        'batch': args.batch,
+        'results': results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"state-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved to {output_path}")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark the training pipeline stage by stage across datasets and sizes
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline
+from joblib.externals.loky import get_reusable_executor
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# Same features and model as retrain_model.py
+from features import API_FEATURES, CATEGORICAL_COLUMNS
+from stacking_model import build_model
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def children_peak_rss_mb():
+    """Largest peak RSS among parallel fold workers, once they have been shut down and reaped"""
+    get_reusable_executor().shutdown(wait=True)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+class StageTimer:
+    """Wall time of each named stage, and the process's peak RSS once it finished"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.stages[name] = {
+            'seconds': round(time.perf_counter() - start, 4),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        return result
+
+
+def scaled_dataset(path, n_rows, seed=42):
+    """Resample a dataset to n_rows with light numeric jitter so rows are not exact copies"""
+    df = pd.read_csv(path)
+    rng = np.random.default_rng(seed)
+    scaled = df.iloc[rng.integers(0, len(df), n_rows)].reset_index(drop=True)
+    scaled['amount'] = np.clip(scaled['amount'] * rng.lognormal(0, 0.05, n_rows), 1, None)
+    scaled['age'] = np.clip(scaled['age'] + rng.integers(-1, 2, n_rows), 18, 90)
+    return scaled
+
+
+def load_dataset(source):
+    """A bundled dataset by path, or a synthetic one from a (scale dataset path, rows) pair"""
+    if isinstance(source, tuple):
+        return scaled_dataset(*source)
+    return pd.read_csv(source)
+
+
+def benchmark(name, source, folds, n_jobs):
+    """Time each stage of the retrain pipeline on one dataset"""
+    print(f"\n⏱️  Benchmarking {name}...")
+    timer = StageTimer()
+
+    df = timer.run('load', load_dataset, source)
+    X = df[API_FEATURES]
+    y = df['is_fraud'].astype(int)
+
+    X_encoded = timer.run('encode', pd.get_dummies, X, columns=CATEGORICAL_COLUMNS, drop_first=True)
+    scaler = StandardScaler()
+    X_scaled = timer.run('scale', scaler.fit_transform, X_encoded)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_scaled, y, test_size=0.2, stratify=y, random_state=42
+    )
+    X_res, y_res = timer.run('resample', SMOTE(random_state=42).fit_resample, X_train, y_train)
+
+    model = build_model()
+    timer.run('fit', model.fit, X_res, y_res)
+
+    def evaluate():
+        probabilities = model.predict_proba(X_test)[:, 1]
+        predictions = (probabilities > 0.5).astype(int)
+        return {
+            'accuracy': round(float(accuracy_score(y_test, predictions)), 4),
+            'f1': round(float(f1_score(y_test, predictions)), 4),
+            'auc': round(float(roc_auc_score(y_test, probabilities)), 4),
+        }
+
+    scores = timer.run('evaluate', evaluate)
+
+    # k-fold evaluation with scaling and resampling inside each fold, folds in parallel
+    pipeline = Pipeline([
+        ('scale', StandardScaler()),
+        ('resample', SMOTE(random_state=42)),
+        ('model', build_model()),
+    ])
+    cv = timer.run('cross_validate', cross_validate, pipeline, X_encoded.to_numpy(dtype=float), y,
+                   cv=StratifiedKFold(folds, shuffle=True, random_state=42),
+                   scoring=['accuracy', 'f1', 'roc_auc'], n_jobs=n_jobs)
+
+    result = {
+        'dataset': name,
+        'rows': len(df),
+        'encoded_features': X_encoded.shape[1],
+        'stages': timer.stages,
+        'total_seconds': round(sum(s['seconds'] for s in timer.stages.values()), 4),
+        'peak_rss_mb': peak_rss_mb(),
+        'fold_workers_peak_rss_mb': children_peak_rss_mb(),
+        'holdout': scores,
+        'cross_validation': {
+            'folds': folds,
+            'n_jobs': n_jobs,
+            'fit_seconds': [round(float(t), 4) for t in cv['fit_time']],
+            'score_seconds': [round(float(t), 4) for t in cv['score_time']],
+            **{metric: {'mean': round(float(cv[f'test_{metric}'].mean()), 4),
+                        'std': round(float(cv[f'test_{metric}'].std()), 4)}
+               for metric in ('accuracy', 'f1', 'roc_auc')},
+        },
+    }
+    stage_summary = ', '.join(f"{stage} {s['seconds']:.2f}s" for stage, s in timer.stages.items())
+    print(f"   {stage_summary}")
+    print(f"   peak RSS {result['peak_rss_mb']} MB, holdout AUC {scores['auc']}, "
+          f"CV AUC {result['cross_validation']['roc_auc']['mean']}")
+    return result
+
+
+def benchmark_isolated(name, source, folds, n_jobs):
+    """benchmark() in a fresh interpreter, so its peak RSS figures cover this dataset alone"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(benchmark, name, source, folds, n_jobs).result()
+
+
+def compare(results, baseline_path):
+    """Print per-stage timing changes against an earlier benchmark file"""
+    with open(baseline_path) as f:
+        baseline = {r['dataset']: r for r in json.load(f)['results']}
+    print(f"\n📊 Change vs {baseline_path}:")
+    for result in results:
+        previous = baseline.get(result['dataset'])
+        if previous is None:
+            continue
+        changes = []
+        for stage, current in result['stages'].items():
+            before = previous['stages'].get(stage, {}).get('seconds')
+            if before:
+                changes.append(f"{stage} {(current['seconds'] - before) / before * 100:+.1f}%")
+        print(f"   {result['dataset']}: {', '.join(changes)}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark training and evaluation")
+    parser.add_argument("--datasets", default="../data/*.csv", help="glob of bundled datasets")
+    parser.add_argument("--sizes", default="50000,100000",
+                        help="comma-separated synthetic sizes built from the scale dataset (empty to skip)")
+    parser.add_argument("--scale-dataset", default="../data/sophisticated_indian_dataset.csv")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel folds (-1: all cores)")
+    parser.add_argument("--output-dir", default="../benchmarks")
+    parser.add_argument("--baseline", help="earlier benchmark JSON to compare against")
+    args = parser.parse_args()
+
+    print("🏁 Running training benchmark...")
+    results = []
+    for path in sorted(glob.glob(args.datasets)):
+        results.append(benchmark_isolated(os.path.basename(path), path, args.folds, args.n_jobs))
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        results.append(benchmark_isolated(f"synthetic_{size}", (args.scale_dataset, size), args.folds, args.n_jobs))
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit_learn': sklearn.__version__,
+        },
+        'results': results,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f"training-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark results saved to {output_path}")
+
+    if args.baseline:
+        compare(results, args.baseline)
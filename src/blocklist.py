@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Blocklists of known-bad IPs, device ids and user ids, memory-mapped so every
+worker on a node shares one copy through the page cache
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from linkage import LINK_FIELDS
+from metrics import metrics
+
+# List kind -> transaction field, e.g. 'ip' -> 'ip_address'
+BLOCKLIST_FIELDS = {kind: field for field, kind in LINK_FIELDS.items()}
+
+MAGIC = b'FGBL'
+VERSION = 1
+# magic, version, k hashes, entries, bloom bits
+_HEADER = struct.Struct('<4sIIQQ4x')
+
+
+def normalize(value):
+    """String form of a field value as stored in a list, or None if missing"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def fingerprint(value):
+    """64-bit key of a normalized value"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'little')
+
+
+def _bloom_positions(keys, k, n_bits):
+    """Bit positions of each key (rows) by double hashing its two 32-bit halves"""
+    keys = np.asarray(keys, dtype=np.uint64)
+    h1 = keys & np.uint64(0xFFFFFFFF)
+    h2 = (keys >> np.uint64(32)) | np.uint64(1)
+    steps = np.arange(k, dtype=np.uint64)
+    return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(n_bits)
+
+
+def build(values, path, false_positive_rate=0.001):
+    """Write a blocklist file from an iterable of values and swap it into place.
+
+    The file holds a Bloom filter sized for false_positive_rate followed by
+    the sorted 64-bit fingerprints of the values. It is written next to path
+    and renamed over it, so readers see the old list or the new one, never a
+    partial file; workers that have the old one mapped keep it until they
+    reopen. Returns the number of distinct entries.
+    """
+    keys = np.fromiter((fingerprint(v) for v in map(normalize, values) if v is not None), dtype=np.uint64)
+    keys = np.unique(keys)
+    n = len(keys)
+    n_bits = max(64, math.ceil(-n * math.log(false_positive_rate) / math.log(2) ** 2))
+    n_bits += -n_bits % 64  # keep the fingerprints 8-byte aligned
+    # Optimal hash count, capped for tiny lists where the 64-bit minimum makes it huge
+    k = min(16, max(1, round(n_bits / max(n, 1) * math.log(2))))
+
+    bits = np.zeros(n_bits, dtype=bool)
+    for start in range(0, n, 1_000_000):
+        bits[_bloom_positions(keys[start:start + 1_000_000], k, n_bits).ravel().astype(np.int64)] = True
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Unique per builder so concurrent rebuilds of one list never share a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, k, n, n_bits))
+        f.write(np.packbits(bits, bitorder='little').tobytes())
+        f.write(keys.astype('<u8').tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return n
+
+
+class Blocklist:
+    """A read-only, memory-mapped blocklist file.
+
+    A lookup probes k bits of the Bloom filter, which rules out almost every
+    clean value after touching at most k pages; only Bloom hits are confirmed
+    by binary search over the sorted fingerprints. 64-bit fingerprints make a
+    false match between distinct values vanishingly rare (about n / 2^64).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.k, self.entries, self.n_bits = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} blocklist")
+        bloom_offset = _HEADER.size
+        self._bloom = memoryview(self._mmap)[bloom_offset:bloom_offset + self.n_bits // 8]
+        self._bloom_array = np.frombuffer(self._mmap, dtype=np.uint8, count=self.n_bits // 8, offset=bloom_offset)
+        self._keys = np.frombuffer(self._mmap, dtype='<u8', count=self.entries,
+                                   offset=bloom_offset + self.n_bits // 8)
+
+    def same_file(self, stat):
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def _confirmed(self, key):
+        i = np.searchsorted(self._keys, key)
+        return i < self.entries and self._keys[i] == key
+
+    def __contains__(self, value):
+        value = normalize(value)
+        if value is None or not self.entries:
+            return False
+        key = fingerprint(value)
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        bloom = self._bloom
+        for i in range(self.k):
+            position = (h1 + i * h2) % self.n_bits
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return False
+        if self._confirmed(np.uint64(key)):
+            return True
+        metrics.incr('blocklist.bloom_false_positives')
+        return False
+
+    def contains_many(self, values):
+        """Membership of each value as a boolean array"""
+        values = [normalize(v) for v in values]
+        found = np.zeros(len(values), dtype=bool)
+        present = [i for i, v in enumerate(values) if v is not None]
+        if not present or not self.entries:
+            return found
+        keys = np.array([fingerprint(values[i]) for i in present], dtype=np.uint64)
+        positions = _bloom_positions(keys, self.k, self.n_bits).astype(np.int64)
+        bloom_hit = ((self._bloom_array[positions >> 3] >> (positions & 7)) & 1).all(axis=1)
+        candidates = np.flatnonzero(bloom_hit)
+        slots = np.minimum(np.searchsorted(self._keys, keys[candidates]), self.entries - 1)
+        confirmed = self._keys[slots] == keys[candidates]
+        found[np.asarray(present)[candidates[confirmed]]] = True
+        return found
+
+    def stats(self):
+        return {
+            'entries': int(self.entries),
+            'bytes': self._stat.st_size,
+            'bloom_bits': int(self.n_bits),
+            'hashes': int(self.k),
+            'modified_at': self._stat.st_mtime,
+        }
+
+
+class BlocklistSet:
+    """The ip, device and user lists in one directory, as <kind>.blocklist.
+
+    Files are re-stat'ed at most every check_seconds and reopened when they
+    have been replaced, so a rebuild by any process reaches every worker.
+    A missing file is an empty list.
+    """
+
+    def __init__(self, directory, check_seconds=5.0):
+        self.directory = directory
+        self.check_seconds = check_seconds
+        self._lists = {}
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self.refresh(force=True)
+
+    def path(self, kind):
+        return os.path.join(self.directory, f"{kind}.blocklist")
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + self.check_seconds
+            lists = dict(self._lists)
+            for kind in BLOCKLIST_FIELDS:
+                try:
+                    stat = os.stat(self.path(kind))
+                except FileNotFoundError:
+                    lists.pop(kind, None)
+                    continue
+                if kind not in lists or not lists[kind].same_file(stat):
+                    try:
+                        lists[kind] = Blocklist(self.path(kind))
+                        metrics.incr('blocklist.reloads')
+                    except (OSError, ValueError) as e:
+                        print(f"Error loading blocklist {self.path(kind)}: {e}")
+            self._lists = lists
+
+    def check(self, transaction):
+        """[{'list': kind, 'field': field}] for each list a transaction's fields appear on"""
+        self.refresh()
+        hits = []
+        for kind, blocklist in self._lists.items():
+            field = BLOCKLIST_FIELDS[kind]
+            if transaction.get(field) in blocklist:
+                hits.append({'list': kind, 'field': field})
+                metrics.incr(f'blocklist.hits.{kind}')
+        return hits
+
+    def check_columns(self, columns, n_rows):
+        """Rows hitting any list, for columns as features.encode_columns takes them"""
+        self.refresh()
+        blocked = np.zeros(n_rows, dtype=bool)
+        for kind, blocklist in self._lists.items():
+            column = columns.get(BLOCKLIST_FIELDS[kind])
+            if column is None:
+                continue
+            if isinstance(column, tuple):
+                codes, values = column
+            else:
+                codes, values = np.unique(column, return_inverse=True)[::-1]
+                values = values.tolist()
+            # One lookup per distinct value, with -1 (missing) never matching
+            hit = np.append(blocklist.contains_many(values), False)[codes]
+            metrics.incr(f'blocklist.hits.{kind}', int(hit.sum()))
+            blocked |= hit
+        return blocked
+
+    def rebuild(self, kind, values, false_positive_rate=0.001):
+        """Replace one list and start using it in this worker"""
+        if kind not in BLOCKLIST_FIELDS:
+            raise ValueError(f"Unknown blocklist: {kind} (expected one of: {', '.join(BLOCKLIST_FIELDS)})")
+        entries = build(values, self.path(kind), false_positive_rate)
+        self.refresh(force=True)
+        return entries
+
+    def stats(self):
+        return {kind: self._lists[kind].stats() if kind in self._lists else None for kind in BLOCKLIST_FIELDS}
+
+
+def read_values(path, column=None):
+    """Values from a file: one per line, or one column of a CSV when column is given"""
+    if column:
+        import pandas as pd
+        for chunk in pd.read_csv(path, usecols=[column], dtype=str, chunksize=1_000_000):
+            yield from chunk[column].dropna()
+        return
+    with open(path) as f:
+        for line in f:
+            yield line
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild a blocklist from a file of values")
+    parser.add_argument("kind", choices=list(BLOCKLIST_FIELDS))
+    parser.add_argument("file", help="one value per line, or a CSV with --column")
+    parser.add_argument("--column", help="CSV column holding the values")
+    parser.add_argument("--dir", default="../models/blocklists")
+    parser.add_argument("--false-positive-rate", type=float, default=0.001, help="Bloom filter target rate")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = os.path.join(args.dir, f"{args.kind}.blocklist")
+    entries = build(read_values(args.file, args.column), path, args.false_positive_rate)
+    print(f"🚫 Wrote {entries} {args.kind} entries to {path} ({os.path.getsize(path)} bytes) "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,104 @@
+"""
+Two-stage cascade scoring: a cheap model scores every transaction and only
+the uncertain band is escalated to the full stacking model
+"""
+
+import time
+
+import numpy as np
+
+from metrics import metrics
+
+
+def risk_band(probabilities):
+    """0/1/2 for the Low/Medium/High bands used by predict_fraud"""
+    return np.where(probabilities > 0.7, 2, np.where(probabilities > 0.3, 1, 0))
+
+
+class CascadeScorer:
+    """Score with cheap_model, escalate low <= p <= high to full_model.
+
+    A shadow_rate fraction of early exits is also scored by the full model so
+    the disagreement of the cheap stage stays measurable in production.
+    """
+
+    def __init__(self, cheap_model, full_model, low=0.15, high=0.85, shadow_rate=0.01, seed=None):
+        if not 0 <= low <= high <= 1:
+            raise ValueError(f"Invalid cascade band: low={low}, high={high}")
+        self.cheap_model = cheap_model
+        self.full_model = full_model
+        self.low = low
+        self.high = high
+        self.shadow_rate = shadow_rate
+        self._rng = np.random.default_rng(seed)
+
+    def score(self, X, transactions=None):
+        """Return (fraud probabilities, stage name per row, full-model segment per row)
+
+        If full_model routes by segment (a ModelRegistry), the raw transactions
+        are needed to pick each escalated row's model.
+        """
+        n = X.shape[0]
+
+        start = time.perf_counter()
+        p_cheap = self.cheap_model.predict_proba(X)[:, 1]
+        metrics.observe('cascade.cheap_stage', time.perf_counter() - start)
+
+        escalate = (p_cheap >= self.low) & (p_cheap <= self.high)
+        shadow = ~escalate & (self._rng.random(n) < self.shadow_rate)
+        full_rows = np.flatnonzero(escalate | shadow)
+
+        probabilities = p_cheap.copy()
+        segments = np.full(n, None, dtype=object)
+        if len(full_rows):
+            start = time.perf_counter()
+            p_full, full_segments = self._score_full(X[full_rows], transactions, full_rows)
+            metrics.observe('cascade.full_stage', time.perf_counter() - start)
+
+            is_escalated = escalate[full_rows]
+            probabilities[full_rows[is_escalated]] = p_full[is_escalated]
+            segments[full_rows[is_escalated]] = full_segments[is_escalated]
+            self._record_disagreement('escalated', p_cheap[full_rows[is_escalated]], p_full[is_escalated])
+            self._record_disagreement('shadow', p_cheap[full_rows[~is_escalated]], p_full[~is_escalated])
+
+        n_full = int(escalate.sum())
+        metrics.incr('cascade.scored', n)
+        metrics.incr('cascade.cheap_exit', n - n_full)
+        metrics.incr('cascade.full_stage', n_full)
+
+        stages = np.where(escalate, 'full', 'cheap')
+        return probabilities, stages, segments
+
+    def _score_full(self, X, transactions, rows):
+        if transactions is not None and hasattr(self.full_model, 'predict_proba_routed'):
+            return self.full_model.predict_proba_routed(X, [transactions[i] for i in rows])
+        return self.full_model.predict_proba(X)[:, 1], np.full(X.shape[0], 'global', dtype=object)
+
+    def _record_disagreement(self, kind, p_cheap, p_full):
+        if not len(p_cheap):
+            return
+        metrics.incr(f'cascade.{kind}_compared', len(p_cheap))
+        metrics.incr(f'cascade.{kind}_label_disagreement', int(np.sum((p_cheap > 0.5) != (p_full > 0.5))))
+        metrics.incr(f'cascade.{kind}_risk_level_disagreement', int(np.sum(risk_band(p_cheap) != risk_band(p_full))))
+
+    def stats(self):
+        """Stage hit rates and disagreement rates derived from the counters"""
+        scored = metrics.counter('cascade.scored')
+
+        def rate(numerator, denominator):
+            return round(numerator / denominator, 4) if denominator else None
+
+        result = {
+            'band': [self.low, self.high],
+            'shadow_rate': self.shadow_rate,
+            'scored': scored,
+            'cheap_exit_rate': rate(metrics.counter('cascade.cheap_exit'), scored),
+            'full_stage_rate': rate(metrics.counter('cascade.full_stage'), scored),
+        }
+        for kind in ('escalated', 'shadow'):
+            compared = metrics.counter(f'cascade.{kind}_compared')
+            result[f'{kind}_label_disagreement_rate'] = rate(
+                metrics.counter(f'cascade.{kind}_label_disagreement'), compared)
+            result[f'{kind}_risk_level_disagreement_rate'] = rate(
+                metrics.counter(f'cascade.{kind}_risk_level_disagreement'), compared)
+        return result
@@ -0,0 +1,71 @@
+"""
+Arrow IPC batch payloads: decode a record batch stream into encoder columns
+and encode scored results as one
+"""
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional; only the Arrow scoring endpoint needs it
+    pa = None
+
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+RISK_LEVELS = ('Low', 'Medium', 'High')
+
+
+def available():
+    return pa is not None
+
+
+def read_table(body):
+    """Table from an Arrow IPC stream; the buffers reference the request body without copying"""
+    return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+
+
+def table_columns(table):
+    """Columns in the form features.encode_columns takes.
+
+    Numeric and boolean columns become numpy arrays (missing values as 0),
+    zero-copy where the column has no nulls and a single chunk. Everything
+    else is dictionary-encoded by Arrow, so only the distinct values are
+    turned into Python objects.
+    """
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        column = column.combine_chunks()
+        if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_boolean(column.type):
+            if column.null_count:
+                column = pc.fill_null(column, 0)
+            columns[name] = column.to_numpy(zero_copy_only=False)
+        else:
+            if not pa.types.is_dictionary(column.type):
+                column = pc.dictionary_encode(column)
+            codes = column.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            columns[name] = (codes, column.dictionary.to_pylist())
+    return columns
+
+
+def risk_level_codes(probabilities):
+    """Index into RISK_LEVELS for each probability, with get_risk_level's thresholds"""
+    return (probabilities > 0.3).astype(np.int8) + (probabilities > 0.7).astype(np.int8)
+
+
+def write_results(columns):
+    """Arrow IPC stream of {name: array}; (codes, values) pairs become dictionary columns"""
+    arrays = {}
+    for name, column in columns.items():
+        if isinstance(column, tuple):
+            codes, values = column
+            arrays[name] = pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(values))
+        elif isinstance(column, (pa.Array, pa.ChunkedArray)):
+            arrays[name] = column
+        else:
+            arrays[name] = pa.array(column)
+    table = pa.table(arrays)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Distill the stacking fraud model into a small, low-latency student model
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from distillation import build_student, fit_soft, synthetic_sample
+from features import encode_frame
+from retrain_jobs import served_dir
+
+parser = argparse.ArgumentParser(description="Distill fraud_model.pkl into a student model")
+parser.add_argument("--student", choices=["gbm", "linear"], default="gbm",
+                    help="gbm: shallow boosted trees, linear: L1-sparse logistic regression")
+parser.add_argument("--synthetic-rows", type=int, default=100000,
+                    help="size of the synthetic transfer sample labelled by the teacher")
+parser.add_argument("--latency-rows", type=int, default=500,
+                    help="number of single-row predictions timed per model")
+args = parser.parse_args()
+
+# The student belongs to the served release: it shares that release's scaler and features
+model_dir = served_dir("../models")
+
+print("🔄 Distilling fraud detection model into a student model...")
+
+# ============================
+# 1. Load Teacher and Dataset
+# ============================
+with open(os.path.join(model_dir, "fraud_model.pkl"), "rb") as f:
+    teacher = pickle.load(f)
+with open(os.path.join(model_dir, "scaler.pkl"), "rb") as f:
+    scaler = pickle.load(f)
+with open(os.path.join(model_dir, "feature_info.pkl"), "rb") as f:
+    feature_info = pickle.load(f)
+
+df = pd.read_csv("../data/sophisticated_indian_dataset.csv")
+if feature_info.get('encoding', 'dense') != 'dense':
+    raise SystemExit("The served model uses the hashed encoding; the API only serves students of dense models")
+api_features = feature_info['api_features']
+
+# Same split as retrain_model.py so the holdout was never seen by the teacher
+raw_train, raw_test, y_train, y_test = train_test_split(
+    df[api_features], df['is_fraud'], test_size=0.2, stratify=df['is_fraud'], random_state=42
+)
+
+
+def encode(raw):
+    """Encode raw API-feature rows exactly like the serving path"""
+    return encode_frame(raw, feature_info, scaler)
+
+
+# ============================
+# 2. Build the Synthetic Transfer Sample
+# ============================
+# Columns are drawn independently from the training marginals so the student
+# sees feature combinations the real data never covers; numeric columns get
+# a little jitter to fill the gaps between observed values.
+print(f"🧪 Sampling {args.synthetic_rows} synthetic transactions...")
+rng = np.random.default_rng(42)
+synthetic = synthetic_sample(raw_train, api_features, args.synthetic_rows, rng)
+
+transfer_raw = pd.concat([raw_train, synthetic], ignore_index=True)
+X_transfer = encode(transfer_raw)
+X_test = encode(raw_test)
+
+print("🎓 Labelling transfer sample with teacher probabilities...")
+p_teacher = teacher.predict_proba(X_transfer)[:, 1]
+
+# ============================
+# 3. Train the Student
+# ============================
+n = len(X_transfer)
+student = build_student(args.student)
+
+print(f"🔥 Training {args.student} student on {n} soft-labelled rows...")
+start = time.perf_counter()
+fit_soft(student, X_transfer, p_teacher)
+print(f"⏱️  Student trained in {time.perf_counter() - start:.1f}s")
+
+# ============================
+# 4. Evaluate Fidelity, AUC and Latency
+# ============================
+
+
+def risk_band(p):
+    return np.where(p > 0.7, 2, np.where(p > 0.3, 1, 0))
+
+
+def per_row_latency_ms(model, X):
+    """Median single-row predict_proba latency, the way the API calls it"""
+    timings = []
+    for i in range(min(args.latency_rows, len(X))):
+        row = X[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+def batch_latency_ms(model, X):
+    """Amortised per-row latency when scoring the whole holdout at once"""
+    start = time.perf_counter()
+    model.predict_proba(X)
+    return float((time.perf_counter() - start) * 1000 / len(X))
+
+
+p_t = teacher.predict_proba(X_test)[:, 1]
+p_s = student.predict_proba(X_test)[:, 1]
+
+report = {
+    'student_type': args.student,
+    'synthetic_rows': args.synthetic_rows,
+    'transfer_rows': int(n),
+    'fidelity': {
+        'label_agreement': float(np.mean((p_t > 0.5) == (p_s > 0.5))),
+        'risk_level_agreement': float(np.mean(risk_band(p_t) == risk_band(p_s))),
+        'mean_abs_probability_diff': float(np.mean(np.abs(p_t - p_s))),
+    },
+    'teacher': {
+        'auc': float(roc_auc_score(y_test, p_t)),
+        'single_row_latency_ms': per_row_latency_ms(teacher, X_test),
+        'batch_latency_ms_per_row': batch_latency_ms(teacher, X_test),
+    },
+    'student': {
+        'auc': float(roc_auc_score(y_test, p_s)),
+        'single_row_latency_ms': per_row_latency_ms(student, X_test),
+        'batch_latency_ms_per_row': batch_latency_ms(student, X_test),
+    },
+}
+report['auc_diff'] = report['student']['auc'] - report['teacher']['auc']
+report['speedup'] = report['teacher']['single_row_latency_ms'] / report['student']['single_row_latency_ms']
+
+print("\n📈 Distillation Report:")
+print(f"   Label agreement:        {report['fidelity']['label_agreement']:.4f}")
+print(f"   Risk level agreement:   {report['fidelity']['risk_level_agreement']:.4f}")
+print(f"   Mean |p_teacher - p_student|: {report['fidelity']['mean_abs_probability_diff']:.4f}")
+print(f"   Teacher AUC: {report['teacher']['auc']:.4f}   Student AUC: {report['student']['auc']:.4f}"
+      f"   (diff {report['auc_diff']:+.4f})")
+print(f"   Single-row latency: teacher {report['teacher']['single_row_latency_ms']:.3f} ms, "
+      f"student {report['student']['single_row_latency_ms']:.3f} ms ({report['speedup']:.1f}x)")
+print(f"   Batch latency/row:  teacher {report['teacher']['batch_latency_ms_per_row']:.4f} ms, "
+      f"student {report['student']['batch_latency_ms_per_row']:.4f} ms")
+
+# ============================
+# 5. Save the Student
+# ============================
+# The student shares scaler.pkl and feature_info.pkl with the teacher, so the
+# API can serve it by setting FRAUD_MODEL_VARIANT=student.
+with open(os.path.join(model_dir, "student_model.pkl"), "wb") as f:
+    pickle.dump(student, f)
+
+with open(os.path.join(model_dir, "student_model_report.json"), "w") as f:
+    json.dump(report, f, indent=2)
+
+print("\n✅ Student model saved successfully!")
+print(f"📁 Saved files in {model_dir}:")
+print("   - student_model.pkl")
+print("   - student_model_report.json")
@@ -0,0 +1,41 @@
+"""
+Student models and soft-label fitting used by distill_model.py
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+
+
+def build_student(kind="gbm"):
+    """gbm: shallow boosted trees, linear: L1-sparse logistic regression"""
+    if kind == "gbm":
+        return GradientBoostingClassifier(n_estimators=60, max_depth=3, learning_rate=0.2,
+                                          subsample=0.5, random_state=42)
+    return LogisticRegression(penalty="l1", C=0.05, solver="saga", max_iter=2000)
+
+
+def synthetic_sample(raw, features, rows, rng):
+    """Draw columns independently from the marginals of raw, jittering the numeric ones"""
+    synthetic = pd.DataFrame({
+        col: rng.choice(raw[col].to_numpy(), size=rows)
+        for col in features
+    })
+    synthetic['amount'] = np.clip(synthetic['amount'] * rng.lognormal(0, 0.1, rows), 1, None)
+    synthetic['hour'] = (synthetic['hour'] + rng.integers(-1, 2, rows)) % 24
+    synthetic['age'] = np.clip(synthetic['age'] + rng.integers(-2, 3, rows), 18, 90)
+    return synthetic
+
+
+def fit_soft(student, X, p_teacher):
+    """Fit student to teacher probabilities
+
+    sklearn classifiers take hard labels only, so each row is presented twice:
+    once as fraud weighted by p and once as legitimate weighted by 1 - p.
+    """
+    n = len(X)
+    X_soft = np.vstack([X, X])
+    y_soft = np.concatenate([np.ones(n, dtype=int), np.zeros(n, dtype=int)])
+    w_soft = np.concatenate([p_teacher, 1 - p_teacher])
+    return student.fit(X_soft, y_soft, sample_weight=w_soft)
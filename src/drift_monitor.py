@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Constant-memory drift monitoring of live scoring traffic against training data
+"""
+
+import bisect
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+from retrain_jobs import served_dir
+
+# Model inputs present in the training data; the API's account_age and similar
+# request-only fields have no reference distribution to compare against
+NUMERIC_FEATURES = ['amount', 'age', 'hour', 'item_quantity']
+CATEGORICAL_FEATURES = ['payment_method', 'category', 'city', 'device']
+OTHER = '__other__'
+
+# Population stability index thresholds commonly used for score monitoring
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.25
+
+# Live weight a feature needs before its PSI is judged; a handful of rows always looks drifted
+MIN_WEIGHT = 500
+
+
+def _psi(expected, actual, eps=1e-4):
+    expected = np.clip(expected, eps, None)
+    actual = np.clip(actual, eps, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _status(psi):
+    if psi is None:
+        return 'unknown'
+    if psi >= PSI_DRIFT:
+        return 'drift'
+    if psi >= PSI_WARNING:
+        return 'warning'
+    return 'ok'
+
+
+def build_reference(df, n_bins=20):
+    """Quantile bin edges and category frequencies from training rows (dataset column names)"""
+    df = df.rename(columns={'country': 'city'})
+    reference = {'numeric': {}, 'categorical': {}, 'n_rows': len(df)}
+    for feature in NUMERIC_FEATURES:
+        if feature not in df.columns:
+            continue
+        values = df[feature].dropna().to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference['numeric'][feature] = {
+            'edges': edges,
+            'fractions': (counts / counts.sum()).tolist(),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+    for feature in CATEGORICAL_FEATURES:
+        if feature not in df.columns:
+            continue
+        frequencies = df[feature].value_counts(normalize=True)
+        reference['categorical'][feature] = {str(k): float(v) for k, v in frequencies.items()}
+    return reference
+
+
+class DriftMonitor:
+    """Histogram sketches over reference bins, decayed so recent traffic dominates.
+
+    Numeric features are counted into the reference quantile bins (one
+    bisect per value) and categorical features into the reference categories
+    plus an 'other' slot, so memory is fixed by the reference, not by
+    traffic. Every half_life updates all counts are halved. A feature with
+    less than min_weight of live data is reported as 'insufficient_data'
+    and left out of the overall status.
+    """
+
+    def __init__(self, reference, half_life=10000, min_weight=MIN_WEIGHT):
+        self.reference = reference
+        self.half_life = half_life
+        self.min_weight = min_weight
+        self._lock = threading.Lock()
+        self._updates = 0
+        self._numeric = {}
+        for feature in NUMERIC_FEATURES:
+            ref = reference['numeric'].get(feature)
+            self._numeric[feature] = np.zeros(len(ref['edges']) + 1) if ref else np.zeros(1)
+        self._categorical = {}
+        for feature in CATEGORICAL_FEATURES:
+            categories = list(reference['categorical'].get(feature, {})) + [OTHER]
+            self._categorical[feature] = dict.fromkeys(categories, 0.0)
+
+    def update(self, transaction):
+        """Add one scored transaction (API field names) to the live sketches"""
+        with self._lock:
+            for feature, counts in self._numeric.items():
+                value = transaction.get(feature)
+                if value is None:
+                    continue
+                ref = self.reference['numeric'].get(feature)
+                counts[bisect.bisect_right(ref['edges'], value) if ref else 0] += 1
+            for feature, counts in self._categorical.items():
+                value = transaction.get(feature)
+                if value is None:
+                    continue
+                value = str(value)
+                counts[value if value in counts else OTHER] += 1
+            self._updates += 1
+            if self._updates % self.half_life == 0:
+                for counts in self._numeric.values():
+                    counts *= 0.5
+                for counts in self._categorical.values():
+                    for key in counts:
+                        counts[key] *= 0.5
+
+    def report(self):
+        """PSI per feature (and KS distance for numeric features) against the reference"""
+        with self._lock:
+            numeric = {f: c.copy() for f, c in self._numeric.items()}
+            categorical = {f: dict(c) for f, c in self._categorical.items()}
+            updates = self._updates
+
+        features = {}
+        for feature, counts in numeric.items():
+            ref = self.reference['numeric'].get(feature)
+            total = counts.sum()
+            if ref is None or not total:
+                features[feature] = {'type': 'numeric', 'psi': None, 'ks': None, 'weight': float(total),
+                                     'status': 'unknown' if ref is None else 'no_data',
+                                     'reference': ref is not None}
+                continue
+            live = counts / total
+            expected = np.asarray(ref['fractions'])
+            psi = _psi(expected, live)
+            features[feature] = {
+                'type': 'numeric',
+                'psi': round(psi, 4),
+                'ks': round(float(np.max(np.abs(np.cumsum(live) - np.cumsum(expected)))), 4),
+                'weight': round(float(total), 2),
+                'status': self._judged_status(psi, total),
+                'reference': True,
+            }
+        for feature, counts in categorical.items():
+            ref = self.reference['categorical'].get(feature)
+            total = sum(counts.values())
+            if ref is None or not total:
+                features[feature] = {'type': 'categorical', 'psi': None, 'weight': float(total),
+                                     'status': 'unknown' if ref is None else 'no_data',
+                                     'reference': ref is not None}
+                continue
+            keys = list(counts)
+            expected = np.array([ref.get(k, 0.0) for k in keys])
+            live = np.array([counts[k] for k in keys]) / total
+            psi = _psi(expected, live)
+            features[feature] = {
+                'type': 'categorical',
+                'psi': round(psi, 4),
+                'unseen_rate': round(counts[OTHER] / total, 4),
+                'weight': round(float(total), 2),
+                'status': self._judged_status(psi, total),
+                'reference': True,
+            }
+
+        scores = [f['psi'] for f in features.values() if f['psi'] is not None and f['weight'] >= self.min_weight]
+        if scores:
+            status = _status(max(scores))
+        elif any(f['psi'] is not None for f in features.values()):
+            status = 'insufficient_data'
+        else:
+            status = 'no_data'
+        return {
+            'updates': updates,
+            'min_weight': self.min_weight,
+            'max_psi': max(scores) if scores else None,
+            'status': status,
+            'features': features,
+        }
+
+    def _judged_status(self, psi, weight):
+        return _status(psi) if weight >= self.min_weight else 'insufficient_data'
+
+
+if __name__ == '__main__':
+    # Build the reference for an already-trained model from its training dataset
+    print("📐 Building drift reference from training data...")
+    df = pd.read_csv("../data/sophisticated_indian_dataset.csv")
+    reference = build_reference(df)
+    path = os.path.join(served_dir("../models"), "drift_reference.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(reference, f)
+    print(f"✅ Saved {path} ({len(reference['numeric'])} numeric, "
+          f"{len(reference['categorical'])} categorical features)")
@@ -0,0 +1,198 @@
+"""
+Encoding of transactions into the model's feature matrix, shared by the API
+and offline validation so both see exactly what training produced
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+
+# Dataset columns a scoring request can provide (country is the API's city),
+# and the ones among them that are one-hot encoded
+API_FEATURES = [
+    'amount', 'hour', 'day_of_week', 'category', 'age', 'gender',
+    'country', 'device', 'payment_method', 'item_quantity',
+    'shipping_address', 'browser_info'
+]
+CATEGORICAL_COLUMNS = ['category', 'gender', 'country', 'device', 'payment_method', 'shipping_address', 'browser_info']
+
+# High-cardinality fields the dense encoding drops; the hashed encoding keeps them.
+# Only fields scoring requests carry: the dataset's location and transaction_time
+# never reach the API, whose hour and day_of_week already give the time of day
+HASHED_COLUMNS = ('ip_address', 'user_id')
+HASH_WIDTH = 2 ** 12
+
+
+def _token_value(value):
+    """String form of a raw field value, or None if missing"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # user_id read back from a column that also held missing values
+        value = int(value)
+    return str(value)
+
+
+def _hash_tokens(column, value):
+    """Tokens hashed for one field value; IPs also emit their /24 and /16 prefixes"""
+    if column == 'ip_address':
+        octets = value.split('.')
+        return [value, '/24=' + '.'.join(octets[:3]), '/16=' + '.'.join(octets[:2])]
+    return [value]
+
+
+class HashedEncoder:
+    """Sparse encoding that keeps high-cardinality fields.
+
+    Numeric columns pass through, low-cardinality categoricals are one-hot
+    encoded against the values seen in fit (an unseen value encodes as all
+    zeros), and each hashed field gets its own fixed-width block of hashed
+    tokens. The width of the matrix is fixed at fit time however many
+    distinct IPs or users arrive later, and transform returns CSR.
+    """
+
+    def __init__(self, numeric_columns, categorical_columns, hashed_columns=HASHED_COLUMNS, hash_width=HASH_WIDTH):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.hashed_columns = list(hashed_columns)
+        self.hash_width = hash_width
+
+    def fit(self, df):
+        self.vocabulary = {}
+        self.feature_columns = list(self.numeric_columns)
+        for column in self.categorical_columns:
+            values = sorted(df[column].dropna().astype(str).unique()) if column in df.columns else []
+            self.vocabulary[column] = {}
+            for value in values:
+                self.vocabulary[column][value] = len(self.feature_columns)
+                self.feature_columns.append(f"{column}_{value}")
+        self._hasher = FeatureHasher(n_features=self.hash_width, input_type='string', alternate_sign=False)
+        return self
+
+    @property
+    def n_features(self):
+        return len(self.feature_columns) + len(self.hashed_columns) * self.hash_width
+
+    def transform(self, df):
+        return self.transform_columns(frame_columns(df), len(df))
+
+    def transform_columns(self, columns, n_rows):
+        """CSR rows from columns in the form encode_columns takes"""
+        numeric = np.zeros((n_rows, len(self.numeric_columns)))
+        for j, column in enumerate(self.numeric_columns):
+            if column in columns and not isinstance(columns[column], tuple):
+                numeric[:, j] = columns[column]
+        blocks = [sparse.csr_matrix(numeric)]
+
+        rows, cols = [], []
+        for column in self.categorical_columns:
+            if column not in columns:
+                continue
+            codes, values = _as_coded(columns[column])
+            vocabulary = self.vocabulary[column]
+            # Positions in the one-hot block per distinct value, -1 (also for missing rows) if unseen
+            lookup = np.array([vocabulary.get(_token_value(v), -1) for v in values] + [-1])
+            col = lookup[codes]
+            present = np.flatnonzero(col >= 0)
+            rows.append(present)
+            cols.append(col[present] - len(self.numeric_columns))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+        blocks.append(sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                        shape=(n_rows, len(self.feature_columns) - len(self.numeric_columns))))
+
+        for column in self.hashed_columns:
+            if column not in columns:
+                blocks.append(sparse.csr_matrix((n_rows, self.hash_width)))
+                continue
+            codes, values = _as_coded(columns[column])
+            # Hash each distinct value once, plus an empty row that missing values index
+            tokens = []
+            for value in values:
+                value = _token_value(value)
+                tokens.append(_hash_tokens(column, value) if value is not None else [])
+            hashed = self._hasher.transform(tokens + [[]])
+            blocks.append(hashed[codes])
+        return sparse.hstack(blocks, format='csr')
+
+
+def _as_coded(column):
+    """(codes, distinct values) for a column; a numeric array is coded on the fly"""
+    if isinstance(column, tuple):
+        return column
+    codes, values = pd.factorize(column)
+    return codes, list(values)
+
+
+def frame_columns(df):
+    """A DataFrame as encode_columns input: numeric arrays, and (codes, distinct values) for the rest"""
+    columns = {}
+    for name in df.columns:
+        if pd.api.types.is_numeric_dtype(df[name]) or pd.api.types.is_bool_dtype(df[name]):
+            columns[name] = df[name].fillna(0).to_numpy(dtype=float)
+        else:
+            codes, values = pd.factorize(df[name])
+            columns[name] = (codes, list(values))
+    return columns
+
+
+def encode_frame(df, feature_info, scaler):
+    """One-hot encode, align to the training columns and scale a frame of transactions"""
+    # Map API fields to training model fields
+    if 'city' in df.columns:
+        df = df.rename(columns={'city': 'country'})
+
+    # Hashed encoding: CSR from the fitted encoder, scaled by a sparse-safe scaler
+    if feature_info.get('encoding') == 'hashed':
+        return scaler.transform(feature_info['encoder'].transform(df))
+
+    # Apply one-hot encoding using get_dummies (same as training)
+    X_encoded = pd.get_dummies(df, columns=feature_info['categorical_columns'], drop_first=True)
+
+    # Ensure all expected features are present (add missing columns with 0)
+    expected_features = feature_info['feature_columns']
+    for col in expected_features:
+        if col not in X_encoded.columns:
+            X_encoded[col] = 0
+
+    # Select and order features to match training, then scale
+    return scaler.transform(X_encoded[expected_features])
+
+
+def encode_columns(columns, n_rows, feature_info, scaler):
+    """encode_frame for columnar input, without building a row or a DataFrame.
+
+    columns maps each field to a numeric array or, for string fields, a
+    (codes, values) pair: the distinct values and each row's index into
+    them, -1 where missing. Every lookup is done once per distinct value and
+    scattered to the rows by index, so the work per row is array indexing.
+    """
+    if 'city' in columns:
+        columns = {('country' if name == 'city' else name): column for name, column in columns.items()}
+
+    if feature_info.get('encoding') == 'hashed':
+        return scaler.transform(feature_info['encoder'].transform_columns(columns, n_rows))
+
+    feature_columns = feature_info['feature_columns']
+    feature_index = {column: j for j, column in enumerate(feature_columns)}
+    X = np.zeros((n_rows, len(feature_columns)))
+    for name, column in columns.items():
+        if name in feature_info['categorical_columns']:
+            codes, values = _as_coded(column)
+            # get_dummies names columns <field>_<value>; the dropped first level has no column
+            lookup = np.array([feature_index.get(f"{name}_{value}", -1) for value in values] + [-1])
+            col = lookup[codes]
+            present = np.flatnonzero(col >= 0)
+            X[present, col[present]] = 1
+        elif name in feature_index and not isinstance(column, tuple):
+            X[:, feature_index[name]] = column
+    # Keep the column names the scaler was fitted with
+    return scaler.transform(pd.DataFrame(X, columns=feature_columns, copy=False))
+
+
+def similarity_vectors(X, feature_info):
+    """Dense rows for the similar-case index: the named (numeric and one-hot) columns of a hashed matrix"""
+    if sparse.issparse(X):
+        return X[:, :len(feature_info['feature_columns'])].toarray()
+    return X
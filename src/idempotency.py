@@ -0,0 +1,135 @@
+"""
+Collision-free transaction ids and a bounded TTL store for idempotent scoring
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+_CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_id_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def new_transaction_id():
+    """Time-ordered unique id (ULID layout: 48-bit milliseconds + 80 random bits).
+
+    Ids generated in the same millisecond increment the random part, so ids
+    from one process are strictly increasing and never collide.
+    """
+    global _last_ms, _last_random
+    with _id_lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            now_ms = _last_ms
+            _last_random = (_last_random + 1) & ((1 << 80) - 1)
+        else:
+            _last_random = int.from_bytes(os.urandom(10), 'big')
+        _last_ms = now_ms
+        value = (now_ms << 80) | _last_random
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return 'TXN' + ''.join(reversed(chars))
+
+
+def fingerprint(payload):
+    """Stable hash of a request body, used to reject key reuse with a different payload"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different request body"""
+
+
+class IdempotencyStore:
+    """Idempotency key -> stored response with a fixed TTL, kept in a state backend.
+
+    The first request for a key claims it with set_nx; with a shared backend
+    that claim is atomic across workers. A retry that arrives while the key
+    is still being scored polls until the first attempt completes instead of
+    scoring again. The claim only lives for lease_seconds, so a worker that
+    dies mid-request blocks its key briefly rather than for the full TTL;
+    ttl_seconds applies once the response is stored. The backend bounds how
+    many keys are kept.
+    """
+
+    def __init__(self, backend, ttl_seconds=86400, lease_seconds=30, poll_seconds=0.01):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._owned = {}
+
+    @staticmethod
+    def _key(key):
+        return f"idempotency:{key}"
+
+    def begin(self, key, request_fingerprint, wait_seconds=5.0):
+        """Return the stored response for a retry, or None if the caller should score it.
+
+        Raises IdempotencyConflict if the key was used for a different body.
+        """
+        deadline = time.monotonic() + wait_seconds
+        pending = {'fingerprint': request_fingerprint, 'response': None}
+        while True:
+            if self.backend.set_nx(self._key(key), pending, self.lease_seconds):
+                with self._lock:
+                    self._owned[key] = request_fingerprint
+                return None
+            entry = self.backend.get(self._key(key))
+            if entry is None:
+                # Abandoned or expired between the two calls; try to claim it again
+                continue
+            if entry['fingerprint'] != request_fingerprint:
+                raise IdempotencyConflict(f"Idempotency key {key} was already used with a different request")
+            if entry['response'] is not None:
+                return entry['response']
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Request with idempotency key {key} is still being processed")
+            time.sleep(self.poll_seconds)
+
+    def begin_many(self, claims, wait_seconds=5.0):
+        """begin() for each (key, fingerprint) of a batch; rows whose key is None are skipped.
+
+        Returns the stored response or None per row. If a key conflicts or is
+        still in flight, the keys this call claimed are abandoned before the
+        error (naming the row) is raised, so a corrected retry can claim them.
+        """
+        results = []
+        claimed = []
+        try:
+            for i, (key, request_fingerprint) in enumerate(claims):
+                stored = None
+                if key is not None:
+                    try:
+                        stored = self.begin(key, request_fingerprint, wait_seconds)
+                    except (IdempotencyConflict, TimeoutError) as e:
+                        raise type(e)(f"{e} (transaction {i})") from e
+                    if stored is None:
+                        claimed.append(key)
+                results.append(stored)
+        except BaseException:
+            for key in claimed:
+                self.abandon(key)
+            raise
+        return results
+
+    def complete(self, key, response):
+        with self._lock:
+            request_fingerprint = self._owned.pop(key, None)
+        if request_fingerprint is not None:
+            self.backend.set(self._key(key), {'fingerprint': request_fingerprint, 'response': response},
+                             self.ttl_seconds)
+
+    def abandon(self, key):
+        """Forget a key whose first attempt failed so a retry can score it"""
+        with self._lock:
+            owned = self._owned.pop(key, None) is not None
+        if owned:
+            self.backend.delete(self._key(key))
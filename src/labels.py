@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of chargeback/feedback labels: join them to logged predictions,
+track live precision/recall, and append labeled rows for retraining
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+from idempotency import new_transaction_id
+from metrics import metrics
+from prediction_store import PredictionStore
+
+CHUNK_ROWS = 100_000
+
+# Column names accepted for the label, in order of preference
+LABEL_COLUMNS = ('is_fraud', 'label', 'chargeback')
+_TRUE_VALUES = {'1', '1.0', 'true', 'yes', 'fraud', 'chargeback'}
+_FALSE_VALUES = {'0', '0.0', 'false', 'no', 'legit', 'legitimate'}
+
+# Confusion-matrix counters, keyed by (predicted, label)
+OUTCOMES = {(1, 1): 'true_positive', (1, 0): 'false_positive', (0, 1): 'false_negative', (0, 0): 'true_negative'}
+
+
+def parse_label(value):
+    """0 or 1 from a label value: a boolean, 0/1, or a string naming one; anything else is a ValueError"""
+    if isinstance(value, (bool, int, float)) and value in (0, 1):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_VALUES:
+            return 1
+        if text in _FALSE_VALUES:
+            return 0
+    raise ValueError(f"Unrecognised label: {value!r}")
+
+
+def read_label_chunks(source, chunk_rows=CHUNK_ROWS):
+    """Stream a CSV of transaction_id plus a label column as lists of (transaction_id, 0/1)"""
+    reader = pd.read_csv(source, dtype=str, chunksize=chunk_rows)
+    for chunk in reader:
+        label_column = next((c for c in LABEL_COLUMNS if c in chunk.columns), None)
+        if 'transaction_id' not in chunk.columns or label_column is None:
+            raise ValueError(f"Label file needs transaction_id and one of: {', '.join(LABEL_COLUMNS)}")
+        values = chunk[label_column].str.strip().str.lower()
+        unknown = ~values.isin(_TRUE_VALUES | _FALSE_VALUES)
+        if unknown.any():
+            raise ValueError(f"Unrecognised label: {chunk[label_column][unknown].iloc[0]!r}")
+        labels = values.isin(_TRUE_VALUES).astype(int)
+        yield list(zip(chunk['transaction_id'].str.strip(), labels.tolist()))
+
+
+def accuracy_report(counts):
+    """Precision, recall and accuracy from {'true_positive': n, 'false_positive': n, ...}"""
+    tp, fp = counts.get('true_positive', 0), counts.get('false_positive', 0)
+    fn, tn = counts.get('false_negative', 0), counts.get('true_negative', 0)
+    labeled = tp + fp + fn + tn
+    return {
+        'labeled': labeled,
+        'true_positive': tp,
+        'false_positive': fp,
+        'false_negative': fn,
+        'true_negative': tn,
+        'precision': round(tp / (tp + fp), 4) if tp + fp else None,
+        'recall': round(tp / (tp + fn), 4) if tp + fn else None,
+        'accuracy': round((tp + tn) / labeled, 4) if labeled else None,
+    }
+
+
+def live_label_accuracy():
+    """Accuracy from the label counters, shared across workers with a shared metrics backend"""
+    names = [f'labels.{outcome}' for outcome in OUTCOMES.values()] + ['labels.unmatched']
+    counts = metrics.counters(names)
+    report = accuracy_report({name[len('labels.'):]: value for name, value in counts.items()})
+    report['unmatched'] = counts['labels.unmatched']
+    return report
+
+
+class LabelIngestor:
+    """Applies label chunks to a PredictionStore and writes joined rows as partitions.
+
+    Partitions go to <output_dir>/date=YYYY-MM-DD/part-<id>.jsonl, one JSON
+    object per row: the scoring request as logged plus transaction_id,
+    predicted_fraud and the true label as is_fraud. Rows are spliced from
+    the stored payload text without being parsed. retrain_model.py reads
+    the partitions alongside the bundled dataset.
+    """
+
+    def __init__(self, store, output_dir='../data/labeled'):
+        self.store = store
+        self.output_dir = output_dir
+
+    def ingest(self, chunks):
+        start = time.perf_counter()
+        summary = {'received': 0, 'labeled': 0, 'already_labeled': 0, 'unmatched': 0, 'partitions': []}
+        for labels in chunks:
+            labeled_at = time.time()
+            rows, already_labeled = self.store.attach_labels(labels, labeled_at)
+            # A chunk may repeat an id; the store keeps one label per id
+            unmatched = len({transaction_id for transaction_id, _ in labels}) - len(rows) - already_labeled
+
+            outcomes = Counter((predicted, label) for _, predicted, label, _ in rows)
+            for key, count in outcomes.items():
+                metrics.incr(f'labels.{OUTCOMES[key]}', count)
+            metrics.incr('labels.unmatched', unmatched)
+            metrics.incr('labels.ingested', len(labels))
+
+            if rows:
+                summary['partitions'].append(self._write_partition(rows, labeled_at))
+            summary['received'] += len(labels)
+            summary['labeled'] += len(rows)
+            summary['already_labeled'] += already_labeled
+            summary['unmatched'] += unmatched
+
+        elapsed = time.perf_counter() - start
+        metrics.observe('labels.ingest', elapsed)
+        summary['seconds'] = round(elapsed, 3)
+        summary['labels_per_second'] = round(summary['received'] / elapsed) if elapsed else None
+        return summary
+
+    def _write_partition(self, rows, labeled_at):
+        labeled_at_json = json.dumps(datetime.fromtimestamp(labeled_at).isoformat())
+        lines = []
+        for transaction_id, predicted, label, payload in rows:
+            # Transaction ids are generated by the API and need no JSON escaping
+            fields = (f'"transaction_id": "{transaction_id}", "predicted_fraud": {predicted}, '
+                      f'"is_fraud": {label}, "labeled_at": {labeled_at_json}}}')
+            # Appended after the payload's own keys so these values win on duplicates
+            lines.append(f"{payload[:-1]}, {fields}\n" if payload and payload != '{}' else f"{{{fields}\n")
+
+        directory = os.path.join(self.output_dir, f"date={datetime.fromtimestamp(labeled_at):%Y-%m-%d}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{new_transaction_id()[3:]}.jsonl")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, path)
+        return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest chargeback/feedback label files")
+    parser.add_argument("files", nargs='+', help="CSV files with transaction_id and is_fraud/label columns")
+    parser.add_argument("--db", default="../data/predictions.db")
+    parser.add_argument("--output-dir", default="../data/labeled")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    ingestor = LabelIngestor(PredictionStore(args.db), args.output_dir)
+    for path in args.files:
+        print(f"🏷️  Ingesting {path}...")
+        summary = ingestor.ingest(read_label_chunks(path, args.chunk_rows))
+        print(f"   {summary['received']} labels, {summary['labeled']} joined, "
+              f"{summary['already_labeled']} already labeled, {summary['unmatched']} unmatched "
+              f"({summary['labels_per_second']}/s), {len(summary['partitions'])} partitions written")
+    confusion = {OUTCOMES[key]: count for key, count in ingestor.store.label_confusion().items()}
+    print(f"\n📈 Accuracy over all stored labels: {accuracy_report(confusion)}")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Incremental IP/user/device linkage index for graph features at scoring time
+"""
+
+import argparse
+import os
+import pickle
+import threading
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+# Transaction field -> entity kind; device_id is an optional device fingerprint,
+# not the mobile/desktop/tablet `device` category
+LINK_FIELDS = {'ip_address': 'ip', 'user_id': 'user', 'device_id': 'device'}
+
+# Pairs whose distinct counts are kept in both directions
+LINKED_PAIRS = [('ip', 'user'), ('device', 'user'), ('device', 'ip')]
+
+
+class _UnionFind:
+    """Union-find over entity nodes, tracking component sizes and user counts"""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+        self.users = {}
+
+    def add(self, node):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.size[node] = 1
+            self.users[node] = 1 if node[0] == 'user' else 0
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size.pop(b)
+        self.users[a] += self.users.pop(b)
+
+    def component(self, node):
+        if node not in self.parent:
+            return 0, 0
+        root = self.find(node)
+        return self.size[root], self.users[root]
+
+
+class LinkageIndex:
+    """Distinct-neighbour counters and linked clusters over a sliding time window.
+
+    Distinct counts ("users seen on this IP in the last window") are exact:
+    every link is appended to a time-ordered event log, and a link is
+    forgotten once its most recent event falls out of the window. Clusters
+    are connected components of the link graph; union-find cannot delete
+    edges, so it is kept in two generations of window_seconds each and a
+    cluster covers links from the last one to two windows. Time is event
+    time (the latest transaction seen), so bulk loads of historical data
+    behave like live traffic. Memory is bounded under any number of
+    distinct keys: max_events expires the oldest links early, and a
+    generation holding max_nodes entities is retired early, so clusters
+    then cover a shorter span than two windows.
+    """
+
+    def __init__(self, window_seconds=86400, max_events=5_000_000, max_nodes=2_000_000):
+        self.window = window_seconds
+        self.max_events = max_events
+        self.max_nodes = max_nodes
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._last_seen = {}
+        self._counts = {}
+        self._current = _UnionFind()
+        self._previous = _UnionFind()
+        self._generation_start = None
+        self.latest = None
+
+    @staticmethod
+    def nodes(transaction):
+        """Entity nodes named by a transaction, e.g. {'ip': ('ip', '1.2.3.4')}"""
+        nodes = {}
+        for field, kind in LINK_FIELDS.items():
+            value = transaction.get(field)
+            if value is not None and value == value and value != '':
+                nodes[kind] = (kind, str(value))
+        return nodes
+
+    def add(self, transaction, timestamp):
+        with self._lock:
+            self._add(self.nodes(transaction), timestamp)
+
+    def add_many(self, transactions, timestamps):
+        with self._lock:
+            for transaction, timestamp in zip(transactions, timestamps):
+                self._add(self.nodes(transaction), timestamp)
+
+    def _add(self, nodes, timestamp):
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+            self._rotate(timestamp)
+            self._expire(timestamp - self.window)
+        elif timestamp <= self.latest - self.window:
+            return
+
+        for a_kind, b_kind in LINKED_PAIRS:
+            if a_kind in nodes and b_kind in nodes:
+                self._link(nodes[a_kind], nodes[b_kind], timestamp)
+
+        node_list = list(nodes.values())
+        for node in node_list:
+            self._current.add(node)
+        for node in node_list[1:]:
+            self._current.union(node_list[0], node)
+        if len(self._current.parent) >= self.max_nodes:
+            self._previous = self._current
+            self._current = _UnionFind()
+            self._generation_start = timestamp
+
+    def _link(self, a, b, timestamp):
+        pair = (a, b)
+        seen = self._last_seen.get(pair)
+        if seen is None:
+            self._counts[(a, b[0])] = self._counts.get((a, b[0]), 0) + 1
+            self._counts[(b, a[0])] = self._counts.get((b, a[0]), 0) + 1
+        elif seen >= timestamp:
+            return
+        self._last_seen[pair] = timestamp
+        self._events.append((timestamp, pair))
+        if len(self._events) > self.max_events:
+            self._pop_event()
+
+    def _expire(self, cutoff):
+        while self._events and self._events[0][0] <= cutoff:
+            self._pop_event()
+
+    def _pop_event(self):
+        timestamp, pair = self._events.popleft()
+        if self._last_seen.get(pair) != timestamp:
+            return
+        del self._last_seen[pair]
+        a, b = pair
+        for key in ((a, b[0]), (b, a[0])):
+            self._counts[key] -= 1
+            if not self._counts[key]:
+                del self._counts[key]
+
+    def _rotate(self, timestamp):
+        if self._generation_start is None:
+            self._generation_start = timestamp
+        elapsed = timestamp - self._generation_start
+        if elapsed < self.window:
+            return
+        self._previous = self._current if elapsed < 2 * self.window else _UnionFind()
+        self._current = _UnionFind()
+        self._generation_start = timestamp
+
+    def distinct(self, node, other_kind):
+        return self._counts.get((node, other_kind), 0)
+
+    def features(self, transaction):
+        """Linkage features for a transaction, from state before it is added"""
+        nodes = self.nodes(transaction)
+        with self._lock:
+            result = {}
+            if 'ip' in nodes:
+                result['ip_distinct_users'] = self.distinct(nodes['ip'], 'user')
+            if 'user' in nodes:
+                result['user_distinct_ips'] = self.distinct(nodes['user'], 'ip')
+                result['user_distinct_devices'] = self.distinct(nodes['user'], 'device')
+            if 'device' in nodes:
+                result['device_distinct_users'] = self.distinct(nodes['device'], 'user')
+                result['device_distinct_ips'] = self.distinct(nodes['device'], 'ip')
+
+            cluster_size, cluster_users = 0, 0
+            for node in nodes.values():
+                for generation in (self._current, self._previous):
+                    size, users = generation.component(node)
+                    if size > cluster_size:
+                        cluster_size, cluster_users = size, users
+            result['cluster_size'] = cluster_size
+            result['cluster_users'] = cluster_users
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window_seconds': self.window,
+                'links': len(self._last_seen),
+                'events': len(self._events),
+                'max_events': self.max_events,
+                'cluster_nodes': len(self._current.parent) + len(self._previous.parent),
+                'max_nodes': self.max_nodes,
+                'latest': datetime.fromtimestamp(self.latest).isoformat() if self.latest is not None else None,
+            }
+
+    def build_csv(self, path):
+        """Bulk-load a dataset's ip_address/user_id (and device_id, if present) links in time order"""
+        columns = pd.read_csv(path, nrows=0).columns
+        usecols = ['transaction_time'] + [field for field in LINK_FIELDS if field in columns]
+        df = pd.read_csv(path, usecols=usecols)
+        df['timestamp'] = pd.to_datetime(df['transaction_time']).map(datetime.timestamp)
+        df = df.sort_values('timestamp', kind='stable')
+        self.add_many(df.drop(columns=['transaction_time', 'timestamp']).to_dict('records'),
+                      df['timestamp'].to_numpy())
+        return len(df)
+
+    def save(self, path):
+        """Snapshot the index; written to a temp file and renamed so readers never see a partial file"""
+        with self._lock:
+            state = {k: v for k, v in self.__dict__.items() if k != '_lock'}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls.__new__(cls)
+        index.max_nodes = 2_000_000  # snapshots saved before the node cap
+        index.__dict__.update(state)
+        index._lock = threading.Lock()
+        return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build a linkage index snapshot from datasets")
+    parser.add_argument("datasets", nargs='*', default=["../data/sophisticated_indian_dataset.csv"])
+    parser.add_argument("--window-hours", type=float, default=24)
+    parser.add_argument("--output", default="../models/linkage_index.pkl")
+    args = parser.parse_args()
+
+    index = LinkageIndex(window_seconds=args.window_hours * 3600)
+    for dataset in args.datasets:
+        print(f"🔗 Linked {index.build_csv(dataset)} transactions from {dataset}")
+    index.save(args.output)
+    print(f"💾 Linkage index saved to {args.output}: {index.stats()}")
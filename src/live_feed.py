@@ -0,0 +1,109 @@
+"""
+Server-Sent Events broker for scored/flagged transactions and stat deltas
+"""
+
+import json
+import queue
+import threading
+
+from metrics import metrics
+
+EVENT_TYPES = ('scored', 'flagged', 'stats')
+
+
+class Subscriber:
+    """One connected client with a bounded buffer of pre-encoded events"""
+
+    def __init__(self, event_types, buffer_size):
+        self.event_types = set(event_types)
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+
+class LiveFeed:
+    """Fan out events to subscribers without ever blocking the publisher.
+
+    Each event is serialized once and the same bytes are queued for every
+    subscriber, so publishing costs one queue put per client. A client whose
+    buffer is full is disconnected instead of slowing everyone else down.
+    """
+
+    def __init__(self, buffer_size=256, heartbeat_seconds=15):
+        self.buffer_size = buffer_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, event_types=EVENT_TYPES):
+        subscriber = Subscriber(event_types, self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        metrics.incr('feed.subscribed')
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type, payload):
+        with self._lock:
+            subscribers = [s for s in self._subscribers if event_type in s.event_types]
+        if not subscribers:
+            return
+        message = f"event: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+        metrics.incr('feed.events_published')
+        for subscriber in subscribers:
+            try:
+                subscriber.buffer.put_nowait(message)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                metrics.incr('feed.slow_consumers_dropped')
+
+    def stream(self, subscriber):
+        """Generator of SSE frames for one subscriber, with keep-alive comments"""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.buffer.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+            yield "event: dropped\ndata: {\"reason\": \"slow consumer\"}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish_scored(self, transactions, results):
+        """Publish one scored event, one flagged event and one stats delta per scoring call"""
+        if not self.subscriber_count():
+            return
+        scored = []
+        for transaction, result in zip(transactions, results):
+            scored.append({
+                'transactionId': result['transaction_id'],
+                'amount': transaction.get('amount'),
+                'category': transaction.get('category'),
+                'paymentMethod': transaction.get('payment_method'),
+                'city': transaction.get('city'),
+                'fraudProbability': result['fraud_probability'],
+                'riskLevel': result['risk_level'],
+                'isFraud': bool(result['is_fraud']),
+                'timestamp': result['timestamp'],
+            })
+        flagged = [item for item in scored if item['riskLevel'] != 'Low']
+        fraud = [item for item in scored if item['isFraud']]
+
+        self.publish('scored', {'transactions': scored})
+        if flagged:
+            self.publish('flagged', {'transactions': flagged})
+        self.publish('stats', {
+            'totalTransactions': len(scored),
+            'fraudDetected': len(fraud),
+            'legitimateTransactions': len(scored) - len(fraud),
+            'flagged': len(flagged),
+            'fraudAmount': round(sum(item['amount'] or 0 for item in fraud), 2),
+        })
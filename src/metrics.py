@@ -0,0 +1,141 @@
+"""
+Counters and latency summaries exposed on /api/metrics
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Backend key prefix of shared counters
+COUNTER_PREFIX = 'metrics:'
+
+
+class LatencyStats:
+    """Running count/total/max plus a window of recent samples for percentiles"""
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        recent_ms = np.asarray(self.recent) * 1000
+        p50, p95, p99 = np.percentile(recent_ms, [50, 95, 99])
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total * 1000 / self.count, 4),
+            'p50_ms': round(float(p50), 4),
+            'p95_ms': round(float(p95), 4),
+            'p99_ms': round(float(p99), 4),
+            'max_ms': round(self.max * 1000, 4),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe named counters and latency timers.
+
+    Counters are per process unless use_backend() is called, after which
+    increments are buffered locally and flushed to the shared backend in
+    one batched call; reads flush first so they include this process's
+    latest increments. Latency windows always stay per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._latencies = {}
+        self._backend = None
+
+    def use_backend(self, backend, flush_seconds=1.0):
+        """Share counters across workers through a state backend"""
+        self.flush()
+        with self._lock:
+            self._backend = backend
+        threading.Thread(target=self._flush_loop, args=(flush_seconds,), name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self, flush_seconds):
+        while True:
+            time.sleep(flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing metrics: {e}")
+
+    def flush(self):
+        """Push buffered counter increments to the backend"""
+        with self._lock:
+            if self._backend is None or not self._counters:
+                return
+            pending, self._counters = self._counters, {}
+        try:
+            self._backend.incr_many({COUNTER_PREFIX + name: value for name, value in pending.items()})
+        except Exception:
+            with self._lock:
+                for name, value in pending.items():
+                    self._counters[name] = self._counters.get(name, 0) + value
+            raise
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self._latencies.get(name)
+            if stats is None:
+                stats = self._latencies[name] = LatencyStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name):
+        if self._backend is not None:
+            self.flush()
+            return self._backend.get(COUNTER_PREFIX + name) or 0
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def counters(self, names):
+        """Several counters in one backend round trip"""
+        if self._backend is not None:
+            self.flush()
+            values = self._backend.get_many([COUNTER_PREFIX + name for name in names])
+            return {name: value or 0 for name, value in zip(names, values)}
+        with self._lock:
+            return {name: self._counters.get(name, 0) for name in names}
+
+    def snapshot(self):
+        if self._backend is not None:
+            self.flush()
+            counters = {key[len(COUNTER_PREFIX):]: value
+                        for key, value in self._backend.get_prefix(COUNTER_PREFIX).items()}
+        else:
+            with self._lock:
+                counters = dict(self._counters)
+        with self._lock:
+            return {
+                'counters': counters,
+                'latencies': {name: stats.summary() for name, stats in self._latencies.items()},
+            }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,122 @@
+"""
+On-demand registry of per-segment fraud models with a memory-bounded LRU
+"""
+
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import metrics
+
+GLOBAL_SEGMENT = 'global'
+
+
+def segment_filename(value):
+    """File-system safe name for a segment value"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value)) + '.pkl'
+
+
+class ModelRegistry:
+    """Route transactions to segment models stored as <root>/<field>/<value>.pkl.
+
+    segment_keys are API fields tried in order; the first one with a trained
+    model wins and anything else goes to the global model. Segment models are
+    unpickled on first use and kept in an LRU whose budget is the sum of
+    their pickle sizes, which tracks the size of the numpy arrays inside
+    sklearn models closely.
+    """
+
+    def __init__(self, root, global_model, segment_keys, max_bytes):
+        self.root = root
+        self.global_model = global_model
+        self.segment_keys = list(segment_keys)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._loaded = OrderedDict()
+        self._loaded_bytes = 0
+        self.available = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-scan the registry directory for segment models"""
+        available = {}
+        for key in self.segment_keys:
+            directory = os.path.join(self.root, key)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith('.pkl'):
+                    path = os.path.join(directory, name)
+                    available[(key, name)] = (path, os.path.getsize(path))
+        self.available = available
+        return len(available)
+
+    def segment_for(self, transaction):
+        for key in self.segment_keys:
+            value = transaction.get(key)
+            if value is not None and (key, segment_filename(value)) in self.available:
+                return (key, segment_filename(value)), f'{key}={value}'
+        return None, GLOBAL_SEGMENT
+
+    def get(self, segment):
+        """Return the model for a (key, filename) segment, loading it if needed"""
+        with self._lock:
+            entry = self._loaded.get(segment)
+            if entry is not None:
+                self._loaded.move_to_end(segment)
+                metrics.incr('registry.hits')
+                return entry[0]
+            load_lock = self._load_locks.setdefault(segment, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._loaded.get(segment)
+                if entry is not None:
+                    return entry[0]
+            path, size = self.available[segment]
+            start = time.perf_counter()
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            metrics.observe('registry.load', time.perf_counter() - start)
+            metrics.incr('registry.misses')
+
+            with self._lock:
+                self._loaded[segment] = (model, size)
+                self._loaded_bytes += size
+                while self._loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+                    _, (_, evicted_size) = self._loaded.popitem(last=False)
+                    self._loaded_bytes -= evicted_size
+                    metrics.incr('registry.evictions')
+            return model
+
+    def predict_proba_routed(self, X, transactions):
+        """Fraud probabilities with one model call per segment present in the batch"""
+        groups = {}
+        names = []
+        for i, transaction in enumerate(transactions):
+            segment, name = self.segment_for(transaction)
+            groups.setdefault((segment, name), []).append(i)
+            names.append(name)
+
+        probabilities = np.empty(X.shape[0])
+        for (segment, name), rows in groups.items():
+            model = self.global_model if segment is None else self.get(segment)
+            probabilities[rows] = model.predict_proba(X[rows])[:, 1]
+            metrics.incr(f'registry.routed.{name}', len(rows))
+        return probabilities, np.array(names, dtype=object)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'segment_keys': self.segment_keys,
+                'available_segments': len(self.available),
+                'loaded_segments': len(self._loaded),
+                'loaded_bytes': self._loaded_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,141 @@
+"""
+Inverted-file (IVF) index for approximate nearest-neighbour lookup of
+similar historical fraud cases in the model's scaled feature space
+"""
+
+import math
+import threading
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+# Training sample for the coarse quantizer; more rows barely move the centroids
+KMEANS_SAMPLE = 100_000
+
+
+class IVFIndex:
+    """Vectors bucketed by nearest k-means centroid.
+
+    A query ranks the centroids, scans only the n_probe closest lists and
+    returns exact distances for the vectors found there, so cost grows with
+    the list size rather than the total number of vectors. Inserts append
+    to the nearest list, with list storage grown by doubling. Centroids are
+    fixed after train(); rebuild the index if the data drifts far from them.
+    """
+
+    def __init__(self, n_lists=None, n_probe=8):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.centroids = None
+        self._lock = threading.Lock()
+        self._vectors = []
+        self._rows = []
+        self._sizes = None
+        self.ids = []
+        self.sources = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, seed=42):
+        """Fit the coarse quantizer; n_lists defaults to about 4 * sqrt(n)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.n_lists is None:
+            self.n_lists = max(1, min(65536, int(4 * math.sqrt(len(vectors)))))
+        n_lists = min(self.n_lists, len(vectors))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE), replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=1, random_state=seed)
+        kmeans.fit(sample)
+
+        dim = vectors.shape[1]
+        with self._lock:
+            self.n_lists = n_lists
+            self.centroids = kmeans.cluster_centers_.astype(np.float32)
+            self._centroid_norms = (self.centroids ** 2).sum(axis=1)
+            self._vectors = [np.empty((0, dim), dtype=np.float32) for _ in range(n_lists)]
+            self._rows = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+            self._sizes = np.zeros(n_lists, dtype=np.int64)
+
+    def _nearest_lists(self, vectors, n):
+        """Indices of the n closest centroids for each vector (rows processed in chunks)"""
+        result = np.empty((len(vectors), n), dtype=np.int64)
+        for start in range(0, len(vectors), 65536):
+            chunk = vectors[start:start + 65536]
+            distances = self._centroid_norms - 2 * chunk @ self.centroids.T
+            if n == 1:
+                result[start:start + len(chunk), 0] = distances.argmin(axis=1)
+            else:
+                nearest = np.argpartition(distances, n - 1, axis=1)[:, :n]
+                order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+                result[start:start + len(chunk)] = np.take_along_axis(nearest, order, axis=1)
+        return result
+
+    def add(self, vectors, ids, source):
+        """Insert vectors with their ids; source names where they came from"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        lists = self._nearest_lists(vectors, 1)[:, 0]
+        order = np.argsort(lists, kind='stable')
+        boundaries = np.flatnonzero(np.diff(lists[order])) + 1
+
+        with self._lock:
+            first_row = len(self.ids)
+            self.ids.extend(ids)
+            self.sources.extend([source] * len(vectors))
+            for group in np.split(order, boundaries):
+                list_id = lists[group[0]]
+                size = self._sizes[list_id]
+                new_size = size + len(group)
+                if new_size > len(self._rows[list_id]):
+                    capacity = max(16, new_size, 2 * len(self._rows[list_id]))
+                    grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+                    grown[:size] = self._vectors[list_id][:size]
+                    self._vectors[list_id] = grown
+                    grown_rows = np.empty(capacity, dtype=np.int64)
+                    grown_rows[:size] = self._rows[list_id][:size]
+                    self._rows[list_id] = grown_rows
+                self._vectors[list_id][size:new_size] = vectors[group]
+                self._rows[list_id][size:new_size] = first_row + group
+                self._sizes[list_id] = new_size
+
+    def search(self, query, k=5, n_probe=None):
+        """The k nearest stored vectors to one query: [{'id', 'source', 'distance'}]"""
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        probed = self._nearest_lists(query, n_probe)[0]
+        with self._lock:
+            vectors = [self._vectors[i][:self._sizes[i]] for i in probed]
+            rows = [self._rows[i][:self._sizes[i]] for i in probed]
+        candidates = np.concatenate(vectors)
+        candidate_rows = np.concatenate(rows)
+        if not len(candidates):
+            return []
+
+        distances = ((candidates - query) ** 2).sum(axis=1)
+        k = min(k, len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [{
+            'id': self.ids[candidate_rows[i]],
+            'source': self.sources[candidate_rows[i]],
+            'distance': round(float(np.sqrt(distances[i])), 4),
+        } for i in top]
+
+    def stats(self):
+        with self._lock:
+            sizes = self._sizes if self._sizes is not None else np.zeros(1)
+            return {
+                'vectors': len(self.ids),
+                'lists': self.n_lists,
+                'n_probe': self.n_probe,
+                'largest_list': int(sizes.max()),
+                'mean_list': round(float(sizes.mean()), 1),
+            }
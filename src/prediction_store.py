@@ -0,0 +1,253 @@
+"""
+SQLite-backed store of scored transactions with keyset-paginated queries
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+FLAGGED_RISK_LEVELS = ('Medium', 'High')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id TEXT NOT NULL,
+    scored_at REAL NOT NULL,
+    fraud_probability REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    is_fraud INTEGER NOT NULL,
+    flagged INTEGER NOT NULL,
+    amount REAL,
+    payment_method TEXT,
+    category TEXT,
+    city TEXT,
+    device TEXT,
+    user_id TEXT,
+    risk_factors TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_transaction_id ON predictions (transaction_id);
+CREATE INDEX IF NOT EXISTS idx_flagged_time ON predictions (scored_at, id) WHERE flagged = 1;
+CREATE INDEX IF NOT EXISTS idx_flagged_id ON predictions (id) WHERE flagged = 1;
+CREATE INDEX IF NOT EXISTS idx_flagged_risk_id ON predictions (risk_level, id) WHERE flagged = 1;
+CREATE INDEX IF NOT EXISTS idx_flagged_payment_id ON predictions (payment_method, id) WHERE flagged = 1;
+CREATE INDEX IF NOT EXISTS idx_flagged_category_id ON predictions (category, id) WHERE flagged = 1;
+-- Superseded by the id-ordered indexes above
+DROP INDEX IF EXISTS idx_flagged_risk;
+DROP INDEX IF EXISTS idx_flagged_payment;
+DROP INDEX IF EXISTS idx_flagged_category;
+CREATE TABLE IF NOT EXISTS labels (
+    transaction_id TEXT PRIMARY KEY,
+    label INTEGER NOT NULL,
+    predicted INTEGER NOT NULL,
+    labeled_at REAL NOT NULL
+);
+"""
+
+
+def encode_cursor(row_id):
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        # Cursors issued before paging by id alone were "<scored_at>:<id>"
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode().rsplit(':', 1)[-1])
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class PredictionStore:
+    """Append-only log of predictions; flagged rows are covered by partial indexes.
+
+    Listing is ordered by id descending, which is scoring order since rows
+    are stored as they are scored, and continues below the last id of the
+    previous page. Rows of one batch share scored_at, so seeking on id alone
+    keeps every page an index seek however deep it is or however many rows
+    tie. A start/end range is turned into id bounds with one seek on the
+    time index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def add_many(self, transactions, results, scored_at=None):
+        """Store scored transactions alongside their API results"""
+        scored_at = scored_at if scored_at is not None else datetime.now().timestamp()
+        rows = []
+        for transaction, result in zip(transactions, results):
+            rows.append((
+                result['transaction_id'],
+                scored_at,
+                result['fraud_probability'],
+                result['risk_level'],
+                int(result['is_fraud']),
+                int(result['risk_level'] in FLAGGED_RISK_LEVELS),
+                transaction.get('amount'),
+                transaction.get('payment_method'),
+                transaction.get('category'),
+                transaction.get('city'),
+                transaction.get('device'),
+                str(transaction['user_id']) if transaction.get('user_id') is not None else None,
+                json.dumps(result.get('risk_factors', [])),
+                json.dumps(transaction, default=str),
+            ))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO predictions (transaction_id, scored_at, fraud_probability, risk_level, is_fraud, "
+                "flagged, amount, payment_method, category, city, device, user_id, risk_factors, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def list_flagged(self, limit=50, cursor=None, risk_level=None, min_probability=None,
+                     max_probability=None, start=None, end=None, payment_method=None, category=None):
+        """One page of flagged predictions, newest first, plus the cursor for the next page"""
+        if limit < 1:
+            raise ValueError(f"Invalid page size: {limit}")
+        clauses = ["flagged = 1"]
+        params = []
+        if cursor:
+            clauses.append("id < ?")
+            params.append(decode_cursor(cursor))
+        for column, value in (('risk_level', risk_level), ('payment_method', payment_method),
+                              ('category', category)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_probability is not None:
+            clauses.append("fraud_probability >= ?")
+            params.append(min_probability)
+        if max_probability is not None:
+            clauses.append("fraud_probability <= ?")
+            params.append(max_probability)
+
+        with self._lock:
+            # A time range also bounds the id scan, so rows outside it are never read
+            if start is not None:
+                first_id = self._first_flagged_id(start)
+                if first_id is None:
+                    return [], None
+                clauses.extend(["id >= ?", "scored_at >= ?"])
+                params.extend([first_id, start])
+            if end is not None:
+                end_id = self._first_flagged_id(end)
+                if end_id is not None:
+                    clauses.append("id < ?")
+                    params.append(end_id)
+                clauses.append("scored_at < ?")
+                params.append(end)
+            params.append(limit + 1)
+            rows = self._conn.execute(
+                "SELECT id, transaction_id, scored_at, fraud_probability, risk_level, amount, payment_method, "
+                "category, city, device, user_id, risk_factors FROM predictions "
+                f"WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?",
+                params
+            ).fetchall()
+
+        next_cursor = None
+        if rows and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0])
+        return [self._flagged_row(row) for row in rows], next_cursor
+
+    def _first_flagged_id(self, timestamp):
+        """Id of the first flagged row scored at or after timestamp, or None"""
+        row = self._conn.execute(
+            "SELECT id FROM predictions WHERE flagged = 1 AND scored_at >= ? ORDER BY scored_at, id LIMIT 1",
+            (timestamp,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def attach_labels(self, labels, labeled_at=None):
+        """Record true labels [(transaction_id, 0/1), ...] against logged predictions.
+
+        Labels are staged in a temp table and joined to the latest prediction
+        per transaction id through the transaction_id index, so a chunk costs
+        one bulk insert and one indexed join. The first label for a
+        transaction wins; repeats are counted but not applied again. Returns
+        (newly labeled rows as (transaction_id, predicted, label, payload),
+        number already labeled).
+        """
+        labeled_at = labeled_at if labeled_at is not None else datetime.now().timestamp()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS incoming_labels (transaction_id TEXT PRIMARY KEY, label INTEGER NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM incoming_labels")
+            self._conn.executemany("INSERT OR REPLACE INTO incoming_labels VALUES (?, ?)", labels)
+            already_labeled = self._conn.execute(
+                "SELECT COUNT(*) FROM incoming_labels i JOIN labels l ON l.transaction_id = i.transaction_id"
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT i.transaction_id, p.is_fraud, i.label, p.payload FROM incoming_labels i "
+                "JOIN predictions p ON p.id = (SELECT MAX(id) FROM predictions WHERE transaction_id = i.transaction_id) "
+                "WHERE NOT EXISTS (SELECT 1 FROM labels l WHERE l.transaction_id = i.transaction_id)"
+            ).fetchall()
+            self._conn.executemany(
+                "INSERT INTO labels (transaction_id, label, predicted, labeled_at) VALUES (?, ?, ?, ?)",
+                [(transaction_id, label, predicted, labeled_at) for transaction_id, predicted, label, _ in rows]
+            )
+            self._conn.execute("DELETE FROM incoming_labels")
+            self._conn.commit()
+        return rows, already_labeled
+
+    def label_confusion(self):
+        """{(predicted, label): count} over every stored label"""
+        with self._lock:
+            rows = self._conn.execute("SELECT predicted, label, COUNT(*) FROM labels GROUP BY predicted, label").fetchall()
+        return {(predicted, label): count for predicted, label, count in rows}
+
+    def get_payload(self, transaction_id):
+        """The transaction as submitted for scoring, or None if it was never logged"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM predictions WHERE transaction_id = ? ORDER BY id DESC LIMIT 1",
+                (transaction_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def iter_payloads(self, fraud_only=True, batch_size=10000):
+        """Yield lists of (transaction_id, payload) in log order, one id-range seek per batch"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, transaction_id, payload FROM predictions WHERE id > ? "
+                    f"{'AND is_fraud = 1 ' if fraud_only else ''}ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [(transaction_id, json.loads(payload)) for _, transaction_id, payload in rows if payload]
+
+    @staticmethod
+    def _flagged_row(row):
+        (row_id, transaction_id, scored_at, fraud_probability, risk_level, amount, payment_method,
+         category, city, device, user_id, risk_factors) = row
+        return {
+            'id': str(row_id),
+            'transactionId': transaction_id,
+            'amount': amount,
+            'paymentMethod': payment_method,
+            'category': category,
+            'city': city,
+            'device': device,
+            'userEmail': f'user_{user_id}@email.com' if user_id is not None else None,
+            'fraudProbability': fraud_probability,
+            'riskLevel': risk_level,
+            'status': 'pending',
+            'flaggedAt': datetime.fromtimestamp(scored_at).isoformat(),
+            'riskFactors': json.loads(risk_factors),
+        }
@@ -0,0 +1,150 @@
+"""
+Sampling profiler for slow or randomly chosen API requests
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+MAX_STACK_DEPTH = 128
+
+
+class _Session:
+    def __init__(self, thread_id, sampled):
+        self.thread_id = thread_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.finished = False
+
+
+class RequestProfiler:
+    """Statistical stack sampler armed only while a watched request is running.
+
+    A request is watched if it is picked by sample_rate, or if slow_ms is set
+    (so its profile can be kept should it turn out slow). A background thread
+    wakes every interval while at least one request is watched and records
+    the watched threads' stacks; with no watched requests it blocks on an
+    event and costs nothing. Kept profiles go into a bounded ring buffer.
+    """
+
+    def __init__(self, sample_rate=0.0, slow_ms=0.0, interval_ms=2.0, capacity=50):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000
+        self.profiles = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or self.slow_ms > 0
+
+    def configure(self, sample_rate=None, slow_ms=None):
+        if sample_rate is not None:
+            self.sample_rate = float(sample_rate)
+        if slow_ms is not None:
+            self.slow_ms = float(slow_ms)
+
+    def start_request(self):
+        """Arm sampling for the current thread; returns a session or None"""
+        if not self.enabled:
+            return None
+        sampled = random.random() < self.sample_rate
+        if not sampled and self.slow_ms <= 0:
+            return None
+        session = _Session(threading.get_ident(), sampled)
+        with self._lock:
+            self._sessions[session.thread_id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return session
+
+    def finish_request(self, session, metadata):
+        """Disarm sampling and keep the profile if it was sampled or slow"""
+        if session is None or session.finished:
+            return
+        session.finished = True
+        duration_ms = (time.perf_counter() - session.started) * 1000
+        with self._lock:
+            self._sessions.pop(session.thread_id, None)
+
+        slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+        if not (session.sampled or slow):
+            return
+        self.profiles.append({
+            'id': next(self._ids),
+            'reason': 'slow' if slow else 'sampled',
+            'duration_ms': round(duration_ms, 3),
+            'samples': sum(session.stacks.values()),
+            'interval_ms': self.interval * 1000,
+            'finished_at': datetime.now().isoformat(),
+            **metadata,
+            'stacks': session.stacks,
+        })
+
+    def _run(self):
+        while True:
+            with self._lock:
+                sessions = list(self._sessions.values())
+            if not sessions:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for session in sessions:
+                frame = frames.get(session.thread_id)
+                if frame is not None:
+                    session.stacks[self._stack(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _stack(frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def list_profiles(self):
+        return [{k: v for k, v in p.items() if k != 'stacks'} for p in list(self.profiles)]
+
+    def get_profile(self, profile_id):
+        for profile in list(self.profiles):
+            if profile['id'] == profile_id:
+                return profile
+        return None
+
+    @staticmethod
+    def collapsed(profile):
+        """Folded stacks ('root;child;leaf count'), as read by flamegraph.pl and speedscope"""
+        return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in profile['stacks'].most_common())
+
+    @staticmethod
+    def call_tree(profile):
+        """Nested {name, samples, children} call tree built from the sampled stacks"""
+        root = {'name': 'root', 'samples': 0, 'children': {}}
+        for stack, count in profile['stacks'].items():
+            node = root
+            node['samples'] += count
+            for name in stack:
+                node = node['children'].setdefault(name, {'name': name, 'samples': 0, 'children': {}})
+                node['samples'] += count
+
+        def finalize(node):
+            children = sorted(node['children'].values(), key=lambda c: -c['samples'])
+            return {'name': node['name'], 'samples': node['samples'], 'children': [finalize(c) for c in children]}
+
+        return finalize(root)
@@ -0,0 +1,273 @@
+"""
+Background retraining: run retrain_model.py in a resource-limited child
+process, validate the staged model and promote it only if it passes
+"""
+
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+from features import encode_frame
+from metrics import metrics
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Files retrain_model.py writes that make up a servable model
+PROMOTED_FILES = ('fraud_model.pkl', 'scaler.pkl', 'feature_info.pkl', 'drift_reference.pkl')
+
+# Trained against one release's scaler and feature layout by distill_model.py and
+# train_segment_models.py; a new release starts without them
+DEPENDENT_ARTIFACTS = ('student_model.pkl', 'student_model_report.json', 'segments')
+
+# Promoted releases live in models/releases/<job_id>; models/current points at the served one
+RELEASES_DIR = 'releases'
+CURRENT_LINK = 'current'
+
+ACTIVE_STATES = ('queued', 'training', 'validating', 'promoting')
+
+
+class RetrainJob:
+    def __init__(self, job_id, staging_dir):
+        self.id = job_id
+        self.staging_dir = staging_dir
+        self.status = 'queued'
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.validation = None
+        self.error = None
+
+    @property
+    def log_path(self):
+        return os.path.join(self.staging_dir, 'train.log')
+
+    def log_tail(self, lines=20):
+        try:
+            with open(self.log_path, errors='replace') as f:
+                return f.read().splitlines()[-lines:]
+        except OSError:
+            return []
+
+    def to_dict(self, log_lines=0):
+        job = {
+            'id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'validation': self.validation,
+            'error': self.error,
+        }
+        if log_lines:
+            job['log'] = self.log_tail(log_lines)
+        return job
+
+
+def served_dir(models_dir):
+    """Directory the served model set is read from.
+
+    That is the release models/current points at, or models/ itself before
+    anything has been promoted. Resolve it once per load and read every file
+    from the result, so a set never mixes two releases.
+    """
+    current = os.path.join(models_dir, CURRENT_LINK)
+    if os.path.islink(current):
+        return os.path.realpath(current)
+    return os.path.abspath(models_dir)
+
+
+def load_candidate(directory):
+    model_files = {}
+    for name in ('fraud_model.pkl', 'scaler.pkl', 'feature_info.pkl'):
+        with open(os.path.join(directory, name), 'rb') as f:
+            model_files[name] = pickle.load(f)
+    return model_files['fraud_model.pkl'], model_files['scaler.pkl'], model_files['feature_info.pkl']
+
+
+def holdout_scores(model, scaler, feature_info, holdout):
+    X = encode_frame(holdout.drop(columns=['is_fraud']), feature_info, scaler)
+    y = holdout['is_fraud'].to_numpy()
+    probabilities = model.predict_proba(X)[:, 1]
+    predictions = (probabilities > 0.5).astype(int)
+    return {
+        'auc': round(float(roc_auc_score(y, probabilities)), 4),
+        'f1': round(float(f1_score(y, predictions)), 4),
+        'accuracy': round(float(accuracy_score(y, predictions)), 4),
+    }, X
+
+
+def single_row_latency_ms(model, X, n_rows=200):
+    """p50/p99 of one-row predict_proba, the shape /api/predict calls the model with"""
+    timings = []
+    for i in range(min(n_rows, X.shape[0])):
+        # Slicing keeps the row 2-D for dense arrays and CSR alike
+        row = X[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p99 = np.percentile(timings, [50, 99])
+    return round(float(p50), 3), round(float(p99), 3)
+
+
+class RetrainRunner:
+    """Runs one retraining job at a time in a background thread.
+
+    The child runs through run_limited.py under nice and rlimits (address
+    space and CPU seconds), so a retrain cannot starve or exhaust the serving
+    process. Its output goes to a per-job staging directory; the candidate is
+    scored on the holdout retrain_model.py saved, against the served
+    fraud_model.pkl it would replace on the same rows, and timed on
+    single-row predictions. Only a passing candidate is promoted: it is
+    copied into a new release directory and models/current is switched to it
+    with a single rename, then on_promote reloads it. The last keep_releases
+    releases are kept for rollback.
+    """
+
+    def __init__(self, models_dir, on_promote, min_auc=0.8, max_auc_drop=0.01,
+                 latency_budget_ms=50.0, nice=10, memory_limit_mb=4096, cpu_limit_seconds=3600,
+                 timeout_seconds=7200, history=20, keep_releases=5, encoding='dense'):
+        self.models_dir = os.path.abspath(models_dir)
+        self.staging_root = os.path.join(self.models_dir, 'staging')
+        self.releases_root = os.path.join(self.models_dir, RELEASES_DIR)
+        self.on_promote = on_promote
+        self.min_auc = min_auc
+        self.max_auc_drop = max_auc_drop
+        self.latency_budget_ms = latency_budget_ms
+        self.nice = nice
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_seconds = cpu_limit_seconds
+        self.timeout_seconds = timeout_seconds
+        self.history = history
+        self.keep_releases = keep_releases
+        self.encoding = encoding
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self):
+        """Start a retraining job; raises RuntimeError if one is already active"""
+        with self._lock:
+            active = [job for job in self._jobs.values() if job.status in ACTIVE_STATES]
+            if active:
+                raise RuntimeError(f"Retraining job {active[0].id} is already {active[0].status}")
+            job_id = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            job = RetrainJob(job_id, os.path.join(self.staging_root, job_id))
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.history:
+                old_id, old_job = next(iter(self._jobs.items()))
+                if old_job.status in ACTIVE_STATES:
+                    break
+                self._jobs.pop(old_id)
+                shutil.rmtree(old_job.staging_dir, ignore_errors=True)
+        threading.Thread(target=self._run, args=(job,), name=f'retrain-{job_id}', daemon=True).start()
+        metrics.incr('retrain.submitted')
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(reversed(self._jobs.values()))
+
+    def command(self, job):
+        """retrain_model.py for a job, behind run_limited.py so the child sets its own limits"""
+        return [sys.executable, 'run_limited.py', '--nice', str(self.nice),
+                '--memory-mb', str(self.memory_limit_mb), '--cpu-seconds', str(self.cpu_limit_seconds),
+                '--', 'retrain_model.py', '--output-dir', job.staging_dir, '--encoding', self.encoding]
+
+    def _run(self, job):
+        job.started_at = datetime.now().isoformat()
+        try:
+            os.makedirs(job.staging_dir, exist_ok=True)
+            job.status = 'training'
+            with open(job.log_path, 'w') as log:
+                process = subprocess.Popen(self.command(job), cwd=SRC_DIR, stdout=log,
+                                           stderr=subprocess.STDOUT)
+                try:
+                    returncode = process.wait(timeout=self.timeout_seconds)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+                    raise RuntimeError(f"Training exceeded {self.timeout_seconds}s and was killed")
+            if returncode != 0:
+                raise RuntimeError(f"retrain_model.py exited with status {returncode}")
+
+            job.status = 'validating'
+            job.validation = self.validate(job.staging_dir)
+            if not job.validation['passed']:
+                job.status = 'rejected'
+                metrics.incr('retrain.rejected')
+                return
+
+            job.status = 'promoting'
+            self.promote(job.staging_dir, job.id)
+            job.status = 'promoted'
+            metrics.incr('retrain.promoted')
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            metrics.incr('retrain.failed')
+        finally:
+            job.finished_at = datetime.now().isoformat()
+
+    def validate(self, staging_dir):
+        """Holdout scores of the candidate and of the model it replaces, plus the candidate's latency.
+
+        The comparison is always with the served fraud_model.pkl, whichever
+        variant the API scores with, since that is the file promotion
+        replaces. invalidates lists the dependent artifacts of the served
+        release that the new release will not have.
+        """
+        holdout = pd.read_csv(os.path.join(staging_dir, 'holdout.csv'))
+        candidate = load_candidate(staging_dir)
+        scores, X = holdout_scores(*candidate, holdout)
+        p50_ms, p99_ms = single_row_latency_ms(candidate[0], X)
+        report = {'candidate': scores, 'latency_p50_ms': p50_ms, 'latency_p99_ms': p99_ms, 'checks': {}}
+
+        current_dir = served_dir(self.models_dir)
+        if os.path.exists(os.path.join(current_dir, 'fraud_model.pkl')):
+            report['current'], _ = holdout_scores(*load_candidate(current_dir), holdout)
+            report['checks']['auc_vs_current'] = scores['auc'] >= report['current']['auc'] - self.max_auc_drop
+        report['checks']['min_auc'] = scores['auc'] >= self.min_auc
+        report['checks']['latency_budget'] = p99_ms <= self.latency_budget_ms
+        report['passed'] = all(report['checks'].values())
+        report['invalidates'] = [name for name in DEPENDENT_ARTIFACTS
+                                 if os.path.exists(os.path.join(current_dir, name))]
+        return report
+
+    def promote(self, staging_dir, release_id):
+        """Copy the staged files into a new release and point models/current at it"""
+        release_dir = os.path.join(self.releases_root, release_id)
+        tmp_dir = f"{release_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name in PROMOTED_FILES:
+            shutil.copy2(os.path.join(staging_dir, name), os.path.join(tmp_dir, name))
+        os.rename(tmp_dir, release_dir)
+
+        # Readers resolve the link once per load, so they see the old release or the new one
+        tmp_link = os.path.join(self.models_dir, f".{CURRENT_LINK}.{os.getpid()}")
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.path.join(RELEASES_DIR, release_id), tmp_link)
+        os.replace(tmp_link, os.path.join(self.models_dir, CURRENT_LINK))
+        self.prune_releases()
+        self.on_promote()
+
+    def prune_releases(self):
+        """Drop all but the newest keep_releases releases, never the served one"""
+        served = served_dir(self.models_dir)
+        releases = sorted(name for name in os.listdir(self.releases_root) if not name.endswith('.tmp'))
+        for name in releases[:-self.keep_releases] if self.keep_releases else releases:
+            path = os.path.join(self.releases_root, name)
+            if os.path.realpath(path) != served:
+                shutil.rmtree(path, ignore_errors=True)
@@ -3,15 +3,29 @@
 Retrain fraud detection model using only API-available features
 """
 
+import argparse
+import glob
+import os
 import pandas as pd
 import pickle
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, StackingClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import MaxAbsScaler, StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from imblearn.over_sampling import SMOTE
+from drift_monitor import build_reference
+from features import API_FEATURES, CATEGORICAL_COLUMNS, HASH_WIDTH, HASHED_COLUMNS, HashedEncoder
+from stacking_model import build_model
+
+parser = argparse.ArgumentParser(description="Retrain the stacking model on API-compatible features")
+parser.add_argument("--output-dir", default="../models",
+                    help="where to write the model files (retrain_jobs.py points this at a staging directory)")
+parser.add_argument("--labeled-dir", default="../data/labeled", help="labeled partitions written by labels.py")
+parser.add_argument("--encoding", choices=["dense", "hashed"], default="dense",
+                    help="'hashed' keeps ip_address and user_id as hashed sparse features")
+parser.add_argument("--hash-width", type=int, default=HASH_WIDTH, help="columns per hashed field")
+args = parser.parse_args()
+os.makedirs(args.output_dir, exist_ok=True)
 
 print("🔄 Retraining fraud detection model with API-compatible features...")
 
@@ -22,20 +36,29 @@ data_path = "../data/sophisticated_indian_dataset.csv"
 df = pd.read_csv(data_path)
 print("� Sophisticated Indian Dataset Loaded Successfully")
 
+# Labeled production traffic appended by labels.py (chargebacks and feedback)
+labeled_paths = sorted(glob.glob(os.path.join(args.labeled_dir, "date=*", "part-*.jsonl")))
+if labeled_paths:
+    labeled = pd.concat([pd.read_json(path, lines=True) for path in labeled_paths], ignore_index=True)
+    labeled = labeled.rename(columns={'city': 'country'})
+    df = pd.concat([df, labeled], ignore_index=True)
+    print(f"🏷️  Added {len(labeled)} labeled production transactions from {len(labeled_paths)} partitions")
+
 # ============================
 # 2. Feature Selection (API-compatible only)
 # ============================
 
 # Select only the features that the API can provide
-api_features = [
-    'amount', 'hour', 'day_of_week', 'category', 'age', 'gender',
-    'country', 'device', 'payment_method', 'item_quantity',
-    'shipping_address', 'browser_info'
-]
+api_features = list(API_FEATURES)
+if args.encoding == 'hashed':
+    api_features += list(HASHED_COLUMNS)
 
-# Keep only API-compatible features
-X = df[api_features].copy()
-y = df['is_fraud']
+# Keep only API-compatible features; fields a scoring request omitted are
+# zero, as the API's preprocessing treats them
+X = df.reindex(columns=api_features)
+numeric_features = [c for c in X.columns[X.dtypes != object] if c not in HASHED_COLUMNS]
+X[numeric_features] = X[numeric_features].fillna(0)
+y = df['is_fraud'].astype(int)
 
 print(f"📊 Using {len(api_features)} API-compatible features")
 print(f"📈 Dataset shape: {X.shape}")
@@ -45,21 +68,31 @@ print(f"📈 Dataset shape: {X.shape}")
 # ============================
 
 # One-hot encode categorical variables (same as training)
-categorical_columns = ['category', 'gender', 'country', 'device', 'payment_method', 'shipping_address', 'browser_info']
-
-print("🔧 One-hot encoding categorical features...")
-X_encoded = pd.get_dummies(X, columns=categorical_columns, drop_first=True)
+categorical_columns = CATEGORICAL_COLUMNS
+
+if args.encoding == 'hashed':
+    # One-hot for the low-cardinality fields, fixed-width hashing for the rest;
+    # MaxAbsScaler scales CSR without centering, so the matrix stays sparse
+    print(f"🔧 Hashing {', '.join(HASHED_COLUMNS)} into {args.hash_width} columns each...")
+    encoder = HashedEncoder(numeric_features, categorical_columns, HASHED_COLUMNS, args.hash_width).fit(X)
+    X_encoded = encoder.transform(X)
+    feature_columns = encoder.feature_columns
+    scaler = MaxAbsScaler()
+    print(f"📈 After encoding shape: {X_encoded.shape} ({X_encoded.nnz} non-zeros)")
+else:
+    print("🔧 One-hot encoding categorical features...")
+    X_encoded = pd.get_dummies(X, columns=categorical_columns, drop_first=True)
+    feature_columns = list(X_encoded.columns)
+    # Standardize all features
+    scaler = StandardScaler()
+    print(f"📈 After encoding shape: {X_encoded.shape}")
+    print(f"📝 Features: {feature_columns}")
 
-print(f"📈 After encoding shape: {X_encoded.shape}")
-print(f"📝 Features: {list(X_encoded.columns)}")
-
-# Standardize all features
-scaler = StandardScaler()
 X_scaled = scaler.fit_transform(X_encoded)
 
 # Split with stratification to preserve class balance
-X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.2, stratify=y, random_state=42
+X_train, X_test, y_train, y_test, _, test_index = train_test_split(
+    X_scaled, y, df.index, test_size=0.2, stratify=y, random_state=42
 )
 
 # Handle class imbalance (just in case)
@@ -75,21 +108,7 @@ print(f"📊 Test set shape: {X_test.shape}")
 
 print("🤖 Building stacking classifier...")
 
-# Base models with balanced class weights
-base_models = [
-    ("rf", RandomForestClassifier(n_estimators=100, random_state=42, class_weight="balanced")),
-    ("lr", LogisticRegression(max_iter=1000, class_weight="balanced")),
-]
-
-# Meta model
-meta_model = LogisticRegression(max_iter=1000, class_weight="balanced")
-
-# Stacking classifier
-model = StackingClassifier(
-    estimators=base_models,
-    final_estimator=meta_model,
-    passthrough=True
-)
+model = build_model()
 
 # ============================
 # 5. Train the Model
@@ -118,28 +137,41 @@ print(confusion_matrix(y_test, y_pred))
 print("💾 Saving model and preprocessing info...")
 
 # Save the model
-with open("../models/fraud_model.pkl", "wb") as f:
+with open(os.path.join(args.output_dir, "fraud_model.pkl"), "wb") as f:
     pickle.dump(model, f)
 
 # Save the scaler
-with open("../models/scaler.pkl", "wb") as f:
+with open(os.path.join(args.output_dir, "scaler.pkl"), "wb") as f:
     pickle.dump(scaler, f)
 
 # Save feature columns for API consistency
 feature_info = {
-    'feature_columns': list(X_encoded.columns),
+    'feature_columns': feature_columns,
     'n_features': X_encoded.shape[1],
     'categorical_columns': categorical_columns,
-    'api_features': api_features
+    'api_features': api_features,
+    'encoding': args.encoding
 }
+if args.encoding == 'hashed':
+    feature_info['encoder'] = encoder
+    feature_info['hashed_columns'] = list(HASHED_COLUMNS)
 
-with open("../models/feature_info.pkl", "wb") as f:
+with open(os.path.join(args.output_dir, "feature_info.pkl"), "wb") as f:
     pickle.dump(feature_info, f)
 
+# Save reference distributions for live drift monitoring
+with open(os.path.join(args.output_dir, "drift_reference.pkl"), "wb") as f:
+    pickle.dump(build_reference(df), f)
+
+# Save the untouched holdout rows so a candidate model can be validated the way the API scores
+X.loc[test_index].assign(is_fraud=y.loc[test_index]).to_csv(os.path.join(args.output_dir, "holdout.csv"), index=False)
+
 print(f"\n✅ Model saved successfully!")
-print(f"📁 Saved files:")
+print(f"📁 Saved files to {args.output_dir}:")
 print(f"   - fraud_model.pkl")
 print(f"   - scaler.pkl") 
 print(f"   - feature_info.pkl")
+print(f"   - drift_reference.pkl")
+print(f"   - holdout.csv")
 print(f"\n🎯 Model is now compatible with API features!")
 print(f"📊 Expected features: {X_encoded.shape[1]}")
\ No newline at end of file
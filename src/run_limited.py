@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Run a Python script at lower priority under memory and CPU-time limits.
+
+The limits are set here, in the child, before it execs the script. Setting
+them from the parent with preexec_fn is not safe in a threaded server.
+
+    python run_limited.py --nice 10 --memory-mb 4096 --cpu-seconds 3600 -- retrain_model.py --output-dir ...
+"""
+
+import argparse
+import os
+import resource
+import sys
+
+
+def apply_limits(nice=0, memory_mb=0, cpu_seconds=0):
+    """Lower this process's priority and cap its address space and CPU seconds; 0 leaves one alone"""
+    if nice:
+        os.nice(nice)
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Python script under nice and rlimits")
+    parser.add_argument("--nice", type=int, default=0, help="niceness increment")
+    parser.add_argument("--memory-mb", type=int, default=0, help="address space limit, 0 for none")
+    parser.add_argument("--cpu-seconds", type=int, default=0, help="CPU time limit, 0 for none")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="-- script [args...]")
+    args = parser.parse_args(argv)
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error("no script given")
+    apply_limits(args.nice, args.memory_mb, args.cpu_seconds)
+    os.execv(sys.executable, [sys.executable, *command])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""
+The stacking classifier the retraining, segment and benchmark scripts fit
+"""
+
+from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+from sklearn.linear_model import LogisticRegression
+
+
+def build_model(n_estimators=100):
+    """Balanced random forest and logistic regression, stacked by a logistic regression with passthrough"""
+    base_models = [
+        ("rf", RandomForestClassifier(n_estimators=n_estimators, random_state=42, class_weight="balanced")),
+        ("lr", LogisticRegression(max_iter=1000, class_weight="balanced")),
+    ]
+    meta_model = LogisticRegression(max_iter=1000, class_weight="balanced")
+    return StackingClassifier(estimators=base_models, final_estimator=meta_model, passthrough=True)
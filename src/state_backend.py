@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Key-value state shared by API workers: counters, TTL entries and ring buffers.
+
+LocalBackend keeps the state in this process. SocketBackend talks to a
+StateServer over a Unix socket, so every worker on a node sees the same
+state; a networked store would implement the same methods.
+"""
+
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing.connection import Client, Listener
+
+DEFAULT_AUTHKEY = b'fraudguard-state'
+
+# Operations a SocketBackend may invoke on the server
+OPERATIONS = ('get', 'get_many', 'set', 'set_nx', 'delete', 'incr', 'incr_many',
+              'ring_push', 'ring_range', 'get_prefix', 'execute_many', 'size')
+
+
+class StateBackendError(Exception):
+    """The state server rejected or failed an operation"""
+
+
+class LocalBackend:
+    """Thread-safe in-process store; the reference implementation of the interface.
+
+    Keys are kept in least-recently-used order: every read or write of a
+    key moves it to the back, and the front is evicted beyond max_keys, so
+    busy counters outlive one-off idempotency keys. Expired keys are dropped
+    when read or when they reach the eviction end.
+    """
+
+    def __init__(self, max_keys=1_000_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def _write(self, key, value, ttl):
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.time())
+        return _export(item[0]) if item else None
+
+    def get_many(self, keys):
+        now = time.time()
+        with self._lock:
+            items = [self._live(key, now) for key in keys]
+        return [_export(item[0]) if item else None for item in items]
+
+    def get_prefix(self, prefix):
+        """All live keys starting with prefix; a scan, meant for metrics and admin reads"""
+        now = time.time()
+        with self._lock:
+            return {key: _export(value) for key, (value, expires) in self._data.items()
+                    if key.startswith(prefix) and (expires is None or expires > now)}
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._write(key, value, ttl)
+
+    def set_nx(self, key, value, ttl=None):
+        """Set only if absent; True if this call created the key"""
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            self._write(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def incr(self, key, amount=1, ttl=None):
+        """Add to a counter and return the new value; ttl applies when the counter is created"""
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                self._write(key, amount, ttl)
+                return amount
+            value = item[0] + amount
+            self._data[key] = (value, item[1])
+            return value
+
+    def incr_many(self, amounts):
+        """Apply {key: amount} under one lock; returns the new values in the same order"""
+        now = time.time()
+        with self._lock:
+            values = []
+            for key, amount in amounts.items():
+                item = self._live(key, now)
+                value = amount if item is None else item[0] + amount
+                if item is None:
+                    self._write(key, value, None)
+                else:
+                    self._data[key] = (value, item[1])
+                values.append(value)
+            return values
+
+    def ring_push(self, key, value, maxlen, ttl=None):
+        """Append to a bounded ring buffer (oldest entries fall off); returns its length"""
+        with self._lock:
+            item = self._live(key, time.time())
+            ring = item[0] if item is not None else deque(maxlen=maxlen)
+            ring.append(value)
+            self._write(key, ring, ttl)
+            return len(ring)
+
+    def ring_range(self, key, count=None):
+        """The newest count entries of a ring buffer, oldest first"""
+        with self._lock:
+            item = self._live(key, time.time())
+            if item is None:
+                return []
+            ring = list(item[0])
+        return ring[-count:] if count else ring
+
+    def execute_many(self, calls):
+        """Run [(operation, args), ...] and return their results; one round trip remotely"""
+        for operation, _ in calls:
+            if operation not in OPERATIONS or operation == 'execute_many':
+                raise StateBackendError(f"Unknown operation: {operation}")
+        return [getattr(self, operation)(*args) for operation, args in calls]
+
+    def size(self):
+        with self._lock:
+            return len(self._data)
+
+
+def _export(value):
+    return list(value) if isinstance(value, deque) else value
+
+
+class SocketBackend:
+    """Client of a StateServer; one connection per thread, created on first use"""
+
+    def __init__(self, address, authkey=DEFAULT_AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _call(self, operation, *args):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        try:
+            conn.send((operation, args))
+            ok, result = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if not ok:
+            raise StateBackendError(result)
+        return result
+
+    def __getattr__(self, operation):
+        if operation not in OPERATIONS:
+            raise AttributeError(operation)
+        return lambda *args: self._call(operation, *args)
+
+
+class StateServer:
+    """Serves a LocalBackend on a Unix socket, one thread per client connection"""
+
+    def __init__(self, address, authkey=DEFAULT_AUTHKEY, max_keys=1_000_000):
+        self.address = address
+        self.backend = LocalBackend(max_keys=max_keys)
+        if os.path.exists(address):
+            os.unlink(address)
+        self._listener = Listener(address, family='AF_UNIX', authkey=authkey)
+        os.chmod(address, 0o600)
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            except Exception:
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    operation, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if operation not in OPERATIONS:
+                    conn.send((False, f"Unknown operation: {operation}"))
+                    continue
+                try:
+                    conn.send((True, getattr(self.backend, operation)(*args)))
+                except Exception as e:
+                    conn.send((False, f"{type(e).__name__}: {e}"))
+
+    def close(self):
+        self._listener.close()
+
+
+def create_backend(url):
+    """'local' for in-process state, 'unix:/path/to.sock' for a StateServer"""
+    if url == 'local':
+        return LocalBackend()
+    if url.startswith('unix:'):
+        return SocketBackend(url[len('unix:'):])
+    raise ValueError(f"Unsupported state backend: {url}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the shared state server for API workers on this node")
+    parser.add_argument("--socket", default="/tmp/fraudguard-state.sock")
+    parser.add_argument("--max-keys", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    server = StateServer(args.socket, max_keys=args.max_keys)
+    print(f"🗄️  State server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.close()
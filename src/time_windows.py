@@ -0,0 +1,120 @@
+"""
+Per-minute and per-hour bucketed aggregates for rolling-window analytics
+"""
+
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Windows up to this long are answered from minute buckets, longer ones from hour buckets
+MINUTE_WINDOW_LIMIT = 3 * 3600
+
+_DURATION = re.compile(r'^(\d+)([mhd])$')
+_UNIT_SECONDS = {'m': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(text):
+    """Parse '15m', '1h', '7d' into seconds"""
+    match = _DURATION.match(text.strip())
+    if not match:
+        raise ValueError(f"Invalid window: {text} (expected e.g. 15m, 1h, 7d)")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+class BucketRing:
+    """Fixed-size ring of time buckets holding count, fraud count and amount sum.
+
+    A slot is reused when time moves past it, so old buckets expire without
+    any sweeping; a slot is only valid if it still holds the bucket a query
+    asks for.
+    """
+
+    def __init__(self, width_seconds, n_buckets):
+        self.width = width_seconds
+        self.n_buckets = n_buckets
+        self.bucket_ids = np.full(n_buckets, -1, dtype=np.int64)
+        self.values = np.zeros((n_buckets, 3))
+        self.latest = -1
+
+    def add_many(self, timestamps, is_fraud, amounts):
+        buckets = (np.asarray(timestamps, dtype=np.float64) // self.width).astype(np.int64)
+        if not len(buckets):
+            return
+        self.latest = max(self.latest, int(buckets.max()))
+        keep = buckets > self.latest - self.n_buckets
+        unique, inverse = np.unique(buckets[keep], return_inverse=True)
+        sums = np.column_stack([
+            np.bincount(inverse, minlength=len(unique)),
+            np.bincount(inverse, weights=np.asarray(is_fraud, dtype=np.float64)[keep], minlength=len(unique)),
+            np.bincount(inverse, weights=np.asarray(amounts, dtype=np.float64)[keep], minlength=len(unique)),
+        ])
+        slots = unique % self.n_buckets
+        stale = self.bucket_ids[slots] != unique
+        self.values[slots[stale]] = 0
+        self.bucket_ids[slots] = unique
+        self.values[slots] += sums
+
+    def window(self, end_timestamp, n_buckets):
+        """Sum the n_buckets buckets ending at the one containing end_timestamp"""
+        n_buckets = min(n_buckets, self.n_buckets)
+        end = int(end_timestamp // self.width)
+        wanted = np.arange(end - n_buckets + 1, end + 1)
+        slots = wanted % self.n_buckets
+        valid = self.bucket_ids[slots] == wanted
+        return self.values[slots[valid]].sum(axis=0), n_buckets
+
+
+class RollingWindows:
+    """Minute buckets for the last day and hour buckets for the last year"""
+
+    def __init__(self, minute_buckets=24 * 60, hour_buckets=366 * 24):
+        self._lock = threading.Lock()
+        self.minutes = BucketRing(60, minute_buckets)
+        self.hours = BucketRing(3600, hour_buckets)
+
+    def add(self, timestamp, is_fraud, amount):
+        self.add_many([timestamp], [is_fraud], [amount])
+
+    def add_many(self, timestamps, is_fraud, amounts):
+        with self._lock:
+            self.minutes.add_many(timestamps, is_fraud, amounts)
+            self.hours.add_many(timestamps, is_fraud, amounts)
+
+    def backfill_csv(self, path):
+        """Load historical buckets from a dataset with transaction_time, is_fraud and amount"""
+        df = pd.read_csv(path, usecols=['transaction_time', 'is_fraud', 'amount'])
+        timestamps = pd.to_datetime(df['transaction_time']).map(datetime.timestamp)
+        self.add_many(timestamps.to_numpy(), df['is_fraud'].to_numpy(), df['amount'].to_numpy())
+        return len(df)
+
+    def latest_timestamp(self):
+        """Start of the most recent minute that has seen a transaction"""
+        return self.minutes.latest * 60 if self.minutes.latest >= 0 else None
+
+    def query(self, window_seconds, as_of=None):
+        """Aggregates for the window ending at as_of (default: latest event seen)"""
+        with self._lock:
+            if as_of is None:
+                as_of = self.latest_timestamp()
+            if as_of is None:
+                totals, n_buckets, granularity = np.zeros(3), 0, 'minute'
+            elif window_seconds <= MINUTE_WINDOW_LIMIT:
+                totals, n_buckets = self.minutes.window(as_of, -(-window_seconds // 60))
+                granularity = 'minute'
+            else:
+                totals, n_buckets = self.hours.window(as_of, -(-window_seconds // 3600))
+                granularity = 'hour'
+
+        count, fraud_count, amount_sum = totals
+        return {
+            'count': int(count),
+            'fraud_count': int(fraud_count),
+            'amount_sum': round(float(amount_sum), 2),
+            'fraud_rate': round(fraud_count / count * 100, 2) if count else 0.0,
+            'granularity': granularity,
+            'buckets': int(n_buckets),
+            'as_of': datetime.fromtimestamp(as_of).isoformat() if as_of is not None else None,
+        }
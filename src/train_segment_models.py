@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Train per-segment fraud models (per city and per payment method) for the model registry
+"""
+
+import argparse
+import os
+import pickle
+
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from imblearn.over_sampling import SMOTE
+
+from features import encode_frame
+from model_registry import segment_filename
+from retrain_jobs import served_dir
+from stacking_model import build_model
+
+parser = argparse.ArgumentParser(description="Train segment models into the served release's segments/")
+parser.add_argument("--keys", default="city,payment_method",
+                    help="comma-separated API fields to segment on")
+parser.add_argument("--min-rows", type=int, default=500,
+                    help="skip segments with fewer training rows than this")
+args = parser.parse_args()
+
+# Segment models belong to the served release: they share its scaler and features
+model_dir = served_dir("../models")
+segments_dir = os.path.join(model_dir, "segments")
+
+print("🔄 Training per-segment fraud models...")
+
+# ============================
+# 1. Load Dataset and Shared Preprocessing
+# ============================
+# Segment models reuse the global scaler and feature layout so the API
+# preprocesses every transaction once, whichever model scores it.
+df = pd.read_csv("../data/sophisticated_indian_dataset.csv")
+with open(os.path.join(model_dir, "scaler.pkl"), "rb") as f:
+    scaler = pickle.load(f)
+with open(os.path.join(model_dir, "feature_info.pkl"), "rb") as f:
+    feature_info = pickle.load(f)
+
+if feature_info.get('encoding', 'dense') != 'dense':
+    raise SystemExit("The served model uses the hashed encoding; the API only routes to segments of dense models")
+
+X_scaled = encode_frame(df[feature_info['api_features']], feature_info, scaler)
+y = df['is_fraud'].to_numpy()
+
+# API field name -> dataset column
+dataset_columns = {'city': 'country'}
+
+# ============================
+# 2. Train One Model per Segment
+# ============================
+saved = []
+for key in args.keys.split(','):
+    column = dataset_columns.get(key, key)
+    os.makedirs(os.path.join(segments_dir, key), exist_ok=True)
+
+    for value, rows in df.groupby(column).indices.items():
+        if len(rows) < args.min_rows:
+            print(f"⏭️  Skipping {key}={value} ({len(rows)} rows)")
+            continue
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_scaled[rows], y[rows], test_size=0.2, stratify=y[rows], random_state=42
+        )
+        X_train_res, y_train_res = SMOTE(random_state=42).fit_resample(X_train, y_train)
+
+        model = build_model(n_estimators=50)
+        model.fit(X_train_res, y_train_res)
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+
+        path = os.path.join(segments_dir, key, segment_filename(value))
+        with open(path, "wb") as f:
+            pickle.dump(model, f)
+        saved.append(path)
+        print(f"✅ {key}={value}: {len(rows)} rows, accuracy {accuracy:.4f}")
+
+print(f"\n💾 Saved {len(saved)} segment models under {segments_dir}")
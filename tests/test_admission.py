@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from admission import DEFAULT_CLASSES, AdmissionController, Overloaded, PriorityClass
+
+
+def test_default_caps_reserve_slots_for_scoring():
+    controller = AdmissionController(16)
+    assert controller.stats()['classes']['scoring']['max_in_flight'] == 16
+    assert controller.stats()['classes']['batch']['max_in_flight'] == 8
+    assert controller.stats()['classes']['analytics']['max_in_flight'] == 4
+    # Even a pool of one gives every class a slot
+    assert PriorityClass(2, 8, 2000, max_share=0.25).cap(1) == 1
+    assert PriorityClass(2, 8, 2000, max_in_flight=3, max_share=0.25).cap(16) == 3
+
+
+def test_scoring_is_admitted_under_analytics_load():
+    controller = AdmissionController(8)
+    analytics_cap = controller.stats()['classes']['analytics']['max_in_flight']
+    held = [controller.acquire('analytics') for _ in range(analytics_cap)]
+
+    # More analytics waits in its queue instead of taking the remaining slots
+    served = []
+
+    def analytics_request():
+        granted = controller.acquire('analytics')
+        served.append(granted)
+        controller.release('analytics', granted)
+
+    waiters = [threading.Thread(target=analytics_request) for _ in range(3)]
+    for waiter in waiters:
+        waiter.start()
+    deadline = time.monotonic() + 1
+    while controller.stats()['classes']['analytics']['queued'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert controller.stats()['classes']['analytics']['queued'] == 3
+
+    start = time.perf_counter()
+    scoring = [controller.acquire('scoring') for _ in range(8 - analytics_cap)]
+    assert time.perf_counter() - start < 0.1
+    assert controller.stats()['in_flight'] == 8
+
+    for granted in scoring:
+        controller.release('scoring', granted)
+    # Freed scoring slots do not lift the analytics cap
+    assert controller.stats()['classes']['analytics']['queued'] == 3
+    for granted in held:
+        controller.release('analytics', granted)
+    for waiter in waiters:
+        waiter.join(1)
+    assert len(served) == 3
+
+
+def test_waiting_scoring_is_served_before_batch():
+    controller = AdmissionController(1, {
+        'scoring': PriorityClass(priority=0, max_queue=4, max_wait_ms=2000),
+        'batch': PriorityClass(priority=1, max_queue=4, max_wait_ms=2000),
+    })
+    first = controller.acquire('batch')
+    order = []
+
+    def run(name):
+        granted = controller.acquire(name)
+        order.append(name)
+        controller.release(name, granted)
+
+    batch = threading.Thread(target=run, args=('batch',))
+    batch.start()
+    while controller.stats()['classes']['batch']['queued'] < 1:
+        time.sleep(0.001)
+    scoring = threading.Thread(target=run, args=('scoring',))
+    scoring.start()
+    while controller.stats()['classes']['scoring']['queued'] < 1:
+        time.sleep(0.001)
+    controller.release('batch', first)
+    batch.join(1)
+    scoring.join(1)
+    assert order == ['scoring', 'batch']
+
+
+def test_full_queue_is_shed_with_retry_after():
+    controller = AdmissionController(1, {'analytics': PriorityClass(priority=2, max_queue=0, max_wait_ms=1000)})
+    controller.acquire('analytics')
+    with pytest.raises(Overloaded) as e:
+        controller.acquire('analytics')
+    assert e.value.reason == 'queue full'
+    assert e.value.retry_after >= 1
+
+
+def test_default_classes_are_ordered_by_priority():
+    assert sorted(DEFAULT_CLASSES, key=lambda name: DEFAULT_CLASSES[name].priority) == [
+        'scoring', 'batch', 'analytics']
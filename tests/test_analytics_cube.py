@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics_cube import AggregateCube
+
+
+@pytest.fixture(scope='module')
+def df():
+    rng = np.random.default_rng(1)
+    n = 2000
+    return pd.DataFrame({
+        'category': rng.choice(['food', 'travel', 'electronics'], n),
+        'payment_method': rng.choice(['UPI', 'Card'], n),
+        'device': rng.choice(['mobile', 'desktop', 'tablet'], n),
+        'country': rng.choice(['Mumbai', 'Delhi', 'Pune'], n),
+        'hour': rng.integers(0, 24, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'is_fraud': rng.random(n) < 0.1,
+        'amount': rng.uniform(10, 1000, n).round(2),
+    })
+
+
+@pytest.fixture(scope='module')
+def cube(df):
+    return AggregateCube(df)
+
+
+def expected(df, filters=None, group_by=()):
+    """{group key: (count, fraud count, amount sum)} aggregated from raw rows with pandas"""
+    df = df.rename(columns={'country': 'city'})
+    for dim, value in (filters or {}).items():
+        df = df[df[dim] == value]
+    if not group_by:
+        return {(): (len(df), int(df['is_fraud'].sum()), round(df['amount'].sum(), 2))}
+    grouped = df.groupby(list(group_by)).agg(count=('amount', 'size'), fraud=('is_fraud', 'sum'),
+                                             amount=('amount', 'sum'))
+    return {(key if isinstance(key, tuple) else (key,)): (int(r['count']), int(r['fraud']), round(r['amount'], 2))
+            for key, r in grouped.iterrows()}
+
+
+def actual(rows, group_by=()):
+    return {tuple(r[d] for d in group_by): (r['count'], r['fraud_count'], r['amount_sum']) for r in rows}
+
+
+@pytest.mark.parametrize('filters, group_by', [
+    ({}, ()),
+    ({}, ('category',)),
+    ({'payment_method': 'UPI'}, ('city', 'hour')),
+    ({'device': 'mobile', 'day_of_week': 3}, ('category',)),
+    ({'category': 'food', 'payment_method': 'Card', 'device': 'tablet', 'city': 'Pune', 'hour': 12}, ()),
+    ({}, ('category', 'payment_method', 'device', 'city', 'hour', 'day_of_week')),
+])
+def test_queries_match_aggregating_raw_rows(df, cube, filters, group_by):
+    rows = cube.query(filters, group_by)
+    assert actual(rows, group_by) == pytest.approx(expected(df, filters, group_by))
+
+
+def test_every_roll_up_keeps_the_totals(df, cube):
+    assert len(cube.cuboids) == 2 ** 6
+    for dims, cuboid in cube.cuboids.items():
+        assert cuboid.shape == (3,) + tuple(len(cube.levels[d]) for d in dims)
+        assert cuboid[0].sum() == len(df)
+        assert cuboid[1].sum() == df['is_fraud'].sum()
+
+
+def test_fraud_rate_and_empty_cells(cube):
+    [row] = cube.query({'category': 'food'})
+    assert row['fraud_rate'] == round(row['fraud_count'] / row['count'] * 100, 2)
+    assert all(row['count'] for row in cube.query(group_by=['hour', 'day_of_week', 'city']))
+
+
+def test_unseen_values_and_bad_queries(cube):
+    assert cube.query({'category': 'unknown'}) == []
+    assert cube.parse_value('hour', '7') == 7 and cube.parse_value('city', 'Pune') == 'Pune'
+    with pytest.raises(ValueError):
+        cube.query({'merchant': 'x'})
+    with pytest.raises(ValueError):
+        cube.query({'city': 'Pune'}, ['city'])
+
+
+def test_rows_missing_a_dimension_are_left_out(df):
+    cube = AggregateCube(df.assign(device=df['device'].where(df.index >= 10)))
+    [row] = cube.query()
+    assert row['count'] == len(df) - 10
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier, StackingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from attributions import ExplainerCache, ModelExplainer
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    n = 300
+    df = pd.DataFrame({
+        'amount': rng.normal(size=n),
+        'hour': rng.integers(0, 24, size=n),
+        'payment_method': rng.choice(['card', 'upi', 'wallet'], size=n),
+    })
+    y = ((df['amount'] > 0) ^ (df['payment_method'] == 'wallet')).astype(int).to_numpy()
+    encoded = pd.get_dummies(df, columns=['payment_method'], drop_first=True).astype(float)
+    feature_info = {'categorical_columns': ['payment_method'], 'feature_columns': list(encoded.columns)}
+    return encoded.to_numpy(), y, feature_info
+
+
+def logit(p):
+    return np.log(p / (1 - p))
+
+
+def total(explainer, X):
+    contributions, _ = explainer.explain(X)
+    return explainer.bias + np.array([c.sum() for c in contributions])
+
+
+def test_forest_contributions_add_up_to_the_probability(data):
+    X, y, feature_info = data
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X, y)
+    explainer = ModelExplainer(model, feature_info)
+    assert explainer.units == 'probability'
+    np.testing.assert_allclose(total(explainer, X[:20]), model.predict_proba(X[:20])[:, 1])
+
+
+def test_linear_contributions_add_up_to_the_log_odds(data):
+    X, y, feature_info = data
+    model = LogisticRegression().fit(X, y)
+    explainer = ModelExplainer(model, feature_info)
+    np.testing.assert_allclose(total(explainer, X[:20]), logit(model.predict_proba(X[:20])[:, 1]))
+
+
+def test_stacking_contributions_add_up_to_the_meta_log_odds(data):
+    X, y, feature_info = data
+    model = StackingClassifier(
+        estimators=[('rf', RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0)),
+                    ('lr', LogisticRegression())],
+        final_estimator=LogisticRegression(), passthrough=True
+    ).fit(X, y)
+    explainer = ModelExplainer(model, feature_info)
+    np.testing.assert_allclose(total(explainer, X[:20]), logit(model.predict_proba(X[:20])[:, 1]))
+
+
+def test_one_hot_columns_are_summed_into_their_field(data):
+    X, y, feature_info = data
+    explainer = ModelExplainer(LogisticRegression().fit(X, y), feature_info)
+    assert explainer.fields == ['amount', 'hour', 'payment_method']
+    formatted = explainer.format(explainer.explain(X[:1])[0][0])
+    assert formatted['available']
+    assert {c['feature'] for c in formatted['contributions']} == set(explainer.fields)
+
+
+def test_repeat_rows_come_from_the_cache(data):
+    X, y, feature_info = data
+    explainer = ModelExplainer(LogisticRegression().fit(X, y), feature_info)
+    _, computed = explainer.explain(X[:5])
+    assert computed == 5
+    _, computed = explainer.explain(X[:8])
+    assert computed == 3
+
+
+def test_explainer_cache_builds_once_per_model_and_remembers_unsupported(data):
+    X, y, feature_info = data
+    cache = ExplainerCache(feature_info, max_models=2)
+    loads = []
+
+    def loader(model):
+        return lambda: loads.append(model) or model
+
+    linear = LogisticRegression().fit(X, y)
+    explainer, reason = cache.get('global', loader(linear))
+    assert explainer is not None and reason is None
+    assert cache.get('global', loader(linear))[0] is explainer
+
+    boosted = GradientBoostingClassifier(n_estimators=5).fit(X, y)
+    explainer, reason = cache.get('cheap', loader(boosted))
+    assert explainer is None and 'GradientBoostingClassifier' in reason
+    cache.get('cheap', loader(boosted))
+    assert loads == [linear, boosted]
+
+    # The least recently used model's explainer is dropped past max_models
+    cache.get('city=Mumbai', loader(linear))
+    cache.get('global', loader(linear))
+    assert len(loads) == 4
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, StackingClassifier
+from sklearn.linear_model import LogisticRegression
+
+import benchmark_training
+import stacking_model
+from features import API_FEATURES
+
+
+def test_benchmark_uses_the_shared_stacking_model():
+    assert benchmark_training.build_model is stacking_model.build_model
+    model = stacking_model.build_model(n_estimators=7)
+    assert isinstance(model, StackingClassifier) and model.passthrough
+    (rf_name, rf), (lr_name, lr) = model.estimators
+    assert (rf_name, lr_name) == ('rf', 'lr')
+    assert isinstance(rf, RandomForestClassifier) and rf.n_estimators == 7 and rf.class_weight == 'balanced'
+    assert isinstance(lr, LogisticRegression) and isinstance(model.final_estimator, LogisticRegression)
+    assert stacking_model.build_model().estimators[0][1].n_estimators == 100
+
+
+def dataset(path, n=240, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'amount': rng.lognormal(7, 1, n),
+        'hour': rng.integers(0, 24, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'category': rng.choice(['food', 'travel'], n),
+        'age': rng.integers(18, 80, n),
+        'gender': rng.choice(['M', 'F'], n),
+        'country': rng.choice(['Mumbai', 'Delhi'], n),
+        'device': rng.choice(['mobile', 'desktop'], n),
+        'payment_method': rng.choice(['UPI', 'Card'], n),
+        'item_quantity': rng.integers(1, 5, n),
+        'shipping_address': rng.choice(['home', 'office'], n),
+        'browser_info': rng.choice(['Chrome', 'Safari'], n),
+    })
+    df['is_fraud'] = ((df['amount'] > np.quantile(df['amount'], 0.8)) ^ (rng.random(n) < 0.05)).astype(int)
+    assert list(df.columns[:-1]) == API_FEATURES
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_benchmark_reports_every_stage(tmp_path):
+    path = tmp_path / 'small.csv'
+    dataset(path)
+    result = benchmark_training.benchmark('small.csv', str(path), folds=2, n_jobs=1)
+    assert result['rows'] == 240
+    assert list(result['stages']) == ['load', 'encode', 'scale', 'resample', 'fit', 'evaluate', 'cross_validate']
+    assert all(stage['seconds'] >= 0 and stage['peak_rss_mb'] > 0 for stage in result['stages'].values())
+    assert result['holdout']['auc'] > 0.7
+    assert len(result['cross_validation']['fit_seconds']) == 2
+    assert set(result['cross_validation']) >= {'accuracy', 'f1', 'roc_auc'}
+
+
+def test_synthetic_sources_resample_a_dataset(tmp_path):
+    path = tmp_path / 'small.csv'
+    original = dataset(path)
+    scaled = benchmark_training.load_dataset((str(path), 1000))
+    assert len(scaled) == 1000 and list(scaled.columns) == list(original.columns)
+    assert scaled['age'].between(18, 90).all() and (scaled['amount'] >= 1).all()
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from blocklist import Blocklist, BlocklistSet, build
+
+
+def test_lookups_find_every_entry_and_normalize_values(tmp_path):
+    path = str(tmp_path / 'ip.blocklist')
+    values = [f'10.0.{i // 256}.{i % 256}' for i in range(5000)]
+    assert build(values + [' 10.0.0.1 \n', None, '', float('nan')], path) == 5000
+
+    blocklist = Blocklist(path)
+    assert all(value in blocklist for value in values)
+    assert '10.0.0.1\n' in blocklist
+    assert None not in blocklist and '' not in blocklist
+    assert blocklist.contains_many(values).all()
+
+
+def test_absent_values_are_rejected(tmp_path):
+    path = str(tmp_path / 'user.blocklist')
+    build([str(i) for i in range(2000)], path, false_positive_rate=0.01)
+    blocklist = Blocklist(path)
+    absent = [str(i) for i in range(2000, 12000)]
+    assert not any(value in blocklist for value in absent)
+    assert not blocklist.contains_many(absent).any()
+    # Integral floats match their integer form, as user ids read from a CSV do
+    assert 7.0 in blocklist and blocklist.contains_many([7.0, 7.5, None]).tolist() == [True, False, False]
+
+
+def test_empty_and_tiny_lists(tmp_path):
+    path = str(tmp_path / 'device.blocklist')
+    build([], path)
+    assert 'anything' not in Blocklist(path)
+    assert Blocklist(path).contains_many(['a', None]).tolist() == [False, False]
+
+    build(['only'], path)
+    blocklist = Blocklist(path)
+    assert 'only' in blocklist and 'other' not in blocklist
+    assert blocklist.stats()['entries'] == 1
+
+
+def test_rejects_files_that_are_not_blocklists(tmp_path):
+    path = tmp_path / 'ip.blocklist'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        Blocklist(str(path))
+
+
+def test_set_checks_transactions_and_columns(tmp_path):
+    blocklists = BlocklistSet(str(tmp_path), check_seconds=0)
+    assert blocklists.check({'ip_address': '1.2.3.4'}) == []
+
+    blocklists.rebuild('ip', ['1.2.3.4'])
+    blocklists.rebuild('user', ['42'])
+    assert blocklists.check({'ip_address': '1.2.3.4', 'user_id': 42}) == [
+        {'list': 'ip', 'field': 'ip_address'}, {'list': 'user', 'field': 'user_id'}]
+    assert blocklists.check({'ip_address': '5.6.7.8', 'user_id': 1}) == []
+
+    columns = {'ip_address': np.array(['1.2.3.4', '5.6.7.8', '1.2.3.4']),
+               'user_id': (np.array([0, -1, 1]), ['1', '42'])}
+    assert blocklists.check_columns(columns, 3).tolist() == [True, False, True]
+
+    with pytest.raises(ValueError):
+        blocklists.rebuild('email', ['x'])
+
+
+def test_rebuilds_reach_other_sets_on_the_same_directory(tmp_path):
+    reader = BlocklistSet(str(tmp_path), check_seconds=0)
+    writer = BlocklistSet(str(tmp_path), check_seconds=0)
+    writer.rebuild('device', ['d1'])
+    assert reader.check({'device_id': 'd1'}) == [{'list': 'device', 'field': 'device_id'}]
+
+    writer.rebuild('device', ['d2'])
+    assert reader.check({'device_id': 'd1'}) == []
+    assert reader.stats()['device']['entries'] == 1 and reader.stats()['ip'] is None
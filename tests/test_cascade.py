@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import cascade
+from cascade import CascadeScorer, risk_band
+from metrics import MetricsRegistry
+
+
+class ColumnModel:
+    """Predicts the fraud probability stored in one column of X and counts the rows it saw"""
+
+    def __init__(self, column):
+        self.column = column
+        self.rows_scored = 0
+
+    def predict_proba(self, X):
+        self.rows_scored += X.shape[0]
+        p = X[:, self.column]
+        return np.column_stack([1 - p, p])
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(cascade, 'metrics', MetricsRegistry())
+
+
+def test_risk_band():
+    assert risk_band(np.array([0.1, 0.3, 0.31, 0.7, 0.71])).tolist() == [0, 0, 1, 1, 2]
+
+
+def test_only_the_uncertain_band_reaches_the_full_model():
+    # column 0: cheap probability, column 1: full probability
+    X = np.array([[0.05, 0.9], [0.5, 0.8], [0.15, 0.2], [0.95, 0.1], [0.85, 0.6]])
+    full = ColumnModel(1)
+    scorer = CascadeScorer(ColumnModel(0), full, low=0.15, high=0.85, shadow_rate=0)
+    probabilities, stages, segments = scorer.score(X)
+
+    assert probabilities.tolist() == [0.05, 0.8, 0.2, 0.95, 0.6]
+    assert stages.tolist() == ['cheap', 'full', 'full', 'cheap', 'full']
+    assert segments.tolist() == [None, 'global', 'global', None, 'global']
+    assert full.rows_scored == 3
+
+    stats = scorer.stats()
+    assert stats['scored'] == 5 and stats['cheap_exit_rate'] == 0.4 and stats['full_stage_rate'] == 0.6
+    assert stats['escalated_label_disagreement_rate'] == pytest.approx(1 / 3, abs=1e-4)
+    assert stats['shadow_label_disagreement_rate'] is None
+
+
+def test_shadow_scoring_measures_early_exits_without_changing_them():
+    X = np.array([[0.01, 0.99]] * 50)
+    full = ColumnModel(1)
+    scorer = CascadeScorer(ColumnModel(0), full, shadow_rate=1.0)
+    probabilities, stages, _ = scorer.score(X)
+    assert (probabilities == 0.01).all() and (stages == 'cheap').all()
+    assert full.rows_scored == 50
+    stats = scorer.stats()
+    assert stats['shadow_label_disagreement_rate'] == 1.0
+    assert stats['shadow_risk_level_disagreement_rate'] == 1.0
+
+
+def test_escalated_rows_are_routed_with_their_transactions():
+    class Routed:
+        def predict_proba_routed(self, X, transactions):
+            return X[:, 1], np.array([t['segment'] for t in transactions], dtype=object)
+
+    X = np.array([[0.5, 0.9], [0.01, 0.0], [0.6, 0.1]])
+    transactions = [{'segment': 'city=Pune'}, {'segment': 'unused'}, {'segment': 'global'}]
+    _, _, segments = CascadeScorer(ColumnModel(0), Routed(), shadow_rate=0).score(X, transactions)
+    assert segments.tolist() == ['city=Pune', None, 'global']
+
+
+def test_rejects_an_inverted_band():
+    with pytest.raises(ValueError):
+        CascadeScorer(None, None, low=0.8, high=0.2)
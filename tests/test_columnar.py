@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import columnar
+from columnar import RISK_LEVELS, read_table, risk_level_codes, table_columns, write_results
+from features import encode_columns, encode_frame
+
+pa = pytest.importorskip('pyarrow')
+
+
+def ipc_bytes(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_risk_level_codes_match_the_api_thresholds():
+    codes = risk_level_codes(np.array([0.0, 0.3, 0.31, 0.7, 0.71, 1.0]))
+    assert [RISK_LEVELS[c] for c in codes] == ['Low', 'Low', 'Medium', 'Medium', 'High', 'High']
+
+
+def test_table_columns_give_encoder_input():
+    table = pa.table({
+        'amount': pa.array([10.0, None, 30.0]),
+        'hour': pa.chunked_array([[1, 2], [3]]),
+        'city': pa.array(['Pune', None, 'Pune']),
+        'device': pa.array(['mobile', 'desktop', 'mobile']).dictionary_encode(),
+    })
+    columns = table_columns(read_table(ipc_bytes(table)))
+    assert columns['amount'].tolist() == [10.0, 0.0, 30.0]
+    assert columns['hour'].tolist() == [1, 2, 3]
+    codes, values = columns['city']
+    assert codes.tolist() == [0, -1, 0] and values == ['Pune']
+    codes, values = columns['device']
+    assert [values[c] for c in codes] == ['mobile', 'desktop', 'mobile']
+
+
+def test_arrow_batches_encode_like_json_rows():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'amount': rng.normal(size=30),
+        'hour': rng.integers(0, 24, size=30),
+        'payment_method': rng.choice(['card', 'upi', 'wallet'], size=30),
+        'city': rng.choice(['Mumbai', 'Delhi', 'Pune'], size=30),
+    })
+    train = pd.get_dummies(df.rename(columns={'city': 'country'}), columns=['payment_method', 'country'],
+                           drop_first=True)
+    feature_info = {'categorical_columns': ['payment_method', 'country'], 'feature_columns': list(train.columns)}
+    scaler = StandardScaler().fit(train)
+
+    table = read_table(ipc_bytes(pa.Table.from_pandas(df, preserve_index=False)))
+    X = encode_columns(table_columns(table), table.num_rows, feature_info, scaler)
+    assert np.allclose(X, encode_frame(df, feature_info, scaler))
+
+
+def test_results_round_trip_with_dictionary_columns():
+    body = write_results({
+        'fraud_probability': np.array([0.1, 0.9]),
+        'risk_level': (np.array([0, 2], dtype=np.int8), list(RISK_LEVELS)),
+        'transaction_id': pa.array(['A', 'B']),
+    })
+    table = read_table(body)
+    assert pa.types.is_dictionary(table.schema.field('risk_level').type)
+    assert table.to_pydict() == {'fraud_probability': [0.1, 0.9], 'risk_level': ['Low', 'High'],
+                                 'transaction_id': ['A', 'B']}
+    assert columnar.available()
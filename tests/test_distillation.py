@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from distillation import build_student, fit_soft, synthetic_sample
+from stacking_model import build_model
+
+
+@pytest.fixture
+def fitted_teacher():
+    rng = np.random.default_rng(0)
+    n = 600
+    X = rng.normal(size=(n, 4))
+    y = ((X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.5, n)) > 1).astype(int)
+    return build_model(n_estimators=20).fit(X, y), rng
+
+
+@pytest.mark.parametrize('kind', ['gbm', 'linear'])
+def test_student_probabilities_track_the_teacher(fitted_teacher, kind):
+    teacher, rng = fitted_teacher
+    X_transfer = rng.normal(size=(2000, 4))
+    X_test = rng.normal(size=(500, 4))
+
+    student = fit_soft(build_student(kind), X_transfer, teacher.predict_proba(X_transfer)[:, 1])
+    p_t = teacher.predict_proba(X_test)[:, 1]
+    p_s = student.predict_proba(X_test)[:, 1]
+    assert np.mean(np.abs(p_t - p_s)) < 0.1
+    assert np.mean((p_t > 0.5) == (p_s > 0.5)) > 0.9
+    assert np.corrcoef(p_t, p_s)[0, 1] > 0.9
+
+
+def test_soft_labels_weight_each_row_by_the_teacher_probability():
+    X = np.array([[0.0], [1.0]])
+    student = fit_soft(LogisticRegression(C=1e6), X, np.array([0.2, 0.8]))
+    assert student.predict_proba(X)[:, 1] == pytest.approx([0.2, 0.8], abs=0.01)
+
+
+def test_student_kinds():
+    assert isinstance(build_student('gbm'), GradientBoostingClassifier)
+    linear = build_student('linear')
+    assert isinstance(linear, LogisticRegression) and linear.penalty == 'l1'
+
+
+def test_synthetic_sample_stays_within_the_observed_marginals():
+    raw = pd.DataFrame({'amount': [10.0, 500.0], 'hour': [0, 23], 'age': [18, 90],
+                        'category': ['food', 'travel']})
+    synthetic = synthetic_sample(raw, list(raw.columns), 1000, np.random.default_rng(0))
+    assert len(synthetic) == 1000 and list(synthetic.columns) == list(raw.columns)
+    assert set(synthetic['category']) == {'food', 'travel'}
+    assert (synthetic['amount'] >= 1).all() and synthetic['hour'].between(0, 23).all()
+    assert synthetic['age'].between(18, 90).all()
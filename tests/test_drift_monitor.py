@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from drift_monitor import OTHER, PSI_DRIFT, DriftMonitor, _psi, build_reference
+
+
+@pytest.fixture
+def training():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return pd.DataFrame({
+        'amount': rng.lognormal(7, 1, n),
+        'age': rng.integers(18, 80, n),
+        'hour': rng.integers(0, 24, n),
+        'item_quantity': rng.integers(1, 6, n),
+        'payment_method': rng.choice(['UPI', 'Card', 'Wallet'], n, p=[0.6, 0.3, 0.1]),
+        'category': rng.choice(['food', 'travel'], n),
+        'country': rng.choice(['Mumbai', 'Delhi'], n),
+        'device': rng.choice(['mobile', 'desktop'], n),
+    })
+
+
+def live(training):
+    return training.rename(columns={'country': 'city'}).to_dict('records')
+
+
+def test_psi_is_zero_for_identical_distributions_and_grows_with_shift():
+    expected = np.array([0.25, 0.25, 0.5])
+    assert _psi(expected, expected) == pytest.approx(0)
+    small = _psi(expected, np.array([0.3, 0.25, 0.45]))
+    large = _psi(expected, np.array([0.8, 0.1, 0.1]))
+    assert 0 < small < large
+    # An empty bin on either side is floored instead of giving an infinite score
+    assert np.isfinite(_psi(expected, np.array([0.5, 0.5, 0.0])))
+
+
+def test_reference_bins_are_quantiles_of_training_data(training):
+    reference = build_reference(training, n_bins=10)
+    amount = reference['numeric']['amount']
+    assert len(amount['edges']) == 9
+    assert amount['fractions'] == pytest.approx([0.1] * 10, abs=0.01)
+    assert reference['categorical']['city'].keys() == {'Mumbai', 'Delhi'}
+    assert reference['categorical']['payment_method']['UPI'] == pytest.approx(0.6, abs=0.03)
+
+
+def test_traffic_like_training_reports_no_drift(training):
+    monitor = DriftMonitor(build_reference(training))
+    for transaction in live(training):
+        monitor.update(transaction)
+    report = monitor.report()
+    assert report['updates'] == len(training)
+    assert report['status'] == 'ok'
+    assert report['features']['amount']['psi'] < 0.01
+    assert report['features']['amount']['ks'] < 0.01
+    assert report['features']['city']['unseen_rate'] == 0
+
+
+def test_shifted_traffic_is_reported_as_drift(training):
+    monitor = DriftMonitor(build_reference(training))
+    shifted = training.assign(amount=training['amount'] * 5, payment_method='Crypto')
+    for transaction in live(shifted):
+        monitor.update(transaction)
+    features = monitor.report()['features']
+    assert features['amount']['status'] == 'drift'
+    assert features['amount']['ks'] > 0.5
+    assert features['payment_method']['status'] == 'drift'
+    assert features['payment_method']['unseen_rate'] == 1
+    assert features['age']['status'] == 'ok'
+
+
+def test_counts_decay_every_half_life(training):
+    monitor = DriftMonitor(build_reference(training), half_life=100)
+    for transaction in live(training.head(100)):
+        monitor.update(transaction)
+    assert monitor.report()['features']['category']['weight'] == 50
+    assert sum(monitor._categorical['category'].values()) == 50
+
+
+def test_missing_data_and_reference_are_not_scored(training):
+    reference = build_reference(training.drop(columns=['device']))
+    monitor = DriftMonitor(reference)
+    report = monitor.report()
+    assert report['status'] == 'no_data' and report['max_psi'] is None
+
+    monitor.update({'amount': 100.0, 'device': 'mobile'})
+    features = monitor.report()['features']
+    assert features['age']['status'] == 'no_data'
+    assert features['device']['status'] == 'unknown'
+    assert monitor._categorical['device'] == {OTHER: 1.0}
+
+
+def test_drift_is_not_judged_before_the_minimum_weight(training):
+    monitor = DriftMonitor(build_reference(training), min_weight=100)
+    # One far-out transaction already has a huge PSI against the reference
+    monitor.update({'amount': 10 ** 9, 'age': 18, 'hour': 3, 'item_quantity': 1, 'payment_method': 'Crypto'})
+    report = monitor.report()
+    assert report['features']['amount']['psi'] > PSI_DRIFT
+    assert report['features']['amount']['status'] == 'insufficient_data'
+    assert report['status'] == 'insufficient_data' and report['max_psi'] is None
+
+    for transaction in live(training.head(99)):
+        monitor.update(transaction)
+    report = monitor.report()
+    assert report['features']['amount']['status'] in ('ok', 'warning', 'drift')
+    assert report['status'] != 'insufficient_data' and report['max_psi'] is not None
+
+
+def test_only_fields_with_a_training_reference_are_monitored(training):
+    report = DriftMonitor(build_reference(training)).report()
+    assert 'account_age' not in report['features']
+    assert {f['reference'] for f in report['features'].values()} == {True}
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.preprocessing import MaxAbsScaler, StandardScaler
+
+from features import HASHED_COLUMNS, HashedEncoder, encode_columns, encode_frame, frame_columns
+
+CATEGORICAL = ['payment_method', 'country']
+
+
+def transactions(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'amount': rng.normal(size=n),
+        'hour': rng.integers(0, 24, size=n),
+        'payment_method': rng.choice(['card', 'upi', 'wallet'], size=n),
+        'city': rng.choice(['Mumbai', 'Delhi', 'Pune'], size=n),
+        'ip_address': [f"10.0.{i % 7}.{i}" for i in range(n)],
+        'user_id': rng.integers(1, 20, size=n),
+    })
+
+
+@pytest.fixture
+def dense_info():
+    train = transactions().rename(columns={'city': 'country'})[['amount', 'hour'] + CATEGORICAL]
+    encoded = pd.get_dummies(train, columns=CATEGORICAL, drop_first=True)
+    scaler = StandardScaler().fit(encoded)
+    return {'categorical_columns': CATEGORICAL, 'feature_columns': list(encoded.columns)}, scaler
+
+
+@pytest.fixture
+def hashed_info():
+    train = transactions().rename(columns={'city': 'country'})
+    encoder = HashedEncoder(['amount', 'hour'], CATEGORICAL, hash_width=64).fit(train)
+    scaler = MaxAbsScaler().fit(encoder.transform(train))
+    return {'encoding': 'hashed', 'encoder': encoder, 'feature_columns': encoder.feature_columns,
+            'categorical_columns': CATEGORICAL, 'hashed_columns': list(HASHED_COLUMNS)}, scaler
+
+
+def test_only_fields_scoring_requests_carry_are_hashed():
+    assert set(HASHED_COLUMNS) == {'ip_address', 'user_id'}
+
+
+def test_dense_frame_is_aligned_to_training_columns(dense_info):
+    feature_info, scaler = dense_info
+    df = transactions(5, seed=1).drop(columns=['ip_address', 'user_id'])
+    df.loc[0, 'city'] = 'Atlantis'
+    X = encode_frame(df, feature_info, scaler)
+    assert X.shape == (5, len(feature_info['feature_columns']))
+    # An unseen city sets no one-hot column
+    city_columns = [j for j, c in enumerate(feature_info['feature_columns']) if c.startswith('country_')]
+    unscaled = scaler.inverse_transform(X)
+    assert np.allclose(unscaled[0, city_columns], 0)
+
+
+def test_columnar_encoding_matches_the_frame_path(dense_info, hashed_info):
+    df = transactions(20, seed=2)
+    for feature_info, scaler in (dense_info, hashed_info):
+        expected = encode_frame(df, feature_info, scaler)
+        actual = encode_columns(frame_columns(df), len(df), feature_info, scaler)
+        if sparse.issparse(expected):
+            expected, actual = expected.toarray(), actual.toarray()
+        np.testing.assert_allclose(actual, expected)
+
+
+def test_hashed_width_is_fixed_and_missing_fields_encode_empty(hashed_info):
+    feature_info, scaler = hashed_info
+    encoder = feature_info['encoder']
+    df = transactions(10, seed=3)
+    df['ip_address'] = [f"192.168.{i}.1" for i in range(10)]
+    X = encode_frame(df, feature_info, scaler)
+    assert sparse.issparse(X) and X.shape == (10, encoder.n_features)
+
+    without = encode_frame(df.drop(columns=['ip_address', 'user_id']), feature_info, scaler)
+    assert without.shape == X.shape
+    assert without[:, len(encoder.feature_columns):].nnz == 0
+
+
+def test_ip_tokens_share_prefixes():
+    encoder = HashedEncoder([], [], ['ip_address'], hash_width=1024).fit(pd.DataFrame())
+    X = encoder.transform(pd.DataFrame({'ip_address': ['10.1.2.3', '10.1.2.4', '172.16.0.1']})).toarray()
+    # Same /24 and /16: two of three tokens in common; nothing in common otherwise
+    assert (X[0] * X[1]).sum() == 2
+    assert (X[0] * X[2]).sum() == 0
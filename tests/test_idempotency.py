@@ -0,0 +1,100 @@
+import pytest
+
+import state_backend
+from idempotency import IdempotencyConflict, IdempotencyStore, fingerprint, new_transaction_id
+from state_backend import LocalBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(state_backend.time, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(LocalBackend(), ttl_seconds=3600, lease_seconds=10, poll_seconds=0.001)
+
+
+def test_retry_gets_the_stored_response(store):
+    body = {'amount': 10}
+    assert store.begin('k', fingerprint(body)) is None
+    store.complete('k', {'transaction_id': 'TXN1'})
+    assert store.begin('k', fingerprint(body)) == {'transaction_id': 'TXN1'}
+
+
+def test_reuse_with_a_different_body_conflicts(store):
+    assert store.begin('k', fingerprint({'amount': 10})) is None
+    with pytest.raises(IdempotencyConflict):
+        store.begin('k', fingerprint({'amount': 11}))
+
+
+def test_retry_during_scoring_times_out(store):
+    assert store.begin('k', 'fp') is None
+    with pytest.raises(TimeoutError):
+        store.begin('k', 'fp', wait_seconds=0.01)
+
+
+def test_unfinished_claim_expires_after_the_lease(store, clock):
+    assert store.begin('k', 'fp') is None
+    clock.now += 11
+    # The first worker never completed; a retry may score the request itself
+    assert store.begin('k', 'fp') is None
+
+
+def test_completed_response_is_kept_for_the_ttl(store, clock):
+    assert store.begin('k', 'fp') is None
+    clock.now += 5
+    store.complete('k', {'ok': True})
+    clock.now += 3000
+    assert store.begin('k', 'fp') == {'ok': True}
+    clock.now += 700
+    assert store.begin('k', 'fp') is None
+
+
+def test_abandoned_key_can_be_scored_again(store):
+    assert store.begin('k', 'fp') is None
+    store.abandon('k')
+    assert store.begin('k', 'fp') is None
+
+
+def test_transaction_ids_are_unique_and_increasing():
+    ids = [new_transaction_id() for _ in range(1000)]
+    assert len(set(ids)) == 1000
+    assert ids == sorted(ids)
+    assert all(i.startswith('TXN') and len(i) == 29 for i in ids)
+
+
+def test_batch_claims_replay_and_skip_rows_without_keys(store):
+    assert store.begin_many([('a', 'fp-a'), (None, None)]) == [None, None]
+    store.complete('a', {'transaction_id': 'TXN1'})
+    assert store.begin_many([('a', 'fp-a'), ('b', 'fp-b')]) == [{'transaction_id': 'TXN1'}, None]
+
+
+def test_mid_batch_conflict_releases_earlier_claims(store):
+    assert store.begin('b', 'fp-b') is None
+    store.complete('b', {'transaction_id': 'TXN1'})
+
+    with pytest.raises(IdempotencyConflict, match=r'transaction 1'):
+        store.begin_many([('a', 'fp-a'), ('b', 'other body'), ('c', 'fp-c')])
+    assert store._owned == {}
+
+    # The corrected retry claims the new key straight away instead of waiting on the stale claim
+    assert store.begin_many([('a', 'fp-a'), ('b', 'fp-b')], wait_seconds=0.01) == [None, {'transaction_id': 'TXN1'}]
+
+
+def test_mid_batch_timeout_releases_earlier_claims(store):
+    assert store.begin('b', 'fp-b') is None
+    with pytest.raises(TimeoutError, match=r'transaction 1'):
+        store.begin_many([('a', 'fp-a'), ('b', 'fp-b')], wait_seconds=0.01)
+    assert list(store._owned) == ['b']
+    assert store.begin('a', 'fp-a', wait_seconds=0.01) is None
@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from labels import LabelIngestor, accuracy_report, parse_label, read_label_chunks
+from prediction_store import PredictionStore
+
+
+@pytest.mark.parametrize('value, expected', [
+    (True, 1), (False, 0), (1, 1), (0, 0), (1.0, 1), ('1', 1), ('0', 0), (' TRUE ', 1), ('false', 0),
+    ('chargeback', 1), ('legit', 0),
+])
+def test_parse_label_accepts_known_values(value, expected):
+    assert parse_label(value) == expected
+
+
+@pytest.mark.parametrize('value', ['2', 'maybe', '', None, 2, -1, 0.5, [], {}])
+def test_parse_label_rejects_anything_else(value):
+    with pytest.raises(ValueError):
+        parse_label(value)
+
+
+def test_csv_chunks_parse_labels_and_reject_unknown_values():
+    chunks = list(read_label_chunks(io.StringIO("transaction_id,label\nA,1\nB,false\nC, Fraud\n"), chunk_rows=2))
+    assert chunks == [[('A', 1), ('B', 0)], [('C', 1)]]
+    with pytest.raises(ValueError, match='maybe'):
+        list(read_label_chunks(io.StringIO("transaction_id,is_fraud\nA,1\nB,maybe\n")))
+    with pytest.raises(ValueError):
+        list(read_label_chunks(io.StringIO("id,is_fraud\nA,1\n")))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionStore(str(tmp_path / 'predictions.db'))
+    results = [{'transaction_id': f'T{i}', 'fraud_probability': 80.0 if i < 2 else 10.0,
+                'risk_level': 'High' if i < 2 else 'Low', 'is_fraud': i < 2} for i in range(4)]
+    store.add_many([{'amount': i} for i in range(4)], results)
+    return store
+
+
+def test_ingest_counts_duplicate_ids_once(store, tmp_path):
+    ingestor = LabelIngestor(store, str(tmp_path / 'labeled'))
+    summary = ingestor.ingest([[('T0', 1), ('T0', 1), ('T2', 1), ('missing', 0), ('missing', 0)]])
+    assert summary['received'] == 5
+    assert summary['labeled'] == 2
+    assert summary['already_labeled'] == 0
+    assert summary['unmatched'] == 1
+
+    summary = ingestor.ingest([[('T0', 0), ('T1', 0)]])
+    assert (summary['labeled'], summary['already_labeled'], summary['unmatched']) == (1, 1, 0)
+
+
+def test_ingest_writes_joined_partitions(store, tmp_path):
+    summary = LabelIngestor(store, str(tmp_path / 'labeled')).ingest([[('T1', 1), ('T3', 0)]])
+    [partition] = summary['partitions']
+    with open(partition) as f:
+        rows = [json.loads(line) for line in f]
+    assert {(r['transaction_id'], r['predicted_fraud'], r['is_fraud']) for r in rows} == {('T1', 1, 1), ('T3', 0, 0)}
+    assert all('amount' in r for r in rows)
+
+
+def test_stored_confusion_gives_precision_and_recall(store, tmp_path):
+    LabelIngestor(store, str(tmp_path / 'labeled')).ingest([[('T0', 1), ('T1', 0), ('T2', 1), ('T3', 0)]])
+    confusion = store.label_confusion()
+    report = accuracy_report({'true_positive': confusion.get((1, 1), 0), 'false_positive': confusion.get((1, 0), 0),
+                              'false_negative': confusion.get((0, 1), 0), 'true_negative': confusion.get((0, 0), 0)})
+    assert report['precision'] == 0.5 and report['recall'] == 0.5 and report['accuracy'] == 0.5
@@ -0,0 +1,120 @@
+import tracemalloc
+
+from linkage import LinkageIndex
+
+HOUR = 3600
+
+
+def test_distinct_counts_in_both_directions():
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add_many([{'ip_address': '1.1.1.1', 'user_id': 1}, {'ip_address': '1.1.1.1', 'user_id': 2},
+                    {'ip_address': '2.2.2.2', 'user_id': 2}, {'ip_address': '1.1.1.1', 'user_id': 1}],
+                   [0, 10, 20, 30])
+    assert index.features({'ip_address': '1.1.1.1'})['ip_distinct_users'] == 2
+    assert index.features({'user_id': 2})['user_distinct_ips'] == 2
+    assert index.features({'user_id': 1})['user_distinct_ips'] == 1
+    assert index.features({'ip_address': '9.9.9.9'})['ip_distinct_users'] == 0
+
+
+def test_links_expire_once_their_latest_event_leaves_the_window():
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add({'ip_address': 'a', 'user_id': 1}, 0)
+    index.add({'ip_address': 'a', 'user_id': 2}, 1000)
+    index.add({'ip_address': 'a', 'user_id': 1}, 2000)  # refreshes the a-1 link
+    index.add({'ip_address': 'b', 'user_id': 3}, 1000 + HOUR)
+    assert index.features({'ip_address': 'a'})['ip_distinct_users'] == 1
+    assert index.features({'user_id': 2})['user_distinct_ips'] == 0
+
+    index.add({'ip_address': 'b', 'user_id': 3}, 2000 + HOUR)
+    assert index.features({'ip_address': 'a'})['ip_distinct_users'] == 0
+    assert index.stats()['links'] == 1
+
+
+def test_events_older_than_the_window_are_ignored():
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add({'ip_address': 'a', 'user_id': 1}, 2 * HOUR)
+    index.add({'ip_address': 'a', 'user_id': 2}, HOUR)
+    assert index.features({'ip_address': 'a'})['ip_distinct_users'] == 1
+
+
+def test_max_events_expires_the_oldest_links_early():
+    index = LinkageIndex(window_seconds=HOUR, max_events=2)
+    index.add_many([{'ip_address': 'a', 'user_id': user} for user in range(3)], [0, 1, 2])
+    assert index.features({'ip_address': 'a'})['ip_distinct_users'] == 2
+    assert index.features({'user_id': 0})['user_distinct_ips'] == 0
+
+
+def test_clusters_join_through_shared_entities():
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add_many([{'ip_address': 'a', 'user_id': 1, 'device_id': 'd1'},
+                    {'ip_address': 'b', 'user_id': 2, 'device_id': 'd1'},
+                    {'ip_address': 'c', 'user_id': 3}],
+                   [0, 10, 20])
+    features = index.features({'ip_address': 'a'})
+    assert (features['cluster_size'], features['cluster_users']) == (5, 2)
+    features = index.features({'user_id': 3})
+    assert (features['cluster_size'], features['cluster_users']) == (2, 1)
+    assert index.features({'user_id': 99})['cluster_size'] == 0
+
+
+def test_clusters_outlive_one_window_but_not_two():
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add({'ip_address': 'a', 'user_id': 1}, 0)
+    index.add({'ip_address': 'b', 'user_id': 2}, HOUR + 10)
+    # The a-1 link has expired but its cluster is still in the previous generation
+    features = index.features({'ip_address': 'a'})
+    assert features['ip_distinct_users'] == 0
+    assert features['cluster_size'] == 2
+
+    index.add({'ip_address': 'b', 'user_id': 2}, 2 * HOUR + 20)
+    assert index.features({'ip_address': 'a'})['cluster_size'] == 0
+    assert index.features({'ip_address': 'b'})['cluster_size'] == 2
+
+
+def test_missing_and_empty_fields_are_not_nodes():
+    assert LinkageIndex.nodes({'ip_address': '', 'user_id': float('nan'), 'device_id': None}) == {}
+    assert LinkageIndex.nodes({'user_id': 7}) == {'user': ('user', '7')}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = LinkageIndex(window_seconds=HOUR)
+    index.add_many([{'ip_address': 'a', 'user_id': 1}, {'ip_address': 'a', 'user_id': 2}], [0, 10])
+    path = str(tmp_path / 'linkage.pkl')
+    index.save(path)
+    loaded = LinkageIndex.load(path)
+    assert loaded.features({'ip_address': 'a'}) == index.features({'ip_address': 'a'})
+    loaded.add({'ip_address': 'a', 'user_id': 3}, 20)
+    assert loaded.features({'ip_address': 'a'})['ip_distinct_users'] == 3
+
+
+def test_memory_stays_flat_under_sustained_distinct_keys():
+    index = LinkageIndex(window_seconds=10 * HOUR, max_events=2000, max_nodes=3000)
+
+    def add_distinct(start, n):
+        index.add_many([{'ip_address': f'ip{i}', 'user_id': f'u{i}', 'device_id': f'd{i}'}
+                        for i in range(start, start + n)], range(start, start + n))
+
+    tracemalloc.start()
+    try:
+        add_distinct(0, 20_000)
+        after_warmup = tracemalloc.get_traced_memory()[0]
+        add_distinct(20_000, 60_000)
+        after_more = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    stats = index.stats()
+    assert stats['events'] <= 2000 and stats['links'] <= 2000
+    assert len(index._counts) <= 2 * 2000
+    assert stats['cluster_nodes'] <= 2 * 3000
+    assert after_more < after_warmup * 1.1
+
+
+def test_full_generation_is_retired_early_but_its_clusters_stay_visible():
+    index = LinkageIndex(window_seconds=HOUR, max_nodes=4)
+    index.add({'ip_address': 'a', 'user_id': 1}, 0)
+    index.add({'ip_address': 'b', 'user_id': 2}, 1)
+    assert len(index._current.parent) == 0 and len(index._previous.parent) == 4
+    index.add({'ip_address': 'c', 'user_id': 3}, 2)
+    assert index.features({'ip_address': 'a'})['cluster_size'] == 2
+    assert index.features({'ip_address': 'c'})['cluster_size'] == 2
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import live_feed
+from live_feed import LiveFeed
+from metrics import MetricsRegistry
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(live_feed, 'metrics', MetricsRegistry())
+
+
+def frames(feed, subscriber, n):
+    stream = feed.stream(subscriber)
+    return [next(stream) for _ in range(n)]
+
+
+def parse(frame):
+    event, data = frame.rstrip('\n').split('\n')
+    return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+
+def result(transaction_id, probability, risk_level):
+    return {'transaction_id': transaction_id, 'fraud_probability': probability, 'risk_level': risk_level,
+            'is_fraud': probability > 50, 'timestamp': '2024-01-01T00:00:00'}
+
+
+def test_scoring_call_publishes_scored_flagged_and_stats_deltas():
+    feed = LiveFeed()
+    subscriber = feed.subscribe()
+    feed.publish_scored([{'amount': 100.0, 'city': 'Pune'}, {'amount': 20.0}, {'amount': 5.0}],
+                        [result('A', 90.0, 'High'), result('B', 40.0, 'Medium'), result('C', 2.0, 'Low')])
+
+    retry, *events = frames(feed, subscriber, 4)
+    assert retry == "retry: 3000\n\n"
+    (scored_type, scored), (flagged_type, flagged), (stats_type, stats) = map(parse, events)
+    assert scored_type == 'scored' and [t['transactionId'] for t in scored['transactions']] == ['A', 'B', 'C']
+    assert scored['transactions'][0]['city'] == 'Pune'
+    assert flagged_type == 'flagged' and [t['transactionId'] for t in flagged['transactions']] == ['A', 'B']
+    assert stats_type == 'stats'
+    assert stats == {'totalTransactions': 3, 'fraudDetected': 1, 'legitimateTransactions': 2,
+                     'flagged': 2, 'fraudAmount': 100.0}
+
+
+def test_subscribers_only_get_the_event_types_they_asked_for():
+    feed = LiveFeed()
+    stats_only = feed.subscribe(['stats'])
+    feed.publish('scored', {'n': 1})
+    feed.publish('stats', {'n': 2})
+    assert stats_only.buffer.qsize() == 1
+    assert parse(stats_only.buffer.get_nowait()) == ('stats', {'n': 2})
+
+
+def test_nothing_is_serialized_without_subscribers():
+    feed = LiveFeed()
+    feed.publish_scored([{}], [result('A', 90.0, 'High')])
+    assert live_feed.metrics.counter('feed.events_published') == 0
+
+
+def test_slow_consumer_is_dropped_without_blocking_others():
+    feed = LiveFeed(buffer_size=2)
+    slow, fast = feed.subscribe(), feed.subscribe()
+    for i in range(3):
+        feed.publish('scored', {'n': i})
+        fast.buffer.get_nowait()
+
+    assert slow.dropped and not fast.dropped
+    assert feed.subscriber_count() == 1
+    assert live_feed.metrics.counter('feed.slow_consumers_dropped') == 1
+    # The dropped client skips its stale backlog and is told why it was cut off
+    assert list(feed.stream(slow)) == ["retry: 3000\n\n", "event: dropped\ndata: {\"reason\": \"slow consumer\"}\n\n"]
+
+
+def test_idle_stream_sends_keep_alives_and_unsubscribes_on_close():
+    feed = LiveFeed(heartbeat_seconds=0.01)
+    subscriber = feed.subscribe()
+    stream = feed.stream(subscriber)
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream) == ": keep-alive\n\n"
+    stream.close()
+    assert feed.subscriber_count() == 0
@@ -0,0 +1,76 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+import model_registry
+from metrics import MetricsRegistry
+from model_registry import GLOBAL_SEGMENT, ModelRegistry, segment_filename
+
+
+def constant_model(fraud_rate):
+    """A fitted model that predicts fraud_rate for every row"""
+    y = (np.arange(100) < fraud_rate * 100).astype(int)
+    return DummyClassifier(strategy='prior').fit(np.zeros((100, 1)), y)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(model_registry, 'metrics', MetricsRegistry())
+
+
+@pytest.fixture
+def root(tmp_path):
+    for key, value, fraud_rate in [('city', 'Pune', 0.2), ('city', 'New Delhi', 0.3), ('category', 'travel', 0.4)]:
+        os.makedirs(tmp_path / key, exist_ok=True)
+        with open(tmp_path / key / segment_filename(value), 'wb') as f:
+            pickle.dump(constant_model(fraud_rate), f)
+    return str(tmp_path)
+
+
+def test_segment_filenames_are_file_system_safe():
+    assert segment_filename('New Delhi') == 'New_Delhi.pkl'
+    assert segment_filename('../x') == '.._x.pkl'
+    assert segment_filename(3) == '3.pkl'
+
+
+def test_routes_by_the_first_key_with_a_model(root):
+    registry = ModelRegistry(root, constant_model(0.1), ['city', 'category'], max_bytes=10 ** 6)
+    assert registry.refresh() == 3
+    transactions = [{'city': 'Pune', 'category': 'travel'}, {'city': 'Goa', 'category': 'travel'},
+                    {'city': 'New Delhi'}, {'city': 'Goa', 'category': 'food'}, {}]
+    probabilities, names = registry.predict_proba_routed(np.zeros((5, 1)), transactions)
+    assert probabilities.tolist() == pytest.approx([0.2, 0.4, 0.3, 0.1, 0.1])
+    assert names.tolist() == ['city=Pune', 'category=travel', 'city=New Delhi', GLOBAL_SEGMENT, GLOBAL_SEGMENT]
+
+
+def test_loaded_models_are_cached_and_evicted_least_recently_used_first(root):
+    sizes = [os.path.getsize(os.path.join(root, 'city', name)) for name in ('Pune.pkl', 'New_Delhi.pkl')]
+    registry = ModelRegistry(root, constant_model(0.1), ['city', 'category'], max_bytes=max(sizes) + 1)
+    pune, delhi, travel = ('city', 'Pune.pkl'), ('city', 'New_Delhi.pkl'), ('category', 'travel.pkl')
+
+    model = registry.get(pune)
+    assert registry.get(pune) is model
+    registry.get(delhi)
+    assert registry.stats()['loaded_segments'] == 1
+    assert list(registry._loaded) == [delhi]
+    registry.get(travel)
+    assert list(registry._loaded) == [travel]
+    assert registry.stats()['loaded_bytes'] <= registry.max_bytes
+    assert model_registry.metrics.counter('registry.evictions') == 2
+    assert model_registry.metrics.counter('registry.hits') == 1
+
+
+def test_a_model_larger_than_the_budget_is_still_served(root):
+    registry = ModelRegistry(root, constant_model(0.1), ['city'], max_bytes=1)
+    probabilities, _ = registry.predict_proba_routed(np.zeros((1, 1)), [{'city': 'Pune'}])
+    assert probabilities.tolist() == pytest.approx([0.2])
+    assert registry.stats()['loaded_segments'] == 1
+
+
+def test_missing_directory_routes_everything_to_the_global_model(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'segments'), constant_model(0.1), ['city'], max_bytes=10 ** 6)
+    assert registry.available == {}
+    assert registry.segment_for({'city': 'Pune'}) == (None, GLOBAL_SEGMENT)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from neighbours import IVFIndex
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    rng = np.random.default_rng(3)
+    centres = rng.normal(0, 5, (10, 8))
+    return (centres[rng.integers(0, 10, 3000)] + rng.normal(0, 1, (3000, 8))).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    distances = np.sqrt(((vectors - query) ** 2).sum(axis=1))
+    return np.argsort(distances)[:k].tolist(), np.sort(distances)[:k]
+
+
+def test_probing_every_list_is_exact(vectors):
+    index = IVFIndex(n_lists=20)
+    index.train(vectors)
+    index.add(vectors, list(range(len(vectors))), 'dataset')
+    assert len(index) == len(vectors)
+
+    for query in vectors[:20] + 0.1:
+        results = index.search(query, k=5, n_probe=20)
+        expected_ids, expected_distances = brute_force(vectors, query, 5)
+        assert [r['id'] for r in results] == expected_ids
+        assert [r['distance'] for r in results] == pytest.approx(expected_distances, abs=1e-3)
+        assert {r['source'] for r in results} == {'dataset'}
+
+
+def test_few_probes_keep_most_neighbours(vectors):
+    index = IVFIndex(n_probe=4)
+    index.train(vectors)
+    assert index.n_lists == int(4 * np.sqrt(len(vectors)))
+    index.add(vectors, list(range(len(vectors))), 'dataset')
+    queries = vectors[::100]
+    recall = np.mean([len({r['id'] for r in index.search(q, k=10)} & set(brute_force(vectors, q, 10)[0])) / 10
+                      for q in queries])
+    assert recall > 0.8
+
+
+def test_inserts_grow_lists_and_keep_ids_and_sources(vectors):
+    index = IVFIndex(n_lists=4, n_probe=4)
+    index.train(vectors)
+    for start in range(0, 280, 7):
+        batch = vectors[start:start + 7]
+        index.add(batch, [f'T{i}' for i in range(start, start + len(batch))], 'live')
+    index.add(vectors[:0], [], 'live')
+    assert len(index) == 280 and index.stats()['vectors'] == 280
+    [nearest] = index.search(vectors[123], k=1)
+    assert nearest == {'id': 'T123', 'source': 'live', 'distance': 0.0}
+
+
+def test_small_and_empty_indexes(vectors):
+    index = IVFIndex(n_lists=50)
+    index.train(vectors[:10])
+    assert index.n_lists == 10 and index.trained
+    assert index.search(vectors[0]) == []
+    index.add(vectors[:3], ['a', 'b', 'c'], 'dataset')
+    assert len(index.search(vectors[0], k=5, n_probe=10)) == 3
+    assert IVFIndex().stats()['vectors'] == 0
+
+
+@pytest.mark.parametrize('k', [0, -5])
+def test_search_rejects_non_positive_k(vectors, k):
+    index = IVFIndex(n_lists=4)
+    index.train(vectors)
+    index.add(vectors, list(range(len(vectors))), 'dataset')
+    with pytest.raises(ValueError):
+        index.search(vectors[0], k=k)
@@ -0,0 +1,108 @@
+import base64
+
+import pytest
+
+from prediction_store import PredictionStore
+
+
+def result(i, risk_level):
+    probability = {'Low': 10.0, 'Medium': 50.0, 'High': 90.0}[risk_level]
+    return {'transaction_id': f'TXN{i:04d}', 'fraud_probability': probability, 'risk_level': risk_level,
+            'is_fraud': probability > 50, 'risk_factors': []}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PredictionStore(str(tmp_path / 'predictions.db'))
+    levels = ['Low', 'Medium', 'High']
+    for i in range(30):
+        transaction = {'amount': i, 'payment_method': 'wallet' if i % 2 else 'card', 'user_id': i}
+        # Several rows share a timestamp so paging has to break ties on id
+        store.add_many([transaction], [result(i, levels[i % 3])], scored_at=1000.0 + i // 4)
+    return store
+
+
+def all_pages(store, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.list_flagged(limit=limit, cursor=cursor, **filters)
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_flagged_row_once_newest_first(store):
+    pages = all_pages(store, limit=4)
+    ids = [row['transactionId'] for page in pages for row in page]
+    assert len(ids) == len(set(ids)) == 20
+    assert all(len(page) == 4 for page in pages)
+    times = [row['flaggedAt'] for page in pages for row in page]
+    assert times == sorted(times, reverse=True)
+
+
+def test_last_full_page_has_no_cursor(store):
+    page, cursor = store.list_flagged(limit=20)
+    assert len(page) == 20 and cursor is None
+
+
+def test_filters_apply_across_pages(store):
+    pages = all_pages(store, limit=3, risk_level='High', payment_method='wallet')
+    rows = [row for page in pages for row in page]
+    assert rows and all(row['riskLevel'] == 'High' and row['paymentMethod'] == 'wallet' for row in rows)
+    assert len(rows) == sum(1 for i in range(30) if i % 3 == 2 and i % 2)
+
+
+def test_empty_result_has_no_cursor(store):
+    assert store.list_flagged(limit=5, category='missing') == ([], None)
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_page_size_must_be_positive(store, limit):
+    with pytest.raises(ValueError):
+        store.list_flagged(limit=limit)
+
+
+def test_invalid_cursor_is_a_value_error(store):
+    with pytest.raises(ValueError):
+        store.list_flagged(cursor='not-a-cursor')
+
+
+def test_rows_of_one_batch_page_without_repeats(tmp_path):
+    store = PredictionStore(str(tmp_path / 'predictions.db'))
+    # One scoring call stores every row with the same scored_at
+    store.add_many([{'amount': i} for i in range(50)], [result(i, 'High') for i in range(50)], scored_at=1000.0)
+    ids = [row['transactionId'] for page in all_pages(store, limit=7) for row in page]
+    assert ids == [f'TXN{i:04d}' for i in reversed(range(50))]
+
+
+def test_time_range_pages(store):
+    pages = all_pages(store, limit=2, start=1002.0, end=1005.0)
+    ids = [row['transactionId'] for page in pages for row in page]
+    # Rows 8-19 have scored_at 1002-1004; two of every three are flagged
+    assert ids == [f'TXN{i:04d}' for i in reversed(range(8, 20)) if i % 3]
+    assert store.list_flagged(start=2000.0) == ([], None)
+    assert len(store.list_flagged(limit=50, end=2000.0)[0]) == 20
+
+
+@pytest.mark.parametrize('filters', [{}, {'risk_level': 'High'}, {'payment_method': 'card'},
+                                     {'category': 'food', 'start': 1001.0, 'end': 1004.0}])
+def test_every_page_is_an_index_seek_on_the_filter_and_id(store, filters):
+    cursor = store.list_flagged(limit=2, **filters)[1] or 'MTAw'
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+    store.list_flagged(limit=2, cursor=cursor, **filters)
+    store._conn.set_trace_callback(None)
+    [query] = [s for s in statements if s.startswith('SELECT id, transaction_id')]
+    plan = ' '.join(row[3] for row in store._conn.execute(f"EXPLAIN QUERY PLAN {query}"))
+    assert plan.startswith('SEARCH predictions USING INDEX') and 'id<?' in plan.replace(' ', '')
+    assert 'TEMP B-TREE' not in plan
+    for column in ('risk_level', 'payment_method', 'category'):
+        if column in filters:
+            assert f'{column}=?' in plan
+
+
+def test_cursors_from_before_id_paging_still_work(store):
+    # Row ids start at 1, so the rows below id 17 are TXN0000-TXN0015
+    legacy = base64.urlsafe_b64encode(b'1004.0:17').decode()
+    page, _ = store.list_flagged(limit=50, cursor=legacy)
+    assert [row['transactionId'] for row in page] == [f'TXN{i:04d}' for i in reversed(range(16)) if i % 3]
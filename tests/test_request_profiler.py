@@ -0,0 +1,64 @@
+import time
+from collections import Counter
+
+from request_profiler import RequestProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_disabled_profiler_does_not_watch_requests():
+    profiler = RequestProfiler()
+    assert not profiler.enabled
+    assert profiler.start_request() is None
+    profiler.finish_request(None, {})
+    assert profiler.list_profiles() == []
+
+
+def test_sampled_request_keeps_its_stacks():
+    profiler = RequestProfiler(sample_rate=1.0, interval_ms=1)
+    session = profiler.start_request()
+    busy(0.1)
+    profiler.finish_request(session, {'path': '/api/predict'})
+    profiler.finish_request(session, {'path': '/api/predict'})  # a second finish is ignored
+
+    [summary] = profiler.list_profiles()
+    assert summary['reason'] == 'sampled' and summary['path'] == '/api/predict'
+    assert summary['samples'] > 0 and 'stacks' not in summary
+    profile = profiler.get_profile(summary['id'])
+    assert any(any(frame.startswith('busy (test_request_profiler.py') for frame in stack)
+               for stack in profile['stacks'])
+    assert profiler.get_profile(summary['id'] + 1) is None
+
+
+def test_only_slow_requests_are_kept_when_not_sampled():
+    profiler = RequestProfiler(slow_ms=50, interval_ms=1)
+    fast = profiler.start_request()
+    profiler.finish_request(fast, {'path': '/fast'})
+    slow = profiler.start_request()
+    busy(0.06)
+    profiler.finish_request(slow, {'path': '/slow'})
+    assert [(p['path'], p['reason']) for p in profiler.list_profiles()] == [('/slow', 'slow')]
+
+
+def test_ring_buffer_keeps_the_latest_profiles():
+    profiler = RequestProfiler(sample_rate=1.0, capacity=2)
+    for i in range(3):
+        profiler.finish_request(profiler.start_request(), {'n': i})
+    assert [p['n'] for p in profiler.list_profiles()] == [1, 2]
+    profiler.configure(sample_rate=0)
+    assert not profiler.enabled
+
+
+def test_collapsed_stacks_and_call_tree():
+    profile = {'stacks': Counter({('main', 'predict', 'encode'): 3, ('main', 'predict'): 1, ('main', 'log'): 2})}
+    assert RequestProfiler.collapsed(profile).splitlines() == ['main;predict;encode 3', 'main;log 2', 'main;predict 1']
+
+    tree = RequestProfiler.call_tree(profile)
+    assert tree['samples'] == 6
+    [main] = tree['children']
+    assert [(c['name'], c['samples']) for c in main['children']] == [('predict', 4), ('log', 2)]
+    assert main['children'][0]['children'][0] == {'name': 'encode', 'samples': 3, 'children': []}
@@ -0,0 +1,125 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+import retrain_jobs
+from retrain_jobs import CURRENT_LINK, PROMOTED_FILES, RetrainRunner, served_dir
+
+
+def holdout_frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    amount = rng.normal(size=n)
+    return pd.DataFrame({'amount': amount, 'is_fraud': (amount + rng.normal(scale=0.5, size=n) > 0).astype(int)})
+
+
+def write_model_set(directory, coefficient, holdout):
+    """A servable set whose model scores with the given sign: 1 ranks well, -1 ranks backwards"""
+    os.makedirs(directory, exist_ok=True)
+    X = holdout[['amount']]
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), holdout['is_fraud'])
+    model.coef_ = model.coef_ * coefficient
+    files = {
+        'fraud_model.pkl': model,
+        'scaler.pkl': scaler,
+        'feature_info.pkl': {'categorical_columns': [], 'feature_columns': ['amount']},
+        'drift_reference.pkl': {},
+    }
+    for name, value in files.items():
+        with open(os.path.join(directory, name), 'wb') as f:
+            pickle.dump(value, f)
+    holdout.to_csv(os.path.join(directory, 'holdout.csv'), index=False)
+
+
+@pytest.fixture
+def runner(tmp_path):
+    promotions = []
+    runner = RetrainRunner(str(tmp_path / 'models'),
+                           on_promote=lambda: promotions.append(served_dir(runner.models_dir)),
+                           min_auc=0.5, latency_budget_ms=1000, keep_releases=2)
+    runner.promotions = promotions
+    return runner
+
+
+def test_served_dir_is_models_dir_until_first_promotion(runner):
+    assert served_dir(runner.models_dir) == runner.models_dir
+
+
+def test_promote_switches_current_to_a_complete_release(runner, tmp_path):
+    holdout = holdout_frame()
+    write_model_set(runner.models_dir, 1, holdout)
+    write_model_set(str(tmp_path / 'staging'), 1, holdout)
+
+    runner.promote(str(tmp_path / 'staging'), 'job-1')
+
+    release = os.path.join(runner.models_dir, 'releases', 'job-1')
+    assert os.path.islink(os.path.join(runner.models_dir, CURRENT_LINK))
+    assert served_dir(runner.models_dir) == os.path.realpath(release)
+    assert sorted(os.listdir(release)) == sorted(PROMOTED_FILES)
+    assert runner.promotions == [os.path.realpath(release)]
+    # No stray temporary link or directory is left behind
+    assert not [name for name in os.listdir(runner.models_dir) if name.startswith('.')]
+    assert os.listdir(os.path.join(runner.models_dir, 'releases')) == ['job-1']
+
+
+def test_promote_keeps_the_newest_releases(runner, tmp_path):
+    holdout = holdout_frame()
+    write_model_set(str(tmp_path / 'staging'), 1, holdout)
+    for job_id in ('job-1', 'job-2', 'job-3'):
+        runner.promote(str(tmp_path / 'staging'), job_id)
+    assert sorted(os.listdir(os.path.join(runner.models_dir, 'releases'))) == ['job-2', 'job-3']
+    assert served_dir(runner.models_dir).endswith('job-3')
+
+
+def test_validate_compares_with_the_file_promotion_replaces(runner, tmp_path):
+    holdout = holdout_frame()
+    write_model_set(runner.models_dir, 1, holdout)
+    # A served student does not change what the candidate is compared with
+    with open(os.path.join(runner.models_dir, 'student_model.pkl'), 'wb') as f:
+        pickle.dump(None, f)
+    os.makedirs(os.path.join(runner.models_dir, 'segments'))
+    write_model_set(str(tmp_path / 'staging'), -1, holdout)
+
+    report = runner.validate(str(tmp_path / 'staging'))
+
+    assert report['current']['auc'] > 0.8
+    assert report['candidate']['auc'] < 0.2
+    assert not report['checks']['auc_vs_current']
+    assert not report['passed']
+    assert report['invalidates'] == ['student_model.pkl', 'segments']
+
+
+def test_validate_without_a_served_model_checks_the_candidate_alone(runner, tmp_path):
+    write_model_set(str(tmp_path / 'staging'), 1, holdout_frame())
+    report = runner.validate(str(tmp_path / 'staging'))
+    assert 'current' not in report
+    assert report['passed']
+    assert report['invalidates'] == []
+
+
+def test_command_runs_training_behind_the_limit_wrapper(runner):
+    job = retrain_jobs.RetrainJob('job-1', '/tmp/staging/job-1')
+    command = runner.command(job)
+    assert command[1] == 'run_limited.py'
+    assert command[command.index('--') + 1:] == ['retrain_model.py', '--output-dir', '/tmp/staging/job-1',
+                                                  '--encoding', 'dense']
+
+
+def test_run_limited_sets_limits_in_the_child(tmp_path):
+    script = tmp_path / 'report_limits.py'
+    script.write_text("import os, resource, sys\n"
+                      "print(os.nice(0), resource.getrlimit(resource.RLIMIT_CPU)[0], sys.argv[1:])\n")
+    output = subprocess.run(
+        [sys.executable, 'run_limited.py', '--nice', '3', '--cpu-seconds', '120', '--', str(script), '--flag', 'x'],
+        cwd=retrain_jobs.SRC_DIR, capture_output=True, text=True, check=True
+    ).stdout.split(maxsplit=2)
+    assert int(output[0]) >= 3
+    assert output[1] == '120'
+    assert output[2].strip() == "['--flag', 'x']"
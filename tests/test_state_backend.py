@@ -0,0 +1,106 @@
+import os
+import threading
+
+import pytest
+
+import state_backend
+from state_backend import LocalBackend, SocketBackend, StateBackendError, StateServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(state_backend.time, 'time', fake)
+    return fake
+
+
+def test_incr_creates_and_adds():
+    backend = LocalBackend()
+    assert backend.incr('c') == 1
+    assert backend.incr('c', 5) == 6
+    assert backend.incr_many({'c': 1, 'd': 2}) == [7, 2]
+    assert backend.get_many(['c', 'd', 'missing']) == [7, 2, None]
+
+
+def test_set_nx_only_sets_absent_keys():
+    backend = LocalBackend()
+    assert backend.set_nx('k', 'first')
+    assert not backend.set_nx('k', 'second')
+    assert backend.get('k') == 'first'
+    backend.delete('k')
+    assert backend.set_nx('k', 'third')
+
+
+def test_ttl_expiry(clock):
+    backend = LocalBackend()
+    backend.set('k', 'v', ttl=10)
+    backend.incr('c', ttl=10)
+    clock.now += 9
+    assert backend.get('k') == 'v'
+    clock.now += 2
+    assert backend.get('k') is None
+    assert backend.incr('c') == 1
+    assert backend.set_nx('k', 'again', ttl=10)
+
+
+def test_eviction_keeps_recently_used_counters():
+    backend = LocalBackend(max_keys=5)
+    backend.incr('models:generation')
+    backend.incr('metrics:x')
+    for i in range(10):
+        backend.set_nx(f'idempotency:{i}', {'response': None})
+        backend.incr('metrics:x')
+        if i % 3 == 0:
+            backend.get('models:generation')
+    assert backend.size() == 5
+    assert backend.get('metrics:x') == 11
+    assert backend.get('models:generation') == 1
+    assert backend.get('idempotency:0') is None
+
+
+def test_ring_buffer_is_bounded():
+    backend = LocalBackend()
+    for i in range(5):
+        backend.ring_push('r', i, 3)
+    assert backend.ring_range('r') == [2, 3, 4]
+    assert backend.ring_range('r', 2) == [3, 4]
+
+
+def test_execute_many_rejects_unlisted_operations():
+    backend = LocalBackend()
+    assert backend.execute_many([('incr', ('c',)), ('get', ('c',))]) == [1, 1]
+    with pytest.raises(StateBackendError):
+        backend.execute_many([('_write', ('c', 0, None))])
+    with pytest.raises(StateBackendError):
+        backend.execute_many([('execute_many', ([],))])
+    assert backend.get('c') == 1
+
+
+def test_socket_round_trip(tmp_path):
+    address = str(tmp_path / 'state.sock')
+    server = StateServer(address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert oct(os.stat(address).st_mode & 0o777) == '0o600'
+        client = SocketBackend(address)
+        assert client.incr('c', 2) == 2
+        assert client.set_nx('k', {'a': 1})
+        assert not client.set_nx('k', {'a': 2})
+        assert client.get('k') == {'a': 1}
+        assert client.execute_many([('incr', ('c',)), ('ring_push', ('r', 'x', 2))]) == [3, 1]
+        with pytest.raises(StateBackendError):
+            client.execute_many([('_write', ('c', 0, None))])
+        with pytest.raises(AttributeError):
+            client.close_everything
+        # A second client (another worker) sees the same state
+        assert SocketBackend(address).get('c') == 3
+    finally:
+        server.close()
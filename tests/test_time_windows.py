@@ -0,0 +1,65 @@
+import pytest
+
+from time_windows import BucketRing, RollingWindows, parse_duration
+
+# A whole day, so minute and hour buckets line up
+T0 = 1_700_006_400
+
+
+@pytest.mark.parametrize('text, seconds', [('15m', 900), ('1h', 3600), (' 7d ', 604800)])
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize('text', ['', '15', 'h', '1.5h', '-1h', '2w'])
+def test_parse_duration_rejects_other_formats(text):
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+def test_windows_sum_the_buckets_they_cover():
+    windows = RollingWindows()
+    windows.add_many([T0, T0 + 30, T0 + 90, T0 + 600, T0 + 7200],
+                     [1, 0, 0, 1, 0], [10.0, 20.0, 30.0, 40.0, 50.0])
+    result = windows.query(60, as_of=T0 + 59)
+    assert (result['count'], result['fraud_count'], result['amount_sum']) == (2, 1, 30.0)
+    assert result['fraud_rate'] == 50.0 and result['granularity'] == 'minute' and result['buckets'] == 1
+
+    assert windows.query(parse_duration('15m'), as_of=T0 + 600)['count'] == 4
+    assert windows.query(parse_duration('1h'))['count'] == 1  # ends at the latest event, T0 + 2h
+
+    result = windows.query(parse_duration('1d'))
+    assert (result['count'], result['granularity'], result['buckets']) == (5, 'hour', 24)
+
+
+def test_empty_windows():
+    windows = RollingWindows()
+    result = windows.query(3600)
+    assert (result['count'], result['fraud_rate'], result['as_of']) == (0, 0.0, None)
+    windows.add(T0, True, 5.0)
+    assert windows.latest_timestamp() == T0
+    assert windows.query(3600, as_of=T0 - 3600)['count'] == 0
+
+
+def test_ring_slots_are_reused_once_time_moves_past_them():
+    ring = BucketRing(60, 4)
+    ring.add_many([0, 60, 120], [0, 0, 0], [1, 1, 1])
+    ring.add_many([240, 300], [0, 0], [1, 1])  # buckets 4 and 5 take the slots of 0 and 1
+    totals, n_buckets = ring.window(300, 10)
+    assert n_buckets == 4 and totals[0] == 3
+    assert ring.window(60, 1)[0][0] == 0
+
+    # Events older than the ring are dropped rather than overwriting newer buckets
+    ring.add_many([0], [1], [100])
+    assert ring.window(300, 4)[0].tolist() == [3, 0, 3]
+
+
+def test_backfill_from_csv(tmp_path):
+    path = tmp_path / 'transactions.csv'
+    path.write_text("transaction_time,is_fraud,amount,user_id\n"
+                    "2024-01-01 10:00:00,0,100,1\n2024-01-01 10:30:00,1,200,2\n2024-01-01 11:15:00,0,50,1\n")
+    windows = RollingWindows()
+    assert windows.backfill_csv(str(path)) == 3
+    result = windows.query(parse_duration('2h'))
+    assert (result['count'], result['fraud_count'], result['amount_sum']) == (3, 1, 350.0)
+    assert result['as_of'] == '2024-01-01T11:15:00'